@@ -1,6 +1,7 @@
 import pandas as pd
 import random
 from datetime import datetime, timedelta
+from schema import ROUGH_COLUMN_ORDER
 
 # Constants for random choices
 PRODUCT_NAMES = ['Widget A', 'Widget B', 'Widget C', 'Widget D', 'Widget E']
@@ -21,21 +22,16 @@ UUID_LIST = [
 ] * 10  # Repeat to have at least 100 UUIDs
 
 # Correctly ordered columns
-COLUMNS = [
-    'Order_Id', 'Customer_Id', 'Customer_Name', 'Product_Id', 'Product_Name',
-    'Product_Category', 'Payment_Type', 'Quantity_ordered', 'Price',
-    'Date_and_Time_When_Order_Was_Placed', 'Customer_Country', 'Customer_City',
-    'Site_From_Where_Order_Was_Placed', 'Payment_Transaction_Confirmation_Id',
-    'Payment_Success_or_Failure', 'Payment_Failure_Reason'
-]
+COLUMNS = ROUGH_COLUMN_ORDER
 
 def generate_record(index: int) -> dict:
     """Generate a single order record with a mix of valid and invalid data based on index."""
+    uuid_index = index % len(UUID_LIST)  # Wrap index so runs past len(UUID_LIST) rows keep working
     record = {
-        'Order_Id': UUID_LIST[index] if index % 10 != 0 else 'InvalidUUID',  # Invalid UUID every 10th record
-        'Customer_Id': UUID_LIST[index] if index % 10 != 1 else 'InvalidCustomerId',  # Invalid Customer Id every 10th + 1 record
+        'Order_Id': UUID_LIST[uuid_index] if index % 10 != 0 else 'InvalidUUID',  # Invalid UUID every 10th record
+        'Customer_Id': UUID_LIST[uuid_index] if index % 10 != 1 else 'InvalidCustomerId',  # Invalid Customer Id every 10th + 1 record
         'Customer_Name': f'Customer_{index}',
-        'Product_Id': UUID_LIST[index] if index % 10 != 2 else 'InvalidProductId',  # Invalid Product Id every 10th + 2 record
+        'Product_Id': UUID_LIST[uuid_index] if index % 10 != 2 else 'InvalidProductId',  # Invalid Product Id every 10th + 2 record
         'Product_Name': random.choice(PRODUCT_NAMES),
         'Product_Category': random.choice(CATEGORIES) if index % 10 != 3 else 'InvalidCategory',  # Invalid Category every 10th + 3 record
         'Payment_Type': random.choice(PAYMENT_TYPES),
@@ -45,7 +41,7 @@ def generate_record(index: int) -> dict:
         'Customer_Country': random.choice(COUNTRIES),
         'Customer_City': f'City_{index}' if index % 10 != 6 else 'InvalidCity',  # Invalid City every 10th + 6 record
         'Site_From_Where_Order_Was_Placed': random.choice(SITES),
-        'Payment_Transaction_Confirmation_Id': UUID_LIST[index] if index % 10 != 7 else 'InvalidUUID',  # Invalid Transaction ID every 10th + 7 record
+        'Payment_Transaction_Confirmation_Id': UUID_LIST[uuid_index] if index % 10 != 7 else 'InvalidUUID',  # Invalid Transaction ID every 10th + 7 record
         'Payment_Success_or_Failure': random.choice(PAYMENT_STATUS),
         'Payment_Failure_Reason': random.choice(FAILURE_REASONS) if random.choice(PAYMENT_STATUS) == 'N' else None
     }
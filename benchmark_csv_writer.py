@@ -0,0 +1,62 @@
+import argparse
+import csv
+import os
+import tempfile
+import time
+import numpy as np
+from data_generator import generate_batch
+from csv_writer import CSVWriter
+
+
+def bench_dictwriter(path, batch, repeats):
+    """The old write_to_csv path: csv.DictWriter.writerow once per record."""
+    records = batch.to_dict('records')
+    with open(path, mode='w', newline='') as file:
+        writer = csv.DictWriter(file, fieldnames=batch.columns.tolist())
+        writer.writeheader()
+        for _ in range(repeats):
+            for record in records:
+                writer.writerow(record)
+
+def bench_to_csv(path, batch, repeats):
+    """The old save_to_csv / save_data path: DataFrame.to_csv per batch."""
+    with open(path, mode='w', newline='') as file:
+        for repeat in range(repeats):
+            batch.to_csv(file, header=repeat == 0, index=False)
+
+def bench_csv_writer(path, batch, repeats, threads=1):
+    """The shared serialization layer."""
+    with CSVWriter(path, threads=threads) as writer:
+        for _ in range(repeats):
+            writer.write(batch)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare CSV serialization paths on generated order data.")
+    parser.add_argument('--rows', type=int, nargs='+', default=[1_000_000, 10_000_000])
+    parser.add_argument('--batch-size', type=int, default=1_000_000, help="Rows per written batch")
+    parser.add_argument('--threads', type=int, default=os.cpu_count() or 1)
+    parser.add_argument('--skip-dictwriter', action='store_true', help="Skip the slow per-row DictWriter path")
+    args = parser.parse_args()
+
+    batch = generate_batch(args.batch_size, np.random.default_rng(0))
+    paths = [('DataFrame.to_csv', bench_to_csv), ('CSVWriter', bench_csv_writer),
+             (f'CSVWriter threads={args.threads}', lambda path, b, r: bench_csv_writer(path, b, r, args.threads))]
+    if not args.skip_dictwriter:
+        paths.insert(0, ('csv.DictWriter per row', bench_dictwriter))
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        path = os.path.join(tmp_dir, 'bench.csv')
+        for rows in args.rows:
+            repeats = max(1, rows // args.batch_size)
+            for name, bench in paths:
+                start = time.perf_counter()
+                bench(path, batch, repeats)
+                elapsed = time.perf_counter() - start
+                size_mb = os.path.getsize(path) / 1e6
+                print(f"{repeats * args.batch_size:>11,} rows  {name:<28} {elapsed:8.2f} s  "
+                      f"{repeats * args.batch_size / elapsed:>12,.0f} rows/s  {size_mb:8.1f} MB")
+
+
+if __name__ == "__main__":
+    main()
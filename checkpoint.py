@@ -0,0 +1,24 @@
+import json
+import os
+
+
+def load_checkpoint(path: str) -> dict:
+    """Load a JSON checkpoint, or return None when there is none."""
+    if not path or not os.path.exists(path):
+        return None
+    with open(path) as file:
+        return json.load(file)
+
+def save_checkpoint(path: str, state: dict):
+    """Atomically replace the checkpoint so a crash never leaves a half-written file."""
+    tmp_path = path + '.tmp'
+    with open(tmp_path, 'w') as file:
+        json.dump(state, file, indent=2)
+        file.flush()
+        os.fsync(file.fileno())
+    os.replace(tmp_path, path)
+
+def clear_checkpoint(path: str):
+    """Remove a checkpoint once its job has finished."""
+    if path and os.path.exists(path):
+        os.remove(path)
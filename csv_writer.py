@@ -0,0 +1,184 @@
+import csv
+import io
+from concurrent.futures import ThreadPoolExecutor
+import numpy as np
+import pandas as pd
+
+try:
+    import pyarrow as pa
+    import pyarrow.compute as pa_compute
+    import pyarrow.csv as pa_csv
+except ImportError:  # pyarrow is optional; encoding falls back to DataFrame.to_csv
+    pa = None
+
+# Write buffer for output files; large buffers turn many small writes into few big ones
+DEFAULT_BUFFER_SIZE = 16 * 1024 * 1024
+
+# Rows converted per pyarrow batch while encoding
+ARROW_BATCH_SIZE = 64 * 1024
+
+# Fractional-second digits printed for each timestamp unit, so a column has one format in every chunk
+TIMESTAMP_DIGITS = {'s': 0, 'ms': 3, 'us': 6, 'ns': 9}
+
+TIMESTAMP_FORMAT = '%Y-%m-%d %H:%M:%S'
+
+
+def encode_header(columns: list) -> bytes:
+    """Encode a header line with minimal quoting, like DataFrame.to_csv."""
+    buffer = io.StringIO()
+    csv.writer(buffer, lineterminator='\n').writerow(columns)
+    return buffer.getvalue().encode()
+
+def to_arrow(df: pd.DataFrame):
+    """Convert a DataFrame to a typed Arrow table, stringifying mixed-type columns such as 'InvalidPrice' prices."""
+    arrays = []
+    for column in df.columns:
+        series = df[column]
+        try:
+            arrays.append(pa.array(series, from_pandas=True))
+        except (pa.ArrowInvalid, pa.ArrowTypeError):
+            arrays.append(pa.array(series.astype(str).where(series.notna(), None), type=pa.string(), from_pandas=True))
+    return pa.Table.from_arrays(arrays, names=[str(column) for column in df.columns])
+
+def _csv_ready_array(array):
+    """Decode a dictionary (categoricals are written as their values) and pre-format floats, bools and timestamps."""
+    if pa.types.is_dictionary(array.type):
+        array = array.cast(array.type.value_type)
+    if pa.types.is_boolean(array.type):
+        array = pa_compute.if_else(array, 'True', 'False')
+    elif pa.types.is_floating(array.type):
+        array = _format_floats(array)
+    elif pa.types.is_timestamp(array.type) and array.type.tz is None:
+        array = _format_timestamps(array)
+    return array
+
+def _csv_ready(table):
+    return pa.Table.from_arrays([_csv_ready_array(array) for array in table.columns], names=table.column_names)
+
+def text_array(array):
+    """Arrow string array of the values as the CSV writer prints them; nulls stay null."""
+    return _csv_ready_array(array).cast(pa.string())
+
+def _format_floats(array):
+    """Format floats like pandas: shortest round-trip repr, keeping '.0' on whole numbers (599.0, not 599)."""
+    if isinstance(array, pa.ChunkedArray):
+        array = array.combine_chunks()
+    text = pa_compute.cast(array, pa.string())
+    whole = pa_compute.match_substring_regex(text, r'^-?[0-9]+$')
+    text = pa_compute.if_else(whole, pa_compute.binary_join_element_wise(text, '.0', ''), text)
+    # Arrow switches to exponents at other magnitudes than Python and does not pad them (1e-7, not 1e-07);
+    # the few values outside [1e-4, 1e15) are formatted by numpy, which prints them as pandas does
+    values = np.asarray(array)
+    magnitude = np.abs(values)
+    exponent = np.isfinite(values) & (values != 0) & ((magnitude < 1e-4) | (magnitude >= 1e15))
+    if exponent.any():
+        text = pa_compute.replace_with_mask(text, pa.array(exponent), pa.array([str(value) for value in values[exponent]]))
+    return text
+
+def _format_timestamps(array):
+    """Format timestamps with date, time and the fractional digits of their unit (TIMESTAMP_DIGITS)."""
+    # Arrow prints %S with as many fractional digits as the unit has
+    return pa_compute.strftime(array, format=TIMESTAMP_FORMAT)
+
+def _format_timestamps_pandas(series: pd.Series) -> pd.Series:
+    """_format_timestamps for a naive datetime Series, without pyarrow."""
+    text = series.dt.strftime(TIMESTAMP_FORMAT)
+    digits = TIMESTAMP_DIGITS[np.datetime_data(series.dtype)[0]]
+    if digits:
+        fraction = pd.Series(series.to_numpy().view(np.int64) % 10 ** digits, index=series.index, name=series.name)
+        text = text + '.' + fraction.astype(str).str.zfill(digits)
+    return text.where(series.notna(), None)
+
+def format_timestamp_column(series: pd.Series) -> pd.Series:
+    """Text of a datetime column as the CSV writer prints it (missing values stay missing)."""
+    if getattr(series.dtype, 'tz', None) is not None:
+        return series.astype(str).where(series.notna(), None)
+    if pa is None:
+        return _format_timestamps_pandas(series)
+    text = _format_timestamps(pa.array(series, from_pandas=True)).to_pandas()
+    return pd.Series(text.to_numpy(), index=series.index, name=series.name)
+
+def _encode_rows_arrow(df: pd.DataFrame) -> bytes:
+    table = _csv_ready(to_arrow(df))
+    if table.num_columns > 1:
+        # Unquoted output matches DataFrame.to_csv; pyarrow rejects it if any value needs quotes
+        sink = pa.BufferOutputStream()
+        try:
+            pa_csv.write_csv(table, sink, pa_csv.WriteOptions(
+                include_header=False, batch_size=ARROW_BATCH_SIZE, quoting_style='none'))
+            return sink.getvalue().to_pybytes()
+        except pa.ArrowInvalid:
+            pass
+    # pyarrow's own quoting quotes every string; the csv module (which to_csv uses) quotes only the values
+    # that need it, and a lone empty field as "" so a one-column row does not read back as a blank line
+    buffer = io.StringIO()
+    csv.writer(buffer, lineterminator='\n').writerows(zip(*(column.cast(pa.string()).to_pylist()
+                                                             for column in table.columns)))
+    return buffer.getvalue().encode()
+
+def _encode_rows_pandas(df: pd.DataFrame) -> bytes:
+    # to_csv picks the timestamp digits per chunk; naive timestamp columns are formatted first like the Arrow path
+    times = {column: _format_timestamps_pandas(df[column]) for column in df.columns
+             if pd.api.types.is_datetime64_dtype(df[column])}
+    return (df.assign(**times) if times else df).to_csv(header=False, index=False, lineterminator='\n').encode()
+
+def encode_rows(df: pd.DataFrame) -> bytes:
+    """Encode the rows of a DataFrame (no header) as CSV bytes, column-at-a-time where possible.
+
+    The bytes match DataFrame.to_csv(index=False) except for timestamps: to_csv drops the time
+    or the fraction when no value in the frame needs it, so chunks of one file could differ, while
+    here every value gets the fractional digits of its column's unit (none for 's', 6 for the
+    'us' columns of typed CSV reads) and each column keeps one format in every chunk.
+    """
+    if len(df) == 0:
+        return b''
+    return _encode_rows_arrow(df) if pa is not None else _encode_rows_pandas(df)
+
+def encode_csv(df: pd.DataFrame, header: bool = True, threads: int = 1) -> bytes:
+    """Encode a DataFrame as CSV bytes, optionally splitting the rows across threads."""
+    if threads > 1 and len(df) > threads:
+        step = -(-len(df) // threads)
+        slices = [df.iloc[start:start + step] for start in range(0, len(df), step)]
+        with ThreadPoolExecutor(max_workers=threads) as pool:
+            body = b''.join(pool.map(encode_rows, slices))
+    else:
+        body = encode_rows(df)
+    return (encode_header(df.columns.tolist()) if header else b'') + body
+
+
+class CSVWriter:
+    """Append DataFrame batches to one CSV file with a single header and large buffered writes.
+
+    `file` is a path or an open binary file object. Use as a context manager or call close().
+    """
+
+    def __init__(self, file, header: bool = True, mode: str = 'w', threads: int = 1,
+                 buffer_size: int = DEFAULT_BUFFER_SIZE):
+        self.owns_file = isinstance(file, str)
+        self.file = open(file, mode.replace('b', '') + 'b', buffering=buffer_size) if self.owns_file else file
+        self.write_header = header
+        self.threads = threads
+        self.rows_written = 0
+
+    def write(self, df: pd.DataFrame):
+        self.file.write(encode_csv(df, header=self.write_header, threads=self.threads))
+        self.write_header = False
+        self.rows_written += len(df)
+
+    def close(self):
+        if self.owns_file:
+            self.file.close()
+        else:
+            self.file.flush()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+def write_csv(df: pd.DataFrame, file, header: bool = True, mode: str = 'w', threads: int = 1):
+    """Write one DataFrame to a CSV file through CSVWriter."""
+    with CSVWriter(file, header=header, mode=mode, threads=threads) as writer:
+        writer.write(df)
@@ -0,0 +1,71 @@
+import numpy as np
+import pandas as pd
+from data_generator import payment_types, countries_cities, sites, payment_status, failure_reasons, product_data
+from table_io import read_table
+from timestamps import to_datetime_column
+from uuid_utils import to_uuid_columns
+
+# Fixed dictionaries of the low-cardinality columns, shared by every file so codes mean the same
+# everywhere. Sorted, so sorting on the codes orders rows like sorting the strings would.
+CATEGORY_VALUES = {
+    'Product_Category': sorted(product_data),
+    'Product_Name': sorted(name for names in product_data.values() for name in names),
+    'Payment_Type': sorted(payment_types),
+    'Customer_Country': sorted(countries_cities),
+    'Customer_City': sorted(city for cities in countries_cities.values() for city in cities),
+    'Site_From_Where_Order_Was_Placed': sorted(sites),
+    'Payment_Success_or_Failure': sorted(payment_status),
+    # Successful payments carry 'Payment Successful'; cleansing fills missing reasons with 'No Reason Provided'
+    'Payment_Failure_Reason': sorted(failure_reasons + ['Payment Successful', 'No Reason Provided'])
+}
+
+CATEGORY_DTYPES = {column: pd.CategoricalDtype(values) for column, values in CATEGORY_VALUES.items()}
+
+# Quantities are small whole numbers; float32 round-trips prices with cents below 100,000
+PRICE_DTYPE = np.float32
+
+
+def to_categorical(series: pd.Series, dtype: pd.CategoricalDtype) -> pd.Series:
+    """Encode a column with a fixed dictionary; values outside it are appended after the fixed categories."""
+    unknown = pd.Index(np.asarray(series.dropna().unique(), dtype=object)).difference(dtype.categories)
+    if len(unknown):
+        print(f"{series.name}: {len(unknown)} values outside the fixed dictionary, e.g. {list(unknown[:3])}")
+        dtype = pd.CategoricalDtype(dtype.categories.append(unknown))
+    if isinstance(series.dtype, pd.CategoricalDtype):
+        # Recode by value: astype would keep the file's order, as unordered dtypes with the same values compare equal
+        return series.cat.set_categories(dtype.categories)
+    return series.astype(dtype)
+
+def to_dashboard_schema(df: pd.DataFrame) -> pd.DataFrame:
+    """Convert df in place to the compact dashboard schema (categoricals, small ints, float32); returns df."""
+    for column, dtype in CATEGORY_DTYPES.items():
+        if column in df.columns:
+            df[column] = to_categorical(df[column], dtype)
+    if 'Quantity_ordered' in df.columns:
+        df['Quantity_ordered'] = pd.to_numeric(df['Quantity_ordered'], errors='coerce', downcast='integer')
+    if 'Price' in df.columns:
+        df['Price'] = pd.to_numeric(df['Price'], errors='coerce').astype(PRICE_DTYPE)
+    return to_uuid_columns(df)
+
+def load_dashboard_data(path: str) -> pd.DataFrame:
+    """Load a final dataset (CSV, Parquet or Arrow) in the dashboard schema, with parsed order times."""
+    # Dictionary-encoded Parquet and Arrow columns arrive as categoricals and are only recoded
+    data = to_dashboard_schema(read_table(path, categorical=True))
+    if 'Date_and_Time_When_Order_Was_Placed' in data.columns:
+        data['Date_and_Time_When_Order_Was_Placed'] = to_datetime_column(data['Date_and_Time_When_Order_Was_Placed'])
+    return data
+
+def decode_categories(df: pd.DataFrame) -> pd.DataFrame:
+    """Plain-value copy of a (small) result frame, so plots show only the values present in it."""
+    return df.astype({column: str for column in df.columns if isinstance(df[column].dtype, pd.CategoricalDtype)})
+
+def memory_report(df: pd.DataFrame) -> pd.DataFrame:
+    """Memory used by each column, with its dtype and bytes per row, plus a total row."""
+    usage = df.memory_usage(deep=True, index=False)
+    report = pd.DataFrame({
+        'dtype': df.dtypes.astype(str),
+        'bytes': usage,
+        'bytes_per_row': (usage / max(len(df), 1)).round(2)
+    })
+    report.loc['Total'] = ['', int(usage.sum()), round(usage.sum() / max(len(df), 1), 2)]
+    return report
@@ -1,6 +1,17 @@
 import random
+from datetime import date, datetime, time
+from functools import partial
 from faker import Faker
-import csv
+import os
+import numpy as np
+import pandas as pd
+from sharding import run_sharded
+from uuid_utils import bulk_uuid4
+from checkpoint import load_checkpoint, save_checkpoint, clear_checkpoint
+from csv_writer import encode_csv
+from table_io import TableWriter
+from shard_writer import write_shards, DEFAULT_TARGET_BYTES
+from schema import COLUMN_NAMES
 
 # Initialize Faker instance
 fake = Faker()
@@ -89,37 +100,292 @@ class DataGenerator:
     def gen_payment_failure_reason():
         return random.choice(failure_reasons)
 
-# Generate a single record
-def generate_record():
-    country, city = DataGenerator.gen_country_and_city()
-    category, product_name = DataGenerator.gen_category_and_product_name()
-    payment_success = DataGenerator.gen_payment_success_or_failure()
-    return {
-        "Order_Id": DataGenerator.gen_order_id(),
-        "Customer_Id": DataGenerator.gen_customer_id(),
-        "Customer_Name": DataGenerator.gen_customer_name(),
-        "Product_Id": DataGenerator.gen_product_id(),
-        "Product_Category": category,
-        "Product_Name": product_name,
-        "Payment_Type": DataGenerator.gen_payment_type(),
-        "Quantity_ordered": DataGenerator.gen_quantity_ordered(),
-        "Price": DataGenerator.gen_price(),
-        "Date_and_Time_When_Order_Was_Placed": DataGenerator.gen_date_and_time_when_order_was_placed(),
-        "Customer_Country": country,
-        "Customer_City": city,
-        "Site_From_Where_Order_Was_Placed": DataGenerator.gen_site_from_where_order_was_placed(),
-        "Payment_Transaction_Confirmation_Id": DataGenerator.gen_payment_transaction_confirmation_id(),
-        "Payment_Success_or_Failure": payment_success,
-        "Payment_Failure_Reason": DataGenerator.gen_payment_failure_reason() if payment_success == 'N' else "Payment Successful"
-    }
+# Columns produced by generate_record, in output order
+record_columns = COLUMN_NAMES
+
+def _weighted_choices(elements):
+    """Split a Faker element collection into a value array and a probability vector."""
+    if isinstance(elements, dict):
+        values = np.array(list(elements.keys()), dtype=object)
+        weights = np.array(list(elements.values()), dtype=float)
+        return values, weights / weights.sum()
+    return np.array(list(elements), dtype=object), None
+
+def _flatten_pairs(mapping):
+    """Flatten a {parent: [children]} mapping into parallel arrays plus per-parent offsets."""
+    parents = np.array(list(mapping.keys()), dtype=object)
+    sizes = np.array([len(children) for children in mapping.values()])
+    offsets = np.concatenate(([0], np.cumsum(sizes)[:-1]))
+    children = np.array([child for values in mapping.values() for child in values], dtype=object)
+    return parents, children, sizes, offsets
+
+# BatchDataGenerator builds whole columns at once with the same distributions as DataGenerator
+class BatchDataGenerator:
+    _name_tables = None
+
+    @staticmethod
+    def _names():
+        """Lazily load the Faker person tables used to compose names without per-row calls."""
+        if BatchDataGenerator._name_tables is None:
+            person = next(p for p in fake.providers if type(p).__module__.startswith('faker.providers.person'))
+            BatchDataGenerator._name_tables = {
+                'male': _weighted_choices(person.first_names_male),
+                'female': _weighted_choices(person.first_names_female),
+                'last': _weighted_choices(person.last_names),
+                'prefix_male': _weighted_choices(person.prefixes_male),
+                'prefix_female': _weighted_choices(person.prefixes_female),
+                'suffix_male': _weighted_choices(person.suffixes_male),
+                'suffix_female': _weighted_choices(person.suffixes_female),
+            }
+        return BatchDataGenerator._name_tables
+
+    @staticmethod
+    def gen_uuids(rng, n):
+        return bulk_uuid4(n, rng)
+
+    @staticmethod
+    def gen_customer_names(rng, n):
+        tables = BatchDataGenerator._names()
+        female = rng.random(n) < 0.5
+        # Mirror the Faker en_US name formats: 2% carry a prefix, 2.5% a suffix
+        has_prefix = rng.random(n) < 0.02
+        has_suffix = rng.random(n) < 0.025
+        last_values, last_p = tables['last']
+        names = last_values[rng.choice(len(last_values), size=n, p=last_p)]
+        for gender, rows in (('male', ~female), ('female', female)):
+            first_values, first_p = tables[gender]
+            first = first_values[rng.choice(len(first_values), size=rows.sum(), p=first_p)]
+            names[rows] = first + ' ' + names[rows]
+            for kind, flags in (('prefix', has_prefix), ('suffix', has_suffix)):
+                values, p = tables[f'{kind}_{gender}']
+                selected = rows & flags
+                picks = values[rng.choice(len(values), size=selected.sum(), p=p)]
+                names[selected] = picks + ' ' + names[selected] if kind == 'prefix' else names[selected] + ' ' + picks
+        return names
+
+    @staticmethod
+    def _gen_pairs(rng, n, mapping):
+        parents, children, sizes, offsets = _flatten_pairs(mapping)
+        parent_idx = rng.integers(0, len(parents), size=n)
+        child_idx = offsets[parent_idx] + (rng.random(n) * sizes[parent_idx]).astype(np.int64)
+        return parents[parent_idx], children[child_idx]
+
+    @staticmethod
+    def gen_categories_and_product_names(rng, n):
+        return BatchDataGenerator._gen_pairs(rng, n, product_data)
+
+    @staticmethod
+    def gen_countries_and_cities(rng, n):
+        return BatchDataGenerator._gen_pairs(rng, n, countries_cities)
+
+    @staticmethod
+    def gen_payment_types(rng, n):
+        return np.array(payment_types, dtype=object)[rng.integers(0, len(payment_types), size=n)]
+
+    @staticmethod
+    def gen_quantities_ordered(rng, n):
+        return rng.integers(1, 6, size=n)
+
+    @staticmethod
+    def gen_prices(rng, n):
+        return np.round(rng.uniform(10, 1000, size=n), 2)
+
+    @staticmethod
+    def gen_dates_and_times_when_orders_were_placed(rng, n, now=None):
+        # Same window and resolution as fake.date_time_this_decade(): start of the decade up to now,
+        # in microseconds, so the output does not depend on which path or batch size made it
+        now = np.datetime64(now or datetime.now(), 'us')
+        start = np.datetime64(str(now.astype(object).year // 10 * 10), 'us')
+        ticks = rng.integers(start.astype(np.int64), now.astype(np.int64) + 1, size=n)
+        return ticks.astype('datetime64[us]')
+
+    @staticmethod
+    def gen_sites_from_where_orders_were_placed(rng, n):
+        return np.array(sites, dtype=object)[rng.integers(0, len(sites), size=n)]
+
+    @staticmethod
+    def gen_payment_success_or_failure(rng, n):
+        return np.array(payment_status, dtype=object)[rng.integers(0, len(payment_status), size=n)]
+
+    @staticmethod
+    def gen_payment_failure_reasons(rng, payment_success):
+        reasons = np.array(failure_reasons, dtype=object)[rng.integers(0, len(failure_reasons), size=len(payment_success))]
+        return np.where(payment_success == 'N', reasons, "Payment Successful")
+
+# Columns that must be computed whenever the key column is selected
+column_dependencies = {
+    "Product_Name": ["Product_Category"],
+    "Customer_City": ["Customer_Country"],
+    "Payment_Failure_Reason": ["Payment_Success_or_Failure"]
+}
+
+def plan_columns(selected_columns=None):
+    """Return the set of columns to compute: the selected ones plus everything they depend on."""
+    needed = set(selected_columns or record_columns)
+    pending = list(needed)
+    while pending:
+        for dependency in column_dependencies.get(pending.pop(), []):
+            if dependency not in needed:
+                needed.add(dependency)
+                pending.append(dependency)
+    return needed
+
+def _output_columns(selected_columns):
+    return [col for col in selected_columns if col in record_columns] if selected_columns else record_columns
+
+# Per-row plan: (columns produced, generator); generators run in order and may read earlier columns
+row_column_plan = [
+    (("Customer_Country", "Customer_City"), lambda record: DataGenerator.gen_country_and_city()),
+    (("Product_Category", "Product_Name"), lambda record: DataGenerator.gen_category_and_product_name()),
+    (("Payment_Success_or_Failure",), lambda record: (DataGenerator.gen_payment_success_or_failure(),)),
+    (("Order_Id",), lambda record: (DataGenerator.gen_order_id(),)),
+    (("Customer_Id",), lambda record: (DataGenerator.gen_customer_id(),)),
+    (("Customer_Name",), lambda record: (DataGenerator.gen_customer_name(),)),
+    (("Product_Id",), lambda record: (DataGenerator.gen_product_id(),)),
+    (("Payment_Type",), lambda record: (DataGenerator.gen_payment_type(),)),
+    (("Quantity_ordered",), lambda record: (DataGenerator.gen_quantity_ordered(),)),
+    (("Price",), lambda record: (DataGenerator.gen_price(),)),
+    (("Date_and_Time_When_Order_Was_Placed",), lambda record: (DataGenerator.gen_date_and_time_when_order_was_placed(),)),
+    (("Site_From_Where_Order_Was_Placed",), lambda record: (DataGenerator.gen_site_from_where_order_was_placed(),)),
+    (("Payment_Transaction_Confirmation_Id",), lambda record: (DataGenerator.gen_payment_transaction_confirmation_id(),)),
+    (("Payment_Failure_Reason",), lambda record: (
+        DataGenerator.gen_payment_failure_reason() if record["Payment_Success_or_Failure"] == 'N' else "Payment Successful",
+    ))
+]
+
+# Batch plan: same layout as row_column_plan, but each generator builds whole columns
+batch_column_plan = [
+    (("Customer_Country", "Customer_City"), lambda rng, n, now, cols: BatchDataGenerator.gen_countries_and_cities(rng, n)),
+    (("Product_Category", "Product_Name"), lambda rng, n, now, cols: BatchDataGenerator.gen_categories_and_product_names(rng, n)),
+    (("Payment_Success_or_Failure",), lambda rng, n, now, cols: (BatchDataGenerator.gen_payment_success_or_failure(rng, n),)),
+    (("Order_Id",), lambda rng, n, now, cols: (BatchDataGenerator.gen_uuids(rng, n),)),
+    (("Customer_Id",), lambda rng, n, now, cols: (BatchDataGenerator.gen_uuids(rng, n),)),
+    (("Customer_Name",), lambda rng, n, now, cols: (BatchDataGenerator.gen_customer_names(rng, n),)),
+    (("Product_Id",), lambda rng, n, now, cols: (BatchDataGenerator.gen_uuids(rng, n),)),
+    (("Payment_Type",), lambda rng, n, now, cols: (BatchDataGenerator.gen_payment_types(rng, n),)),
+    (("Quantity_ordered",), lambda rng, n, now, cols: (BatchDataGenerator.gen_quantities_ordered(rng, n),)),
+    (("Price",), lambda rng, n, now, cols: (BatchDataGenerator.gen_prices(rng, n),)),
+    (("Date_and_Time_When_Order_Was_Placed",), lambda rng, n, now, cols: (
+        BatchDataGenerator.gen_dates_and_times_when_orders_were_placed(rng, n, now),
+    )),
+    (("Site_From_Where_Order_Was_Placed",), lambda rng, n, now, cols: (BatchDataGenerator.gen_sites_from_where_orders_were_placed(rng, n),)),
+    (("Payment_Transaction_Confirmation_Id",), lambda rng, n, now, cols: (BatchDataGenerator.gen_uuids(rng, n),)),
+    (("Payment_Failure_Reason",), lambda rng, n, now, cols: (
+        BatchDataGenerator.gen_payment_failure_reasons(rng, cols["Payment_Success_or_Failure"]),
+    ))
+]
+
+# Generate a batch of records as a DataFrame with the same schema as generate_record,
+# computing only the selected columns and their dependencies.
+# `pools` (entity_pools.EntityPool) supply their columns from skewed draws over a fixed set
+# of customers/products instead of fresh random values per row.
+def generate_batch(num_records, rng=None, now=None, selected_columns=None, pools=None):
+    rng = rng if rng is not None else np.random.default_rng()
+    needed = plan_columns(selected_columns)
+    generated = {}
+    for pool in pools or ():
+        pool_columns = [col for col in pool.columns if col in needed]
+        if pool_columns:
+            generated.update(pool.sample(rng, num_records, pool_columns))
+    for columns, generator in batch_column_plan:
+        if needed.intersection(columns).difference(generated):
+            values = generator(rng, num_records, now, generated)
+            generated.update((col, value) for col, value in zip(columns, values) if col not in generated)
+    output_columns = _output_columns(selected_columns)
+    return pd.DataFrame({col: generated[col] for col in output_columns}, columns=output_columns)
+
+# Generate a single record, computing only the selected columns and their dependencies
+def generate_record(selected_columns=None):
+    needed = plan_columns(selected_columns)
+    record = {}
+    for columns, generator in row_column_plan:
+        if needed.intersection(columns):
+            record.update(zip(columns, generator(record)))
+    return {col: record[col] for col in record_columns if col in record}
 
 # Write data to CSV for only selected columns
-def write_to_csv(file_name, num_records, selected_columns):
-    with open(file_name, mode='w', newline='') as file:
-        writer = csv.DictWriter(file, fieldnames=selected_columns)
-        writer.writeheader()
-        for _ in range(num_records):
-            record = generate_record()
-            filtered_record = {k: v for k, v in record.items() if k in selected_columns}
-            writer.writerow(filtered_record)
+# The output format follows file_format or the file extension: .csv, .parquet or .arrow
+# Entity pools and a seeded rng only exist in batch mode, so passing either selects it (default batch size)
+def write_to_csv(file_name, num_records, selected_columns, batch_size=None, rng=None, pools=None, file_format=None):
+    if batch_size or pools is not None or rng is not None:
+        write_batches_to_csv(file_name, num_records, selected_columns, batch_size or 100_000, rng, pools=pools,
+                             file_format=file_format)
+        return
+    # Records are still generated one at a time, but written in large batches
+    with TableWriter(file_name, file_format) as writer:
+        for start in range(0, num_records, 10_000):
+            records = [generate_record(selected_columns) for _ in range(min(10_000, num_records - start))]
+            writer.write(pd.DataFrame(records, columns=selected_columns))
+
+# Batch mode: build and write batch_size rows at a time
+def write_batches_to_csv(file_name, num_records, selected_columns, batch_size=100_000, rng=None, now=None, pools=None,
+                         file_format=None):
+    rng = rng if rng is not None else np.random.default_rng()
+    with TableWriter(file_name, file_format) as writer:
+        for start in range(0, num_records, batch_size):
+            writer.write(generate_batch(min(batch_size, num_records - start), rng, now, selected_columns, pools))
+
+# Sharded mode: write compressed CSV shards of about target_bytes each plus a manifest for bulk loads
+def write_to_shards(output_dir, num_records, selected_columns, batch_size=100_000, compression='gzip',
+                    target_bytes=DEFAULT_TARGET_BYTES, rng=None, now=None, pools=None, workers=None):
+    rng = rng if rng is not None else np.random.default_rng()
+    batches = (generate_batch(min(batch_size, num_records - start), rng, now, selected_columns, pools)
+               for start in range(0, num_records, batch_size))
+    return write_shards(batches, output_dir, compression=compression, target_bytes=target_bytes, workers=workers)
+
+# Write one shard of a parallel run with its own seeded generator
+def write_shard(part_file, num_records, start_index, selected_columns, seed, now=None, batch_size=100_000, pools=None):
+    write_batches_to_csv(part_file, num_records, selected_columns, batch_size, np.random.default_rng(seed), now, pools)
+
+# Parallel mode: split num_records across a process pool, one seeded part file per shard.
+# The same seed, worker count and `now` reproduce byte-identical output; workers defaults to
+# sharding.DEFAULT_WORKERS rather than the machine's CPU count, and `now` to today's midnight,
+# so reruns on any machine on the same day match without pinning either. Pools are shipped to
+# every worker so all shards draw from the same customers and products.
+def write_to_csv_parallel(file_name, num_records, selected_columns, workers=None, seed=0, concatenate=True, now=None, pools=None):
+    now = now or datetime.combine(date.today(), time())
+    return run_sharded(partial(write_shard, now=now, pools=pools), file_name, num_records, selected_columns,
+                       workers=workers, master_seed=seed, concatenate=concatenate)
+
+# Seed of one block of a resumable job; depends only on the master seed and the block number
+def block_rng(seed, block):
+    return np.random.default_rng(np.random.SeedSequence(seed, spawn_key=(block,)))
+
+# Resumable mode: write block_size rows at a time and checkpoint rows written, the next block
+# (whose RNG is derived from seed and block number) and the byte offset after every block.
+# Rerunning with the same arguments resumes from the last complete block and yields the same
+# file as an uninterrupted run. Pools must be rebuilt identically by the caller on resume.
+def write_to_csv_resumable(file_name, num_records, selected_columns, seed=0, block_size=100_000,
+                           checkpoint_file=None, now=None, pools=None):
+    checkpoint_file = checkpoint_file or file_name + '.checkpoint.json'
+    job = {
+        "file_name": file_name,
+        "num_records": num_records,
+        "selected_columns": list(selected_columns),
+        "seed": seed,
+        "block_size": block_size
+    }
+    state = load_checkpoint(checkpoint_file)
+    resuming = (state is not None and all(state.get(key) == value for key, value in job.items())
+                and os.path.exists(file_name) and os.path.getsize(file_name) >= state["offset"])
+    if resuming:
+        now = datetime.fromisoformat(state["now"])
+        print(f"Resuming {file_name} at block {state['next_block']} ({state['rows_written']} rows written)")
+    else:
+        now = now or datetime.combine(date.today(), time())
+        state = dict(job, now=now.isoformat(), next_block=0, rows_written=0, offset=0)
 
+    num_blocks = -(-num_records // block_size)
+    with open(file_name, 'r+b' if resuming else 'wb') as file:
+        # Drop anything written after the last checkpointed block
+        file.truncate(state["offset"])
+        file.seek(state["offset"])
+        for block in range(state["next_block"], num_blocks):
+            size = min(block_size, num_records - block * block_size)
+            batch = generate_batch(size, block_rng(seed, block), now, selected_columns, pools)
+            file.write(encode_csv(batch, header=block == 0))
+            file.flush()
+            os.fsync(file.fileno())
+            state.update(next_block=block + 1, rows_written=state["rows_written"] + size, offset=file.tell())
+            save_checkpoint(checkpoint_file, state)
+    clear_checkpoint(checkpoint_file)
@@ -1,10 +1,15 @@
+import argparse
+from functools import partial
+import numpy as np
 import pandas as pd
 import random
-from faker import Faker
 import streamlit as st
-
-# Initialize the Faker generator
-fake = Faker()
+from uuid_utils import UUIDArray, UUID_COLUMNS, to_uuid_columns, uuid4_bytes
+from data_generator import BatchDataGenerator, _flatten_pairs
+from sharding import map_bounded
+from table_io import TableWriter, read_table, write_table, iter_table_chunks
+from shard_writer import write_shards, iter_frame_chunks, load_manifest, COMPRESSIONS, DEFAULT_TARGET_BYTES
+from schema import OUTPUT_COLUMN_ORDER
 
 # Define the structured product data with relationships
 product_data = {
@@ -37,99 +42,227 @@ countries_cities = {
     'Canada': ['Toronto', 'Vancouver', 'Montreal', 'Calgary', 'Ottawa']
 }
 
-def load_data(input_csv_file):
-    """Load data from a CSV file into a DataFrame."""
-    return pd.read_csv(input_csv_file)
-
-def save_data(df, output_csv_file):
-    """Save processed DataFrame to a CSV file with specific column order."""
-    column_order = [
-        'Order_Id',
-        'Customer_Id',
-        'Customer_Name',
-        'Product_Id',
-        'Product_Category',
-        'Product_Name',
-        'Quantity_ordered',
-        'Price',
-        'Date_and_Time_When_Order_Was_Placed',
-        'Customer_Country',
-        'Customer_City',
-        'Site_From_Where_Order_Was_Placed',
-        'Payment_Type',
-        'Payment_Transaction_Confirmation_Id',
-        'Payment_Success_or_Failure',
-        'Payment_Failure_Reason'
-    ]
-    
-    # Filter the DataFrame to include only the specified columns that exist
-    df = df[column_order] if set(column_order).issubset(df.columns) else df
-    df.to_csv(output_csv_file, mode='w', header=True, index=False)
+# Column order of the processed output
+column_order = OUTPUT_COLUMN_ORDER
+
+# Reverse lookup from product name to its category
+product_categories = {product: category for category, products in product_data.items() for product in products}
+
+def load_data(input_csv_file, file_format=None):
+    """Load data from a CSV, Parquet or Arrow IPC file into a DataFrame, with UUID columns as 16-byte UUIDArray."""
+    return to_uuid_columns(read_table(input_csv_file, file_format=file_format))
+
+def order_columns(df):
+    """Reorder the DataFrame to column_order when it has all of those columns."""
+    return df[column_order] if set(column_order).issubset(df.columns) else df
+
+def save_data(df, output_csv_file, file_format=None):
+    """Save processed DataFrame to a CSV, Parquet or Arrow IPC file with specific column order."""
+    write_table(order_columns(df), output_csv_file, file_format)
+
+def save_data_shards(df, output_dir, compression='gzip', target_bytes=DEFAULT_TARGET_BYTES):
+    """Save processed DataFrame as compressed CSV shards plus a manifest; returns the manifest path."""
+    return write_shards(iter_frame_chunks(order_columns(df)), output_dir, compression=compression, target_bytes=target_bytes)
 
 def map_product_to_category(product_name):
     """Map product names to categories based on structured product_data."""
-    for category, products in product_data.items():
-        if product_name in products:
-            return category
+    if product_name in product_categories:
+        return product_categories[product_name]
     return random.choice(list(product_data.keys()))  # Fallback to a random category if not found
 
-def handle_invalid_ids(df):
-    """Replace invalid IDs with newly generated UUIDs."""
-    invalid_id_columns = ['Product_Id', 'Order_Id', 'Customer_Id', 'Payment_Transaction_Confirmation_Id']
-    for column in invalid_id_columns:
+def map_products_to_categories(product_names, rng=None):
+    """Vectorized map_product_to_category: a reverse-lookup join, random categories for unknown names."""
+    rng = rng if rng is not None else np.random.default_rng()
+    categories = np.asarray(pd.Series(product_names).map(product_categories), dtype=object)
+    unknown = pd.isna(categories)
+    if unknown.any():
+        names = np.array(list(product_data.keys()), dtype=object)
+        categories[unknown] = names[rng.integers(0, len(names), size=int(unknown.sum()))]
+    return categories
+
+def pick_children(parents, mapping, rng=None):
+    """Draw one child of each parent uniformly, e.g. a city for every country, using flat arrays.
+
+    Parents missing from the mapping (or missing values) get a child drawn from all children,
+    as map_products_to_categories does for unknown names.
+    """
+    rng = rng if rng is not None else np.random.default_rng()
+    names, children, sizes, offsets = _flatten_pairs(mapping)
+    codes = pd.Index(names).get_indexer(pd.Index(parents, dtype=object))
+    child_idx = offsets[codes] + (rng.random(len(codes)) * sizes[codes]).astype(np.int64)
+    unknown = codes < 0
+    if unknown.any():
+        child_idx[unknown] = rng.integers(0, len(children), size=int(unknown.sum()))
+    return children[child_idx]
+
+def handle_invalid_ids(df, rng=None):
+    """Replace invalid IDs with newly generated UUIDs, one fresh ID per invalid cell.
+
+    ID columns become UUIDArray; anything that does not parse as a UUID ('InvalidUUID',
+    'InvalidProductId', 'InvalidCustomerId', missing values) is invalid.
+    """
+    for column in UUID_COLUMNS:
         if column in df.columns:
-            df[column] = df[column].replace('InvalidUUID', fake.uuid4()).replace('InvalidProductId', fake.uuid4()).replace('InvalidCustomerId', fake.uuid4())
+            ids = UUIDArray.from_strings(df[column]) if not isinstance(df[column].array, UUIDArray) else df[column].array.copy()
+            invalid = ~ids.valid
+            if invalid.any():
+                ids[invalid] = UUIDArray.from_bytes(uuid4_bytes(int(invalid.sum()), rng))
+            df[column] = ids
 
-def generate_fake_customer_data(df):
+def generate_fake_customer_data(df, rng=None):
     """Generate fake customer data with a consistent relationship between country and city."""
+    rng = rng if rng is not None else np.random.default_rng()
     if any(col in df.columns for col in ['Customer_Country', 'Customer_City', 'Customer_Name']):
-        df['Customer_Country'] = [random.choice(list(countries_cities.keys())) for _ in range(len(df))]
-        df['Customer_City'] = df['Customer_Country'].apply(lambda country: random.choice(countries_cities[country]))
-        df['Customer_Name'] = [fake.name() for _ in range(len(df))]
+        countries = np.array(list(countries_cities.keys()), dtype=object)
+        df['Customer_Country'] = countries[rng.integers(0, len(countries), size=len(df))]
+        df['Customer_City'] = pick_children(df['Customer_Country'], countries_cities, rng)
+        df['Customer_Name'] = BatchDataGenerator.gen_customer_names(rng, len(df))
 
-def handle_numeric_data(df):
-    """Handle numeric fields by replacing invalid values."""
+def handle_numeric_data(df, rng=None):
+    """Handle numeric fields by replacing invalid values, with a fresh random value per invalid cell."""
+    rng = rng if rng is not None else np.random.default_rng()
     # Normalize column names
     df.columns = df.columns.str.strip().str.replace(' ', '_')
 
     # Check if 'Quantity_ordered' exists
     if 'Quantity_ordered' in df.columns:
-        df['Quantity_ordered'] = pd.to_numeric(df['Quantity_ordered'], errors='coerce').fillna(random.randint(1, 5))
-        df['Quantity_ordered'] = df['Quantity_ordered'].replace(-1, 1)
+        quantity = pd.to_numeric(df['Quantity_ordered'], errors='coerce').to_numpy(dtype=float, copy=True)
+        missing = np.isnan(quantity)
+        quantity[missing] = rng.integers(1, 6, size=int(missing.sum()))
+        quantity[quantity == -1] = 1
+        df['Quantity_ordered'] = quantity.astype(np.int64)
 
     # Check if 'Price' exists
     if 'Price' in df.columns:
-        df['Price'] = pd.to_numeric(df['Price'], errors='coerce').fillna(round(random.uniform(10, 1000), 2))
+        price = pd.to_numeric(df['Price'], errors='coerce').to_numpy(dtype=float, copy=True)
+        missing = np.isnan(price)
+        price[missing] = np.round(rng.uniform(10, 1000, size=int(missing.sum())), 2)
+        df['Price'] = price
 
 def fill_payment_failure_reason(df):
     """Fill in reasons for payment failures if the column exists."""
     if 'Payment_Failure_Reason' in df.columns:
         df['Payment_Failure_Reason'] = df['Payment_Failure_Reason'].fillna("No Reason Provided")
 
-def generate_fake_data(df, selected_columns):
-    """Generate fake data and handle corrections for selected columns."""
+def generate_fake_data(df, selected_columns, rng=None):
+    """Generate fake data and handle corrections for selected columns.
+
+    Every step works on whole columns; pass a seeded numpy Generator as rng for reproducible output.
+    """
+    rng = rng if rng is not None else np.random.default_rng()
+
     # Handle invalid IDs for selected columns
-    handle_invalid_ids(df)
+    handle_invalid_ids(df, rng)
 
     # Generate fake customer data if related columns are selected
     if any(col in selected_columns for col in ['Customer_Country', 'Customer_City', 'Customer_Name']):
-        generate_fake_customer_data(df)
+        generate_fake_customer_data(df, rng)
 
     # Generate product category and product name
     if 'Product_Name' in selected_columns:
-        df['Product_Category'] = df['Product_Name'].apply(map_product_to_category)
-        df['Product_Name'] = df['Product_Category'].apply(lambda category: random.choice(product_data[category]))
+        df['Product_Category'] = map_products_to_categories(df['Product_Name'], rng)
+        df['Product_Name'] = pick_children(df['Product_Category'], product_data, rng)
 
     # Generate payment types if column is selected
     if 'Payment_Type' in selected_columns:
-        df['Payment_Type'] = [random.choice(payment_types) for _ in range(len(df))]
+        df['Payment_Type'] = np.array(payment_types, dtype=object)[rng.integers(0, len(payment_types), size=len(df))]
 
     # Handle numeric data if related columns are selected
     if any(col in selected_columns for col in ['Quantity_ordered', 'Price']):
-        handle_numeric_data(df)
+        handle_numeric_data(df, rng)
 
     # Fill in payment failure reasons if the column is selected
     fill_payment_failure_reason(df)
 
     # Keep only selected columns that are present in the DataFrame
     return df[selected_columns] if selected_columns else df  # Return original DataFrame if no columns selected
+
+def clean_chunks(chunks, selected_columns=None, rng=None):
+    """Run the cleansing steps on each chunk of a stream and yield it in save_data column order."""
+    rng = rng if rng is not None else np.random.default_rng()
+    for chunk in chunks:
+        columns = [col for col in selected_columns if col in chunk.columns] if selected_columns else chunk.columns.tolist()
+        yield order_columns(generate_fake_data(chunk[columns].copy(), columns, rng))
+
+def clean_chunk(item, selected_columns=None, seed=0):
+    """Cleanse one (chunk_index, chunk) pair with a generator derived from seed and the chunk index."""
+    chunk_index, chunk = item
+    rng = np.random.default_rng(np.random.SeedSequence(seed, spawn_key=(chunk_index,)))
+    return next(clean_chunks([chunk], selected_columns, rng))
+
+def clean_chunks_parallel(chunks, selected_columns=None, workers=None, seed=0, ordered=True, max_pending=None):
+    """Cleanse chunks on a process pool with bounded read-ahead.
+
+    Each chunk is seeded from seed and its index, so ordered output is the same for any worker
+    count. With ordered=False chunks are yielded as they finish, which keeps every worker busy
+    when chunk times vary.
+    """
+    cleaner = partial(clean_chunk, selected_columns=selected_columns, seed=seed)
+    return map_bounded(cleaner, enumerate(chunks), workers, ordered, max_pending)
+
+def write_chunks(chunks, output_file, file_format=None, shards=None):
+    """Append cleaned chunks to output_file with one header; returns the first chunk for previews.
+
+    With shards (a shard_writer compression: 'gzip', 'zstd' or 'none'), output_file is a directory
+    that gets compressed CSV shards plus a manifest for bulk loads instead.
+    """
+    if shards:
+        first = []
+        def keep_first(chunks):
+            for chunk in chunks:
+                if not first:
+                    first.append(chunk)
+                yield chunk
+        manifest = load_manifest(write_shards(keep_first(chunks), output_file, compression=COMPRESSIONS[shards]))
+        print(f"Cleaned {manifest['total_rows']} rows into {len(manifest['shards'])} shards in {output_file}")
+        return first[0] if first else None
+    first_chunk = None
+    with TableWriter(output_file, file_format) as writer:
+        for chunk in chunks:
+            writer.write(chunk)
+            if first_chunk is None:
+                first_chunk = chunk
+    print(f"Cleaned {writer.rows_written} rows into {output_file}")
+    return first_chunk
+
+def process_data_stream(input_file, output_file, selected_columns=None, chunk_size=100_000, rng=None, file_format=None,
+                        shards=None):
+    """Cleanse a rough file chunk by chunk into output_file with one header and constant memory.
+
+    input_file is a path or an uploaded file object; the output format follows file_format or the
+    output extension, or output_file is a shard directory (see write_chunks). Returns the first
+    cleaned chunk for previews.
+    """
+    chunks = clean_chunks(iter_table_chunks(input_file, chunk_size), selected_columns, rng)
+    return write_chunks(chunks, output_file, file_format, shards)
+
+def process_data_parallel(input_file, output_file, selected_columns=None, chunk_size=100_000, workers=None,
+                          seed=0, ordered=True, file_format=None, shards=None):
+    """Like process_data_stream, with the chunks cleansed on a pool of worker processes."""
+    chunks = clean_chunks_parallel(iter_table_chunks(input_file, chunk_size), selected_columns, workers, seed, ordered)
+    return write_chunks(chunks, output_file, file_format, shards)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Cleanse a rough data file chunk by chunk.")
+    parser.add_argument('input_file', help="Rough .csv, .parquet or .arrow file")
+    parser.add_argument('output_file', help="Cleaned output; the format follows the extension")
+    parser.add_argument('--chunk-size', type=int, default=100_000, help="Rows cleansed per chunk")
+    parser.add_argument('--columns', nargs='+', default=None, help="Columns to keep (default: all)")
+    parser.add_argument('--seed', type=int, default=None)
+    parser.add_argument('--workers', type=int, default=1, help="Worker processes; 0 uses every core")
+    parser.add_argument('--unordered', action='store_true', help="Write chunks as they finish (parallel mode only)")
+    parser.add_argument('--shards', choices=COMPRESSIONS, default=None,
+                        help="Write output_file as a directory of CSV shards with this compression plus a manifest")
+    args = parser.parse_args()
+
+    if args.workers == 1:
+        process_data_stream(args.input_file, args.output_file, args.columns, args.chunk_size,
+                            np.random.default_rng(args.seed), shards=args.shards)
+    else:
+        process_data_parallel(args.input_file, args.output_file, args.columns, args.chunk_size,
+                              args.workers or None, args.seed or 0, not args.unordered, shards=args.shards)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,342 @@
+import argparse
+import json
+import math
+import os
+import shutil
+import tempfile
+import numpy as np
+import pandas as pd
+from checkpoint import load_checkpoint, save_checkpoint
+from profiler import source_stamp
+from schema import SCHEMA, STRING_KINDS
+from table_io import iter_table_chunks
+from uuid_utils import UUIDDtype
+
+# Persistent index of every row merged so far
+DEFAULT_INDEX_DIR = 'dedup_index'
+
+MANIFEST_NAME = 'manifest.json'
+
+BLOOM_NAME = 'bloom.npy'
+
+# Rows the Bloom filter is sized for; it is rebuilt twice as large when the index outgrows it
+BLOOM_CAPACITY = 10_000_000
+
+# False-positive rate of the Bloom filter at capacity; false positives only cost a segment lookup
+BLOOM_ERROR_RATE = 0.01
+
+# Fixed so hashes stay comparable between runs (it is pandas' default key)
+HASH_KEY = '0123456789123456'
+
+
+def _leftover_hashes(values: np.ndarray, parsed: np.ndarray = None) -> np.ndarray:
+    """Hash of the text of each present value that did not parse, 0 elsewhere.
+
+    Only those few values are hashed as strings; typed columns get zeros and cost almost nothing.
+    """
+    hashes = np.zeros(len(values), dtype=np.uint64)
+    if parsed is None:
+        return hashes
+    rest = ~parsed & ~pd.isna(values)
+    if rest.any():
+        hashes[rest] = pd.util.hash_array(values[rest].astype(str).astype(object), hash_key=HASH_KEY, categorize=False)
+    return hashes
+
+def _text(column: pd.Series) -> np.ndarray:
+    return column.astype(str).where(column.notna(), None).to_numpy(dtype=object)
+
+def _canonical_columns(column: pd.Series, kind: str = None) -> list:
+    """Arrays that hash each value of a column the same whatever the column's dtype.
+
+    Values of number and timestamp columns (and numbers in unregistered columns) become float64
+    or int64 nanoseconds, whether the column is typed or holds text, as rough chunks do when some
+    values do not convert; the values that do not parse are hashed as text in an extra array of
+    their hashes. `kind` is the column's schema kind, if any. Other values, UUIDArray ones
+    included, are hashed as their text.
+    """
+    if pd.api.types.is_bool_dtype(column):
+        return [_text(column)]
+    if isinstance(column.dtype, UUIDDtype):
+        # Canonical text, like the UUIDs written to files; invalid values are missing, not 'nan'
+        text = column.array.to_strings()
+        text[~column.array.valid] = None
+        return [text]
+    if pd.api.types.is_datetime64_any_dtype(column):
+        if column.dt.tz is not None:
+            column = column.dt.tz_convert(None)
+        return [column.dt.as_unit('ns').to_numpy().view(np.int64), _leftover_hashes(column)]
+    if pd.api.types.is_numeric_dtype(column):
+        return [column.to_numpy(dtype='float64', na_value=np.nan), _leftover_hashes(column)]
+    values = column.to_numpy(dtype=object)
+    if kind == 'timestamp':
+        times = pd.to_datetime(column, format='ISO8601', errors='coerce', utc=True).dt.tz_convert(None)
+        return [times.dt.as_unit('ns').to_numpy().view(np.int64), _leftover_hashes(values, times.notna().to_numpy())]
+    if kind not in STRING_KINDS:
+        numbers = pd.to_numeric(column, errors='coerce').to_numpy(dtype='float64', na_value=np.nan)
+        return [numbers, _leftover_hashes(values, ~np.isnan(numbers))]
+    if pd.api.types.is_string_dtype(column):
+        return [column]
+    return [_text(column)]
+
+def row_hashes(df: pd.DataFrame, columns: list = None) -> np.ndarray:
+    """64-bit hash of each row over `columns` (all by default).
+
+    Numbers are hashed as float64, timestamps as int64 nanoseconds since the epoch (UTC for
+    time zone aware ones) and other columns, UUIDArray ones included, as their canonical text.
+    Numbers and timestamps held as text (rough chunks keep such columns as text when some values
+    are invalid) are parsed first, so a row hashes the same whichever chunk it is in, whether it was
+    read from CSV, Parquet or Arrow and at whatever precision its times are stored. Two distinct
+    rows collide with probability about n^2 / 2^65.
+    """
+    frame = df if columns is None else df[columns]
+    normalized = {}
+    for name, column in frame.items():
+        arrays = _canonical_columns(column, SCHEMA[name].kind if name in SCHEMA else None)
+        normalized.update(((name, part), array) for part, array in enumerate(arrays))
+    return pd.util.hash_pandas_object(pd.DataFrame(normalized), index=False, hash_key=HASH_KEY,
+                                      categorize=False).to_numpy()
+
+
+class BloomFilter:
+    """Bit array with k probes per hash (double hashing on the two halves of a 64-bit row hash)."""
+
+    def __init__(self, capacity: int = BLOOM_CAPACITY, error_rate: float = BLOOM_ERROR_RATE, bits: np.ndarray = None):
+        self.capacity = capacity
+        self.error_rate = error_rate
+        size = math.ceil(-capacity * math.log(error_rate) / math.log(2) ** 2)
+        self.size = max(64, -(-size // 8) * 8)
+        self.probes = max(1, round(self.size / capacity * math.log(2)))
+        self.bits = np.zeros(self.size // 8, dtype=np.uint8) if bits is None else bits
+
+    def _positions(self, hashes: np.ndarray) -> np.ndarray:
+        low = hashes & np.uint64(0xFFFFFFFF)
+        step = (hashes >> np.uint64(32)) | np.uint64(1)
+        probes = np.arange(self.probes, dtype=np.uint64)[:, None]
+        return (low + probes * step) % np.uint64(self.size)
+
+    def add(self, hashes: np.ndarray):
+        positions = self._positions(hashes).ravel()
+        np.bitwise_or.at(self.bits, positions >> np.uint64(3), (1 << (positions & np.uint64(7))).astype(np.uint8))
+
+    def contains(self, hashes: np.ndarray) -> np.ndarray:
+        """False means definitely absent; True means probably present."""
+        positions = self._positions(hashes)
+        found = (self.bits[positions >> np.uint64(3)] >> (positions & np.uint64(7)).astype(np.uint8)) & 1
+        return found.all(axis=0)
+
+
+class HashIndex:
+    """Persistent set of row hashes in a directory, for duplicate checks against everything added before.
+
+    Hashes live on disk in sorted segment files that are memory-mapped for binary search; a
+    Bloom filter in front, memory-mapped too so only the pages a batch sets are written back,
+    answers most "new row" lookups without touching them. Each added batch becomes a new
+    segment and similar-sized segments are merged, so a batch costs about its own size times
+    log(index size). The manifest also keeps running row and duplicate counts. The index
+    remembers the columns it hashes; None means whole rows.
+    """
+
+    def __init__(self, path: str = DEFAULT_INDEX_DIR, columns: list = None, capacity: int = BLOOM_CAPACITY,
+                 error_rate: float = BLOOM_ERROR_RATE):
+        self.path = path
+        os.makedirs(path, exist_ok=True)
+        state = load_checkpoint(os.path.join(path, MANIFEST_NAME))
+        if state is None:
+            state = {
+                'columns': list(columns) if columns else None,
+                'capacity': capacity,
+                'error_rate': error_rate,
+                'segments': [],
+                'next_segment': 0,
+                'hashes': 0,
+                'rows_seen': 0,
+                'duplicates': 0
+            }
+        elif columns and state['columns'] != list(columns):
+            raise ValueError(f"Index {path} hashes columns {state['columns']}, not {list(columns)}")
+        self.state = state
+        self.columns = state['columns']
+        self.segments = [self._load_segment(name) for name in state['segments']]
+        self.obsolete = []
+        self.bloom = self._open_bloom()
+
+    def _open_bloom(self) -> BloomFilter:
+        """Map the saved Bloom filter, rebuilding it from the segments if it is missing or of another capacity."""
+        bloom_path = os.path.join(self.path, BLOOM_NAME)
+        if self.state['segments'] and os.path.exists(bloom_path):
+            bloom = BloomFilter(self.state['capacity'], self.state['error_rate'], np.load(bloom_path, mmap_mode='r+'))
+            if bloom.bits.shape == (bloom.size // 8,):
+                return bloom
+            del bloom
+        return self._rebuild_bloom(self.state['capacity'])
+
+    def _load_segment(self, name: str) -> np.ndarray:
+        return np.load(os.path.join(self.path, name), mmap_mode='r')
+
+    def __len__(self) -> int:
+        return self.state['hashes']
+
+    def contains(self, hashes: np.ndarray) -> np.ndarray:
+        found = self.bloom.contains(hashes) if len(self) else np.zeros(len(hashes), dtype=bool)
+        candidates = np.flatnonzero(found)
+        if len(candidates) == 0:
+            return found
+        wanted = hashes[candidates]
+        hit = np.zeros(len(candidates), dtype=bool)
+        for segment in self.segments:
+            positions = np.minimum(np.searchsorted(segment, wanted), len(segment) - 1)
+            hit |= segment[positions] == wanted
+        found[candidates] = hit
+        return found
+
+    def duplicated(self, df: pd.DataFrame) -> np.ndarray:
+        """Mask of rows already in the index or repeating an earlier row of df; the index is not changed."""
+        hashes = row_hashes(df, self.columns)
+        return self.contains(hashes) | pd.Series(hashes).duplicated().to_numpy()
+
+    def add(self, df: pd.DataFrame) -> np.ndarray:
+        """Add a batch: returns the duplicate mask (as duplicated()) and records the new rows' hashes."""
+        hashes = row_hashes(df, self.columns)
+        duplicates = self.contains(hashes) | pd.Series(hashes).duplicated().to_numpy()
+        new_hashes = hashes[~duplicates]
+        if len(new_hashes):
+            self._write_segment(np.sort(new_hashes))
+        self.state['rows_seen'] += len(df)
+        self.state['duplicates'] += int(duplicates.sum())
+        self._save()
+        return duplicates
+
+    def _write_segment(self, hashes: np.ndarray):
+        names = self.state['segments']
+        names.append(self._save_segment(hashes))
+        self.segments.append(self._load_segment(names[-1]))
+        # Merge the newest segment into the previous one while they are of similar size
+        while len(names) > 1 and 2 * len(self.segments[-1]) >= len(self.segments[-2]):
+            merged = np.sort(np.concatenate([self.segments[-2], self.segments[-1]]), kind='stable')
+            old = names[-2:]
+            names[-2:] = [self._save_segment(merged)]
+            self.segments[-2:] = [self._load_segment(names[-1])]
+            self.obsolete.extend(old)
+        self.state['hashes'] += len(hashes)
+        if self.state['hashes'] > self.bloom.capacity:
+            self.bloom = self._rebuild_bloom(2 * self.state['hashes'])
+        else:
+            self.bloom.add(hashes)
+
+    def _save_segment(self, hashes: np.ndarray) -> str:
+        name = f"segment-{self.state['next_segment']:06d}.npy"
+        self.state['next_segment'] += 1
+        np.save(os.path.join(self.path, name), hashes)
+        return name
+
+    def _rebuild_bloom(self, capacity: int) -> BloomFilter:
+        """Build a Bloom filter of the given capacity over every segment, save it and return it mapped."""
+        bloom = BloomFilter(capacity, self.state['error_rate'])
+        for segment in self.segments:
+            bloom.add(np.asarray(segment))
+        tmp_path = os.path.join(self.path, 'bloom.tmp.npy')
+        np.save(tmp_path, bloom.bits)
+        # Release the old mapping before its file is replaced
+        self.bloom = None
+        os.replace(tmp_path, os.path.join(self.path, BLOOM_NAME))
+        bloom.bits = np.load(os.path.join(self.path, BLOOM_NAME), mmap_mode='r+')
+        self.state['capacity'] = capacity
+        return bloom
+
+    def _save(self):
+        # The Bloom filter is flushed before the manifest, so it always covers the segments listed
+        self.bloom.bits.flush()
+        save_checkpoint(os.path.join(self.path, MANIFEST_NAME), self.state)
+        # Merged-away segments are only deleted once the manifest no longer lists them
+        for name in self.obsolete:
+            os.remove(os.path.join(self.path, name))
+        self.obsolete = []
+
+    def stats(self) -> dict:
+        return {key: self.state[key] for key in ('columns', 'hashes', 'rows_seen', 'duplicates')}
+
+
+class DuplicateCounter:
+    """In-memory set of row hashes counting the rows of one stream that repeat an earlier row.
+
+    Faster than a HashIndex when nothing needs to persist; memory grows by about 70 bytes per distinct row.
+    """
+
+    def __init__(self, columns: list = None):
+        self.columns = columns
+        self.seen = set()
+        self.rows = 0
+
+    def add(self, df: pd.DataFrame) -> int:
+        """Add a batch and return how many of its rows were duplicates."""
+        before = len(self.seen)
+        self.seen.update(row_hashes(df, self.columns).tolist())
+        self.rows += len(df)
+        return len(df) - (len(self.seen) - before)
+
+    def counts(self) -> dict:
+        return {'rows': self.rows, 'duplicates': self.rows - len(self.seen), 'unique': len(self.seen)}
+
+
+def dedup_chunks(chunks, index: HashIndex, stats: dict = None):
+    """Yield each chunk without the rows already in the index (or earlier in the stream), adding the rest."""
+    stats = {} if stats is None else stats
+    for chunk in chunks:
+        duplicates = index.add(chunk)
+        stats['rows'] = stats.get('rows', 0) + len(chunk)
+        stats['duplicates'] = stats.get('duplicates', 0) + int(duplicates.sum())
+        if not duplicates.all():
+            yield chunk[~duplicates]
+
+def count_duplicates(chunks, columns: list = None, spill_dir: str = None) -> dict:
+    """Count duplicate rows in a stream of chunks with a temporary on-disk index; memory stays bounded."""
+    tmp_dir = tempfile.mkdtemp(prefix='dedup-', dir=spill_dir)
+    try:
+        index = HashIndex(tmp_dir, columns)
+        rows = sum(len(chunk) for chunk in dedup_chunks(chunks, index))
+        return {'rows': index.state['rows_seen'], 'duplicates': index.state['duplicates'], 'unique': rows}
+    finally:
+        shutil.rmtree(tmp_dir, ignore_errors=True)
+
+def duplicates_path(path: str) -> str:
+    """Sidecar file the duplicate count of path is written to."""
+    return path + '.duplicates.json'
+
+def write_duplicate_counts(counts: dict, path: str, columns: list = None) -> dict:
+    """Save the duplicate counts of a file, stamped like its profile so a changed file is recounted."""
+    counts = dict(counts, columns=list(columns) if columns else None, source=source_stamp(path))
+    with open(duplicates_path(path), 'w') as file:
+        json.dump(counts, file, indent=2)
+    return counts
+
+def file_duplicates(path: str, columns: list = None, chunk_size: int = 100_000) -> dict:
+    """Duplicate counts of a file: read from its sidecar when the file is unchanged, else counted in one pass."""
+    saved = load_checkpoint(duplicates_path(path))
+    source = source_stamp(path)
+    if saved and saved['columns'] == (list(columns) if columns else None) and \
+            (saved['source']['bytes'], saved['source']['mtime']) == (source['bytes'], source['mtime']):
+        return saved
+    return write_duplicate_counts(count_duplicates(iter_table_chunks(path, chunk_size), columns), path, columns)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Check a file for duplicate rows, or deduplicate it against a persistent index.")
+    parser.add_argument('file', help="CSV, Parquet or Arrow file")
+    parser.add_argument('--columns', nargs='+', default=None, help="Key columns (default: whole rows)")
+    parser.add_argument('--index', default=None, help=f"Check against and add to this index (e.g. {DEFAULT_INDEX_DIR})")
+    parser.add_argument('--chunk-size', type=int, default=100_000)
+    args = parser.parse_args()
+
+    if args.index:
+        chunks = iter_table_chunks(args.file, args.chunk_size)
+        index = HashIndex(args.index, args.columns)
+        stats = {}
+        new_rows = sum(len(chunk) for chunk in dedup_chunks(chunks, index, stats))
+        print(f"{stats.get('duplicates', 0)} of {stats.get('rows', 0)} rows were already indexed; "
+              f"{new_rows} new rows added ({index.stats()})")
+    else:
+        print(file_duplicates(args.file, args.columns, args.chunk_size))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,57 @@
+import numpy as np
+import pandas as pd
+from data_generator import BatchDataGenerator
+from uuid_utils import bulk_uuid4
+
+
+class EntityPool:
+    """A fixed table of entities (customers, products) drawn with Zipf-like popularity.
+
+    The entity at rank r (its row position) is drawn with weight r ** -exponent, so a few
+    entities account for most rows while the long tail still appears.
+    """
+
+    def __init__(self, table: pd.DataFrame, exponent: float = 1.0):
+        self.table = table.reset_index(drop=True)
+        self.exponent = exponent
+        weights = np.arange(1, len(self.table) + 1, dtype=float) ** -exponent
+        self.cdf = np.cumsum(weights / weights.sum())
+
+    def __len__(self):
+        return len(self.table)
+
+    @property
+    def columns(self) -> list:
+        return self.table.columns.tolist()
+
+    def sample_indices(self, rng: np.random.Generator, n: int) -> np.ndarray:
+        """Draw n pool positions by inverting the popularity CDF."""
+        positions = np.searchsorted(self.cdf, rng.random(n), side='right')
+        return np.minimum(positions, len(self.table) - 1)
+
+    def sample(self, rng: np.random.Generator, n: int, columns: list = None) -> dict:
+        """Draw n entities and return {column: array}; every column of a row comes from the same entity."""
+        positions = self.sample_indices(rng, n)
+        return {column: self.table[column].to_numpy()[positions] for column in (columns or self.columns)}
+
+
+def build_customer_pool(size: int, rng: np.random.Generator = None, exponent: float = 1.0) -> EntityPool:
+    """Build `size` customers, each with a stable Customer_Id, name, country and city."""
+    rng = rng if rng is not None else np.random.default_rng()
+    countries, cities = BatchDataGenerator.gen_countries_and_cities(rng, size)
+    return EntityPool(pd.DataFrame({
+        'Customer_Id': bulk_uuid4(size, rng),
+        'Customer_Name': BatchDataGenerator.gen_customer_names(rng, size),
+        'Customer_Country': countries,
+        'Customer_City': cities
+    }), exponent)
+
+def build_product_pool(size: int, rng: np.random.Generator = None, exponent: float = 1.0) -> EntityPool:
+    """Build `size` products (SKUs), each with a stable Product_Id, category and product name."""
+    rng = rng if rng is not None else np.random.default_rng()
+    categories, product_names = BatchDataGenerator.gen_categories_and_product_names(rng, size)
+    return EntityPool(pd.DataFrame({
+        'Product_Id': bulk_uuid4(size, rng),
+        'Product_Category': categories,
+        'Product_Name': product_names
+    }), exponent)
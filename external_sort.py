@@ -0,0 +1,117 @@
+import itertools
+import os
+import tempfile
+import numpy as np
+import pandas as pd
+from table_io import TableWriter, iter_table_chunks, pa
+
+# Rows sorted in memory before they are spilled to disk as one sorted run
+RUN_ROWS = 1_000_000
+
+# Runs merged at once; more runs than this are merged in several passes
+FAN_IN = 64
+
+# Column holding each row's int64 sort key inside the spill files
+KEY_COLUMN = '__sort_key'
+
+# Rows without a key sort after every other row
+MISSING_KEY = np.iinfo(np.int64).max
+
+# Runs are spilled as uncompressed Arrow IPC (typed, cheap to read back); CSV without pyarrow
+SPILL_FORMAT = 'arrow' if pa is not None else 'csv'
+
+
+def _sorted(frame: pd.DataFrame) -> pd.DataFrame:
+    # Stable, so rows with equal keys keep their input order
+    return frame.take(np.argsort(frame[KEY_COLUMN].to_numpy(), kind='stable'))
+
+def _spill(frames, path: str, batch_rows: int) -> str:
+    with TableWriter(path, SPILL_FORMAT, row_group_size=batch_rows, compression=None) as writer:
+        for frame in frames:
+            writer.write(frame)
+    return path
+
+def _read_block(reader, block_rows: int) -> pd.DataFrame:
+    """Next block of at least block_rows rows from a run (fewer at its end), or None when it is exhausted."""
+    frames, rows = [], 0
+    while rows < block_rows:
+        frame = next(reader, None)
+        if frame is None:
+            break
+        frames.append(frame)
+        rows += len(frame)
+    return pd.concat(frames, ignore_index=True) if frames else None
+
+def _merge_runs(paths: list, chunk_size: int):
+    """Yield the rows of sorted run files in key order, about chunk_size rows at a time; equal keys keep run order.
+
+    Each run is read block by block. Every unread row of a run sorts after the last key in its
+    buffer, so everything up to the smallest (last key, run) over all buffers is safe to emit.
+    """
+    block_rows = max(1, chunk_size // len(paths))
+    readers = [iter_table_chunks(path, chunk_size, file_format=SPILL_FORMAT) for path in paths]
+    buffers = [_read_block(reader, block_rows) for reader in readers]
+    output, output_rows = [], 0
+    while True:
+        live = [i for i, buffer in enumerate(buffers) if buffer is not None]
+        if not live:
+            break
+        keys = {i: buffers[i][KEY_COLUMN].to_numpy() for i in live}
+        bound_key, bound_run = min((keys[i][-1], i) for i in live)
+        pieces = []
+        for i in live:
+            cut = np.searchsorted(keys[i], bound_key, side='right' if i <= bound_run else 'left')
+            if cut:
+                pieces.append(buffers[i].iloc[:cut])
+                buffers[i] = buffers[i].iloc[cut:]
+            if len(buffers[i]) == 0:
+                buffers[i] = _read_block(readers[i], block_rows)
+        output.append(_sorted(pd.concat(pieces, ignore_index=True)))
+        output_rows += len(output[-1])
+        if output_rows >= chunk_size:
+            yield pd.concat(output, ignore_index=True)
+            output, output_rows = [], 0
+    if output:
+        yield pd.concat(output, ignore_index=True)
+
+def sort_chunks(chunks, sort_key, chunk_size: int = 100_000, run_rows: int = RUN_ROWS, fan_in: int = FAN_IN,
+                spill_dir: str = None):
+    """Yield a stream of DataFrame chunks sorted by sort_key, using at most about run_rows rows of memory.
+
+    sort_key(chunk) returns an int64 array with one key per row (MISSING_KEY sorts last). Up to
+    run_rows rows are sorted in memory and spilled to a temporary run file; the runs are then
+    merged fan_in at a time. The sort is stable. Input that fits in one run is never spilled.
+    """
+    batch_rows = max(1, chunk_size // fan_in)
+    with tempfile.TemporaryDirectory(prefix='sort-', dir=spill_dir) as tmp_dir:
+        run_paths = (os.path.join(tmp_dir, f'run-{i}.{SPILL_FORMAT}') for i in itertools.count())
+        runs, pending, pending_rows = [], [], 0
+        for chunk in chunks:
+            pending.append(chunk.assign(**{KEY_COLUMN: sort_key(chunk)}))
+            pending_rows += len(chunk)
+            if pending_rows >= run_rows:
+                runs.append(_spill([_sorted(pd.concat(pending, ignore_index=True))], next(run_paths), batch_rows))
+                pending, pending_rows = [], 0
+
+        if not runs:
+            if pending:
+                frame = _sorted(pd.concat(pending, ignore_index=True)).drop(columns=KEY_COLUMN)
+                for start in range(0, len(frame), chunk_size):
+                    yield frame.iloc[start:start + chunk_size]
+            return
+        if pending:
+            runs.append(_spill([_sorted(pd.concat(pending, ignore_index=True))], next(run_paths), batch_rows))
+            pending = []
+
+        # Too many runs to merge at once: merge groups of fan_in runs into longer runs first
+        while len(runs) > fan_in:
+            merged = []
+            for start in range(0, len(runs), fan_in):
+                group = runs[start:start + fan_in]
+                merged.append(_spill(_merge_runs(group, chunk_size), next(run_paths), batch_rows))
+                for path in group:
+                    os.remove(path)
+            runs = merged
+
+        for chunk in _merge_runs(runs, chunk_size):
+            yield chunk.drop(columns=KEY_COLUMN)
@@ -1,4 +1,6 @@
 from google.cloud import storage
+from concurrent.futures import ThreadPoolExecutor
+import json
 import os
 
 class GCSHandler:
@@ -25,6 +27,29 @@ class GCSHandler:
         except Exception as e:
             return f"An error occurred while uploading the file: {e}"
 
+    def upload_shards(self, bucket_name, manifest_path, destination_prefix, workers=8):
+        """Uploads every shard listed in a shard manifest in parallel, then the manifest itself."""
+        try:
+            with open(manifest_path) as file:
+                manifest = json.load(file)
+            source_dir = os.path.dirname(manifest_path)
+            storage_client = storage.Client()
+            bucket = storage_client.bucket(bucket_name)
+
+            def upload(file_name):
+                blob = bucket.blob(f"{destination_prefix.rstrip('/')}/{file_name}")
+                blob.upload_from_filename(os.path.join(source_dir, file_name))
+
+            # Shards are independent objects, so they upload concurrently
+            with ThreadPoolExecutor(max_workers=workers) as pool:
+                list(pool.map(upload, [shard['file'] for shard in manifest['shards']]))
+            upload(os.path.basename(manifest_path))
+            return (f"{len(manifest['shards'])} shards ({manifest['total_rows']} rows) uploaded to "
+                    f"{destination_prefix} in bucket {bucket_name}.")
+
+        except Exception as e:
+            return f"An error occurred while uploading the shards: {e}"
+
             
     def delete_blob(self, bucket_name, blob_name):
         """Deletes a blob (file) from the specified bucket."""
@@ -0,0 +1,172 @@
+import argparse
+import csv
+import hashlib
+import io
+import os
+import pandas as pd
+from checkpoint import load_checkpoint, save_checkpoint
+from csv_writer import CSVWriter
+from data_handling import clean_chunk
+from table_io import iter_csv_chunks
+
+# Read size used when hashing the already-processed prefix
+HASH_READ_BYTES = 16 * 1024 * 1024
+
+
+def _open_input(input_file):
+    """Return a binary file object for a path or an uploaded file, rewound to the start."""
+    if isinstance(input_file, str):
+        return open(input_file, 'rb')
+    input_file.seek(0)
+    return input_file
+
+def _file_size(file) -> int:
+    position = file.tell()
+    size = file.seek(0, io.SEEK_END)
+    file.seek(position)
+    return size
+
+def prefix_hasher(file, length: int):
+    """Return a SHA-256 object fed with the first length bytes of a binary file."""
+    file.seek(0)
+    hasher = hashlib.sha256()
+    remaining = length
+    while remaining > 0:
+        data = file.read(min(HASH_READ_BYTES, remaining))
+        if not data:
+            break
+        hasher.update(data)
+        remaining -= len(data)
+    return hasher
+
+def _verify_watermark(state: dict, job: dict, file, output_file: str):
+    """Return the prefix hasher when the watermark is usable, i.e. the job matches, the output is
+    intact and the input prefix is unchanged; otherwise None."""
+    if state is None or any(state.get(key) != value for key, value in job.items()):
+        return None
+    if not os.path.exists(output_file) or os.path.getsize(output_file) < state['output_offset']:
+        return None
+    if _file_size(file) < state['offset']:
+        return None
+    hasher = prefix_hasher(file, state['offset'])
+    return hasher if hasher.hexdigest() == state['sha256'] else None
+
+def _iter_record_chunks(file, start: int, records: int):
+    """Yield (data, end_offset, count) for each run of `records` complete CSV records from start, the
+    last run possibly shorter. A record ends at a newline outside quotes, so quoted fields may hold
+    newlines; a trailing record without its final newline is left for the next run."""
+    file.seek(start)
+    lines = iter(file)
+    offset = start
+    while True:
+        read, count, complete, quoted = [], 0, 0, False
+        for line in lines:
+            read.append(line)
+            # An escaped quote ("") toggles twice, so the parity tells whether a field is still open
+            quoted ^= line.count(b'"') % 2 == 1
+            if not quoted and line.endswith(b'\n'):
+                count += 1
+                complete = len(read)
+                if count == records:
+                    break
+        if complete:
+            data = b''.join(read[:complete])
+            offset += len(data)
+            yield data, offset, count
+        if count < records:
+            return
+
+def process_data_incremental(input_file, output_file, selected_columns=None, chunk_size=100_000, seed=0,
+                             watermark_file=None):
+    """Cleanse only the rows appended to a rough CSV since the last run and append them to output_file.
+
+    Rows are cleansed in chunks of chunk_size input records, each seeded from seed and its chunk
+    number in the whole file, so the output is the same however the input grew between runs, and
+    the same as a full rebuild. The watermark records the byte offset and row count of the last
+    complete chunk, a SHA-256 of that input prefix, the output size there and the next chunk
+    number; the final, partial chunk is written but cleansed again with the rows that complete it.
+    A rerun verifies the prefix and then only reads the new tail. If the prefix, the job settings
+    or the output changed, the output is rebuilt from scratch. Both files are CSV; a trailing record
+    without a newline is left for the next run, since the writer may still be appending it.
+    Returns the first cleaned chunk holding new rows (or None).
+    """
+    watermark_file = watermark_file or output_file + '.watermark.json'
+    job = {
+        "input_file": input_file if isinstance(input_file, str) else getattr(input_file, 'name', None),
+        "output_file": output_file,
+        "selected_columns": list(selected_columns) if selected_columns else None,
+        "chunk_size": chunk_size,
+        "seed": seed
+    }
+    file = _open_input(input_file)
+    try:
+        state = load_checkpoint(watermark_file)
+        hasher = _verify_watermark(state, job, file, output_file)
+        if hasher is not None:
+            print(f"Resuming {output_file} after {state['rows']} rows (input offset {state['offset']})")
+        else:
+            if state is not None:
+                print(f"Watermark for {output_file} no longer matches its input; rebuilding from scratch")
+            file.seek(0)
+            header = file.readline()
+            hasher = hashlib.sha256(header)
+            state = dict(job, columns=next(csv.reader([header.decode()])), offset=len(header), rows=0,
+                         sha256=hasher.hexdigest(), output_offset=0, next_chunk=0, tail_rows=0)
+
+        # Rows already in the output, including those of a partial last chunk
+        rows_before = state['rows'] + state.get('tail_rows', 0)
+        state['tail_rows'] = 0
+        first_chunk = None
+        with open(output_file, 'r+b' if state['output_offset'] else 'wb') as out:
+            # Drop anything written after the last complete chunk
+            out.truncate(state['output_offset'])
+            out.seek(state['output_offset'])
+            writer = CSVWriter(out, header=state['output_offset'] == 0)
+            if state['output_offset'] == 0:
+                # Header first, so an input without rows yet still gives a valid (empty) output
+                writer.write(clean_chunk((0, pd.DataFrame(columns=state['columns'])), selected_columns, seed))
+                writer.close()
+                state['output_offset'] = out.tell()
+            for data, end, count in _iter_record_chunks(file, state['offset'], chunk_size):
+                chunk = next(iter_csv_chunks(io.BytesIO(data), chunk_size, names=state['columns']),
+                             pd.DataFrame(columns=state['columns']))
+                cleaned = clean_chunk((state['next_chunk'], chunk), selected_columns, seed)
+                writer.write(cleaned)
+                writer.close()
+                if first_chunk is None and state['rows'] + len(chunk) > rows_before:
+                    first_chunk = cleaned
+                if count < chunk_size:
+                    # Partial chunk: written, but the watermark stays before it
+                    state['tail_rows'] = len(chunk)
+                    break
+                hasher.update(data)
+                os.fsync(out.fileno())
+                state.update(offset=end, sha256=hasher.hexdigest(), output_offset=out.tell(),
+                             rows=state['rows'] + len(chunk), next_chunk=state['next_chunk'] + 1)
+                save_checkpoint(watermark_file, state)
+            os.fsync(out.fileno())
+            save_checkpoint(watermark_file, state)
+    finally:
+        if isinstance(input_file, str):
+            file.close()
+    total = state['rows'] + state['tail_rows']
+    print(f"Cleaned {total - rows_before} new rows into {output_file} ({total} in total)")
+    return first_chunk
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Cleanse only the rows appended to a rough CSV since the last run.")
+    parser.add_argument('input_file', help="Append-only rough CSV file")
+    parser.add_argument('output_file', help="Cleaned CSV the new rows are appended to")
+    parser.add_argument('--chunk-size', type=int, default=100_000, help="Rows cleansed per chunk")
+    parser.add_argument('--columns', nargs='+', default=None, help="Columns to keep (default: all)")
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--watermark-file', default=None, help="Default: <output_file>.watermark.json")
+    args = parser.parse_args()
+
+    process_data_incremental(args.input_file, args.output_file, args.columns, args.chunk_size, args.seed,
+                             args.watermark_file)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,321 @@
+import argparse
+import fnmatch
+import json
+import os
+import queue
+import shutil
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor
+import numpy as np
+from csv_writer import CSVWriter
+from data_handling import clean_chunks
+from merge import merge_files, upsert_files
+from table_io import detect_format, iter_table_chunks
+from upsert import UPSERT_MODES
+
+# Marks the end of the queue for a worker thread
+STOP = None
+
+
+def append_csv(source: str, master_file: str):
+    """Append a cleaned CSV to the master CSV, keeping a single header; headers must match.
+
+    All or nothing: if the copy fails, the master file is cut back to its previous size.
+    """
+    with open(source, 'rb') as src:
+        header = src.readline()
+        new_master = not os.path.exists(master_file) or os.path.getsize(master_file) == 0
+        if not new_master:
+            with open(master_file, 'rb') as master:
+                master_header = master.readline()
+            if header != master_header:
+                raise ValueError(f"Columns of {source} do not match the master dataset {master_file}")
+        with open(master_file, 'wb' if new_master else 'ab') as out:
+            offset = out.tell()
+            try:
+                if new_master:
+                    out.write(header)
+                shutil.copyfileobj(src, out, length=16 * 1024 * 1024)
+                out.flush()
+            except BaseException:
+                out.truncate(offset)
+                raise
+
+def cleanse_file(path: str, cleaned_path: str, selected_columns: list = None, chunk_size: int = 100_000,
+                 seed=None) -> int:
+    """Cleanse a rough file chunk by chunk into a CSV; returns the rows written. Runs in a worker process."""
+    rng = np.random.default_rng(seed)
+    with CSVWriter(cleaned_path) as writer:
+        for chunk in clean_chunks(iter_table_chunks(path, chunk_size), selected_columns, rng):
+            writer.write(chunk)
+    return writer.rows_written
+
+def percentile(values: list, q: float) -> float:
+    return float(np.percentile(values, q)) if values else 0.0
+
+
+class IngestionService:
+    """Watch a directory for rough CSV files, cleanse each one, optionally upload it to a GCS bucket
+    and merge it into the master dataset.
+
+    A watcher thread polls watch_dir and queues files once their size has stopped changing.
+    The queue holds at most queue_size files; when it is full the watcher blocks, so a burst of
+    arrivals never outruns the workers. `workers` threads take files from the queue and hand the
+    CPU-bound cleansing (chunk by chunk, so memory stays bounded per file) to a pool of as many
+    processes; uploads and merges run in the threads, merges one at a time.
+
+    Without merge_key the merge only appends: rows are added as they are, never deduplicated (a
+    CSV master is appended to in place, other formats are rewritten by merge.merge_files). With
+    merge_key the master is rewritten by merge.upsert_files with one row per key, newer files
+    winning as merge_mode says; that rewrite costs a pass over the whole master per file.
+    Finished inputs are moved to processed_dir, failed ones to failed_dir, and a metrics line
+    with queue wait, processing time and end-to-end latency is recorded per file.
+    """
+
+    def __init__(self, watch_dir: str, master_file: str, output_dir: str = None, processed_dir: str = None,
+                 failed_dir: str = None, pattern: str = '*.csv', workers: int = 4, queue_size: int = 16,
+                 poll_interval: float = 2.0, settle_seconds: float = 1.0, selected_columns: list = None,
+                 chunk_size: int = 100_000, bucket_name: str = None, destination_prefix: str = '',
+                 metrics_file: str = None, seed: int = None, merge_key: str = None, merge_mode: str = 'replace'):
+        if merge_mode not in UPSERT_MODES:
+            raise ValueError(f"Unsupported merge mode: {merge_mode}")
+        self.watch_dir = watch_dir
+        self.master_file = master_file
+        self.output_dir = output_dir or os.path.join(watch_dir, 'cleaned')
+        self.processed_dir = processed_dir or os.path.join(watch_dir, 'processed')
+        self.failed_dir = failed_dir or os.path.join(watch_dir, 'failed')
+        self.pattern = pattern
+        self.workers = workers
+        self.queue = queue.Queue(maxsize=queue_size)
+        self.poll_interval = poll_interval
+        self.settle_seconds = settle_seconds
+        self.selected_columns = selected_columns
+        self.chunk_size = chunk_size
+        self.bucket_name = bucket_name
+        self.destination_prefix = destination_prefix
+        self.metrics_file = metrics_file
+        self.merge_key = merge_key
+        self.merge_mode = merge_mode
+        # Cleansing processes; None (as before start()) cleanses in the calling thread
+        self.pool = None
+        self.seed_sequence = np.random.SeedSequence(seed)
+        self.storage = None
+        self.master_lock = threading.Lock()
+        self.metrics_lock = threading.Lock()
+        self.stopping = threading.Event()
+        self.seen = {}
+        # Files queued or being processed, shared by the watcher and the workers
+        self.queued_lock = threading.Lock()
+        self.queued = set()
+        self.metrics = []
+        self.threads = []
+        for directory in (self.output_dir, self.processed_dir, self.failed_dir):
+            os.makedirs(directory, exist_ok=True)
+
+    def _scan(self) -> list:
+        """Return files that match the pattern and whose size has been stable for settle_seconds."""
+        now = time.monotonic()
+        ready = []
+        with self.queued_lock:
+            queued = set(self.queued)
+        with os.scandir(self.watch_dir) as entries:
+            for entry in entries:
+                if not entry.is_file() or not fnmatch.fnmatch(entry.name, self.pattern) or entry.path in queued:
+                    continue
+                size = entry.stat().st_size
+                previous = self.seen.get(entry.path)
+                if previous is None or previous[0] != size:
+                    self.seen[entry.path] = (size, now)
+                elif now - previous[1] >= self.settle_seconds:
+                    ready.append(entry.path)
+        return sorted(ready)
+
+    def _watch(self):
+        while not self.stopping.is_set():
+            for path in self._scan():
+                detected_at = time.monotonic()
+                seed = self.seed_sequence.spawn(1)[0]  # Independent generator per file
+                # Marked before it is queued, so a worker that finishes it quickly cannot unmark it first
+                with self.queued_lock:
+                    self.queued.add(path)
+                self.seen.pop(path, None)
+                # Blocks while the queue is full: backpressure on the directory scan
+                while True:
+                    if self.stopping.is_set():
+                        with self.queued_lock:
+                            self.queued.discard(path)
+                        break
+                    try:
+                        self.queue.put((path, detected_at, seed), timeout=self.poll_interval)
+                        break
+                    except queue.Full:
+                        continue
+            self.stopping.wait(self.poll_interval)
+
+    def _upload(self, path: str) -> str:
+        if self.storage is None:
+            from gcs import GCSHandler  # Only needed when uploading
+            self.storage = GCSHandler()
+        destination = f"{self.destination_prefix.rstrip('/')}/{os.path.basename(path)}".lstrip('/')
+        message = self.storage.upload_blob(self.bucket_name, path, destination)
+        if message.startswith('An error occurred'):
+            raise RuntimeError(message)
+        return destination
+
+    def merge_into_master(self, cleaned_path: str) -> dict:
+        """Merge a cleaned file into the master dataset (see the class docstring); returns upsert counts."""
+        inputs = [self.master_file, cleaned_path] if os.path.exists(self.master_file) and \
+            os.path.getsize(self.master_file) else [cleaned_path]
+        if self.merge_key:
+            summary = upsert_files(inputs, self.master_file, self.merge_key, self.merge_mode)
+            if len(inputs) == 1:  # A new master: every key in it is new
+                return {'inserted': summary['rows'], 'updated': 0}
+            return {'inserted': summary.get('inserted', 0), 'updated': summary.get('updated', 0)}
+        if detect_format(self.master_file) == 'csv':
+            append_csv(cleaned_path, self.master_file)
+        else:
+            merge_files(inputs, self.master_file)
+        return {}
+
+    def process_file(self, path: str, seed=None) -> dict:
+        """Cleanse one rough file, optionally upload it, and merge it into the master dataset.
+
+        The merge comes last and is all or nothing (appends are cut back on failure, rewrites
+        replace the master only when complete), so a file that fails at any step has changed
+        nothing in the master dataset and can simply be dropped in again.
+        """
+        cleaned_path = os.path.join(self.output_dir, os.path.basename(path))
+        arguments = (path, cleaned_path, self.selected_columns, self.chunk_size, seed)
+        rows = self.pool.submit(cleanse_file, *arguments).result() if self.pool else cleanse_file(*arguments)
+        uploaded_to = self._upload(cleaned_path) if self.bucket_name else None
+        with self.master_lock:
+            merged = self.merge_into_master(cleaned_path)
+        return dict(merged, rows=rows, cleaned_file=cleaned_path, uploaded_to=uploaded_to)
+
+    def _record(self, metric: dict):
+        with self.metrics_lock:
+            self.metrics.append(metric)
+            if self.metrics_file:
+                with open(self.metrics_file, 'a') as file:
+                    file.write(json.dumps(metric) + '\n')
+            print(f"Ingest: {json.dumps(metric)}")
+
+    def _work(self):
+        while True:
+            item = self.queue.get()
+            if item is STOP:
+                self.queue.task_done()
+                return
+            path, detected_at, seed = item
+            started_at = time.monotonic()
+            metric = {'file': os.path.basename(path), 'queue_wait_seconds': round(started_at - detected_at, 3)}
+            try:
+                metric.update(self.process_file(path, seed), status='ok')
+            except Exception as e:
+                metric.update(status='failed', error=str(e))
+            finished_at = time.monotonic()
+            metric.update(processing_seconds=round(finished_at - started_at, 3),
+                          latency_seconds=round(finished_at - detected_at, 3))
+            if metric.get('rows') and finished_at > started_at:
+                metric['rows_per_second'] = round(metric['rows'] / (finished_at - started_at), 1)
+            done_dir = self.processed_dir if metric['status'] == 'ok' else self.failed_dir
+            try:
+                shutil.move(path, os.path.join(done_dir, os.path.basename(path)))
+                with self.queued_lock:
+                    self.queued.discard(path)
+            except Exception as e:
+                # Left in the watch directory but still marked queued, so it is not ingested twice
+                metric['move_error'] = str(e)
+            try:
+                self._record(metric)
+            except Exception as e:
+                print(f"Ingest: could not record metrics for {path}: {e}")
+            self.queue.task_done()
+
+    def start(self):
+        """Start the cleansing processes, the worker threads and the directory watcher."""
+        self.pool = ProcessPoolExecutor(max_workers=self.workers)
+        self.threads = [threading.Thread(target=self._work, name=f'ingest-worker-{i}', daemon=True)
+                        for i in range(self.workers)]
+        self.threads.append(threading.Thread(target=self._watch, name='ingest-watcher', daemon=True))
+        for thread in self.threads:
+            thread.start()
+
+    def stop(self):
+        """Stop watching, let the workers finish every queued file, then return."""
+        self.stopping.set()
+        self.threads[-1].join()
+        for _ in range(self.workers):
+            self.queue.put(STOP)
+        for thread in self.threads[:-1]:
+            thread.join()
+        self.pool.shutdown()
+        self.pool = None
+
+    def stats(self) -> dict:
+        """Summary of the files processed so far, with latency percentiles."""
+        with self.metrics_lock:
+            ok = [metric for metric in self.metrics if metric['status'] == 'ok']
+            latencies = [metric['latency_seconds'] for metric in ok]
+            return {
+                'files_ok': len(ok),
+                'files_failed': len(self.metrics) - len(ok),
+                'rows': sum(metric['rows'] for metric in ok),
+                'queued': self.queue.qsize(),
+                'latency_p50_seconds': round(percentile(latencies, 50), 3),
+                'latency_p95_seconds': round(percentile(latencies, 95), 3),
+                'latency_max_seconds': round(max(latencies, default=0.0), 3)
+            }
+
+    def run(self, duration: float = None, report_interval: float = 60.0):
+        """Run until interrupted (or for `duration` seconds), printing stats every report_interval."""
+        self.start()
+        deadline = None if duration is None else time.monotonic() + duration
+        try:
+            while deadline is None or time.monotonic() < deadline:
+                remaining = report_interval if deadline is None else deadline - time.monotonic()
+                time.sleep(max(0.0, min(report_interval, remaining)))
+                print(f"Ingest stats: {self.stats()}")
+        except KeyboardInterrupt:
+            pass
+        finally:
+            self.stop()
+        return self.stats()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Watch a directory and ingest new rough CSV files.")
+    parser.add_argument('watch_dir', help="Directory that receives rough CSV files")
+    parser.add_argument('master_file', help="Master dataset (CSV, Parquet or Arrow) the cleaned rows are merged into")
+    parser.add_argument('--output-dir', help="Where cleaned files are kept (default: <watch_dir>/cleaned)")
+    parser.add_argument('--pattern', default='*.csv')
+    parser.add_argument('--workers', type=int, default=4, help="Files processed concurrently (cleansing processes)")
+    parser.add_argument('--key', default=None,
+                        help="Upsert into the master on this primary key (e.g. Order_Id) instead of appending")
+    parser.add_argument('--mode', choices=UPSERT_MODES, default='replace', help="How newer rows change existing ones")
+    parser.add_argument('--queue-size', type=int, default=16, help="Files waiting before the watcher blocks")
+    parser.add_argument('--poll-interval', type=float, default=2.0)
+    parser.add_argument('--settle-seconds', type=float, default=1.0, help="Size must be stable this long")
+    parser.add_argument('--chunk-size', type=int, default=100_000, help="Rows cleansed per chunk")
+    parser.add_argument('--columns', nargs='+', default=None, help="Columns to keep (default: all)")
+    parser.add_argument('--bucket', help="Upload each cleaned file to this GCS bucket")
+    parser.add_argument('--destination-prefix', default='')
+    parser.add_argument('--metrics-file', help="Append one JSON line of metrics per file")
+    parser.add_argument('--duration', type=float, default=None, help="Stop after this many seconds")
+    parser.add_argument('--report-interval', type=float, default=60.0)
+    args = parser.parse_args()
+
+    service = IngestionService(
+        args.watch_dir, args.master_file, output_dir=args.output_dir, pattern=args.pattern,
+        workers=args.workers, queue_size=args.queue_size, poll_interval=args.poll_interval,
+        settle_seconds=args.settle_seconds, selected_columns=args.columns, chunk_size=args.chunk_size,
+        bucket_name=args.bucket, destination_prefix=args.destination_prefix, metrics_file=args.metrics_file,
+        merge_key=args.key, merge_mode=args.mode
+    )
+    print(f"Watching {args.watch_dir} for {args.pattern} files")
+    print(f"Ingestion finished: {service.run(args.duration, args.report_interval)}")
+
+
+if __name__ == "__main__":
+    main()
@@ -4,11 +4,36 @@ import os
 import matplotlib.pyplot as plt
 import seaborn as sns
 from gcs import GCSHandler 
-from data_generator import write_to_csv
-from rough_data_generation import generate_records as generate_rough_data
-from rough_data_generation import save_to_csv
-from data_handling import load_data, save_data, generate_fake_data
-from merge import merge_csv_files, check_duplicates, parse_dates, show_info
+from data_generator import write_to_csv, write_to_shards
+from entity_pools import build_customer_pool, build_product_pool
+from rough_data_generation import iter_record_chunks, save_chunks_to_csv, save_chunks_to_shards
+from data_handling import load_data, save_data, save_data_shards, generate_fake_data, process_data_stream, process_data_parallel
+from incremental_cleansing import process_data_incremental
+from merge import expand_inputs, merge_files, upsert_files, check_duplicates, parse_dates, show_info, ORDER_TIME_COLUMN, ORDER_KEY
+from dedup import DEFAULT_INDEX_DIR
+from table_io import preview_table
+from timestamps import to_datetime_column
+from dashboard_data import load_dashboard_data, decode_categories, memory_report
+from schema import COLUMN_NAMES
+from profiler import load_profile, profile_file, profile_table
+from shard_writer import COMPRESSIONS, preview_shards, verify_shards
+
+# Output formats offered by the generation and merge stages, with their file extensions
+FILE_FORMATS = {'CSV': 'csv', 'Parquet': 'parquet', 'Arrow IPC': 'arrow'}
+
+# Merged output written by Section 4 in any of the formats; the most recent one is used
+FINAL_DATA_FILES = ['final_data.csv', 'final_data.parquet', 'final_data.arrow']
+
+def final_data_file():
+    existing = [path for path in FINAL_DATA_FILES if os.path.exists(path)]
+    return max(existing, key=os.path.getmtime) if existing else FINAL_DATA_FILES[0]
+
+# Bulk loads take a directory of compressed CSV shards plus a manifest instead of one file;
+# returns the chosen compression name, or None to write one file
+def shard_options(key):
+    if st.checkbox("Write compressed CSV shards with a manifest instead (for bulk loads)", key=f'{key}_shards'):
+        return st.selectbox("Shard compression", list(COMPRESSIONS), key=f'{key}_shard_compression')
+    return None
 
 # Initialize the GCSHandler
 gc = GCSHandler()
@@ -115,22 +140,31 @@ if st.button("About Project", key='about_project_button'):
 st.markdown("<div class='section-title'>1. Data Generation</div>", unsafe_allow_html=True)
 
 # Select Columns to Generate
-all_columns = ["Order_Id", "Customer_Id", "Customer_Name", "Product_Id", "Product_Category", 
-               "Product_Name", "Payment_Type", "Quantity_ordered", "Price", 
-               "Date_and_Time_When_Order_Was_Placed", "Customer_Country", 
-               "Customer_City", "Site_From_Where_Order_Was_Placed", 
-               "Payment_Transaction_Confirmation_Id", "Payment_Success_or_Failure", 
-               "Payment_Failure_Reason"]
+all_columns = COLUMN_NAMES
 
 selected_columns = st.multiselect(
     "Select columns for data generation", all_columns, default=all_columns
 )
 num_records = st.number_input("Number of records to generate", min_value=1, max_value=100000, value=1000)
 
+# Orders are drawn from fixed customer and product pools with skewed popularity,
+# so repeat customers and best-selling products show up as they do in production
+num_customers = st.number_input("Number of distinct customers", min_value=1, max_value=1000000, value=200)
+num_products = st.number_input("Number of distinct products", min_value=1, max_value=100000, value=50)
+output_format = FILE_FORMATS[st.selectbox("Output file format", list(FILE_FORMATS), key='generate_format')]
+generate_shards = shard_options('generate')
+
 if st.button('Generate Data', key='generate_data_button'):
-    file_name = 'data_generation.csv'
-    write_to_csv(file_name, num_records, selected_columns)
-    data = pd.read_csv(file_name)
+    pools = [build_customer_pool(num_customers), build_product_pool(num_products)]
+    if generate_shards:
+        file_name = 'data_generation_shards'
+        manifest_path = write_to_shards(file_name, num_records, selected_columns, compression=COMPRESSIONS[generate_shards],
+                                        pools=pools)
+        data = preview_shards(manifest_path)
+    else:
+        file_name = f'data_generation.{output_format}'
+        write_to_csv(file_name, num_records, selected_columns, batch_size=100_000, pools=pools)
+        data = preview_table(file_name)  # Read back only the preview rows
     rough_file_location = os.path.abspath(file_name)  # Get absolute path for the file
 
     # Success message with file location
@@ -151,11 +185,21 @@ selected_rough_columns = st.multiselect(
 )
 
 num_rough_records = st.number_input("How many rough records to generate?", min_value=1, max_value=100000, value=1000)
+rough_format = FILE_FORMATS[st.selectbox("Rough data file format", list(FILE_FORMATS), key='rough_format')]
+rough_shards = shard_options('rough')
 
 if st.button('Generate Rough Data', key='generate_rough_data_button'):
-    rough_file_name = 'rough_data_generation.csv'
-    rough_data = generate_rough_data(num_rough_records, selected_rough_columns)
-    save_to_csv(rough_data, rough_file_name)
+    # Stream chunks straight to disk and keep only the first one for the preview;
+    # the corrupted cells are recorded alongside as ground truth for the cleansing stage
+    rough_chunks = iter_record_chunks(num_rough_records, selected_rough_columns, return_mask=True)
+    if rough_shards:
+        rough_file_name = 'rough_data_generation_shards'
+        manifest_path = save_chunks_to_shards(rough_chunks, rough_file_name, COMPRESSIONS[rough_shards],
+                                              mask_path='rough_data_generation_rogue_cells.csv')
+        rough_data = preview_shards(manifest_path)
+    else:
+        rough_file_name = f'rough_data_generation.{rough_format}'
+        rough_data = save_chunks_to_csv(rough_chunks, rough_file_name, mask_path='rough_data_generation_rogue_cells.csv')
     rough_file_location = os.path.abspath(rough_file_name)  # Get absolute path for the file
 
     # Success message with file location
@@ -164,31 +208,62 @@ if st.button('Generate Rough Data', key='generate_rough_data_button'):
 # Section 3: Data Handling & Standardization
 st.markdown("<div class='section-title'>3. Data Handling & Standardization</div>", unsafe_allow_html=True)
 
-input_file = st.file_uploader("Upload your rough data CSV file:", type=['csv'], key='file_uploader', label_visibility="collapsed")
-output_file = st.text_input("Enter the output filename (with .csv extension):", value='handling_rough_data.csv', key='output_filename')
+input_file = st.file_uploader("Upload your rough data CSV file:", type=['csv', 'parquet', 'arrow'], key='file_uploader', label_visibility="collapsed")
+output_file = st.text_input("Enter the output filename (.csv, .parquet or .arrow):", value='handling_rough_data.csv', key='output_filename')
 
 # Define available columns for selection
 available_columns = all_columns
 
 selected_columns = st.multiselect("Select columns to include in the processed data:", available_columns, default=available_columns)
 
+# Large files are cleansed chunk by chunk so memory stays constant
+stream_processing = st.checkbox("Process in chunks (for files larger than memory)", key='stream_processing')
+chunk_size = st.number_input("Rows per chunk", min_value=1000, max_value=10000000, value=100000, key='chunk_size')
+# An append-only rough CSV only needs its new rows cleansed on each run
+incremental_processing = st.checkbox("Only process rows added since the last run (CSV input and output)",
+                                     key='incremental_processing')
+process_workers = st.number_input("Worker processes for chunked processing", min_value=1, max_value=256,
+                                  value=os.cpu_count() or 1, key='process_workers')
+# Shards go to a directory named after the output file, e.g. handling_rough_data_shards
+process_shards = shard_options('process')
+
 if st.button('Process Data', key='process_data_button'):
     if input_file and output_file:
         try:
-            df = load_data(input_file)  # Load DataFrame from CSV
-            
-            # Keep only the selected columns that are available in the DataFrame
-            valid_selected_columns = [col for col in selected_columns if col in df.columns]
-            df = df[valid_selected_columns]  # Filter DataFrame to only selected columns
-            
-            # Generate fake data using the DataFrame
-            df = generate_fake_data(df, valid_selected_columns)  # Pass selected columns to the function
-            
-            # Save the processed DataFrame
-            save_data(df, output_file)  
+            target = os.path.splitext(output_file)[0] + '_shards' if process_shards else output_file
+            if incremental_processing and process_shards:
+                raise ValueError("Incremental processing appends to one CSV file; turn off shard output")
+            elif incremental_processing:
+                # Append only the new tail; falls back to a full rebuild if earlier rows changed
+                df = process_data_incremental(input_file, output_file, selected_columns, chunk_size)
+                if df is None:
+                    st.info("No new rows since the last run.")
+                    df = pd.DataFrame(columns=selected_columns)
+            elif stream_processing and process_workers > 1:
+                # Fan the chunks out to worker processes; output keeps the input order
+                df = process_data_parallel(input_file, target, selected_columns, chunk_size, process_workers,
+                                           shards=process_shards)
+            elif stream_processing:
+                # Read, cleanse and append one chunk at a time, keeping the first chunk for the preview
+                df = process_data_stream(input_file, target, selected_columns, chunk_size, shards=process_shards)
+            else:
+                df = load_data(input_file)  # Load DataFrame from CSV
+
+                # Keep only the selected columns that are available in the DataFrame
+                valid_selected_columns = [col for col in selected_columns if col in df.columns]
+                df = df[valid_selected_columns]  # Filter DataFrame to only selected columns
+
+                # Generate fake data using the DataFrame
+                df = generate_fake_data(df, valid_selected_columns)  # Pass selected columns to the function
+
+                # Save the processed DataFrame
+                if process_shards:
+                    save_data_shards(df, target, COMPRESSIONS[process_shards])
+                else:
+                    save_data(df, output_file)
             
             # Get the absolute path of the output file
-            output_file_location = os.path.abspath(output_file)
+            output_file_location = os.path.abspath(target)
             
             # Success message with file location
             st.success(f"Data processed and saved to '{output_file_location}'")
@@ -205,35 +280,67 @@ if st.button('Process Data', key='process_data_button'):
 # Section 4: CSV File Merging
 st.markdown("<div class='section-title'>4. CSV File Merging</div>", unsafe_allow_html=True)
 
-file1 = st.text_input("Enter the path of the first CSV file:", key='file1_input')
-file2 = st.text_input("Enter the path of the second CSV file:", key='file2_input')
+merge_inputs = st.text_area("Enter the paths or glob patterns of the files to merge, one per line (e.g. daily/*.csv):",
+                            key='merge_inputs')
+
+merge_format = FILE_FORMATS[st.selectbox("Merged file format", list(FILE_FORMATS), key='merge_format')]
+
+# Append keeps every row; upsert keeps one row per key, later files replacing or filling in earlier rows
+MERGE_MODES = {
+    'Append all rows': None,
+    'Upsert on key (newer rows replace)': 'replace',
+    'Upsert on key (newer values fill in)': 'update'
+}
+merge_mode = MERGE_MODES[st.selectbox("Merge mode", list(MERGE_MODES), key='merge_mode')]
+if merge_mode:
+    merge_key = st.text_input("Primary key column", value=ORDER_KEY, key='merge_key')
+else:
+    st.caption("Appended rows start with the last file listed, so duplicate checks keep each row's copy "
+               "from the latest file.")
+    sort_merged = st.checkbox("Sort merged rows by order time", key='sort_merged')
+    skip_seen = st.checkbox("Skip rows merged before (persistent duplicate index)", key='skip_seen')
+# Saves the results the duplicate check and info buttons show, instead of computing them when first clicked
+merge_stats = st.checkbox("Profile and count duplicates while merging", key='merge_stats')
 
 if st.button("Merge CSV Files", key='merge_files_button'):
-    if file1 and file2:
-        merged_data = merge_csv_files(file1, file2)
-        if merged_data is not None:
-            st.write("Merged CSV Preview:")
-            st.write(merged_data.head())
+    inputs = [line.strip() for line in merge_inputs.splitlines() if line.strip()]
+    if inputs:
+        try:
+            # Stream every file into the chosen format; sorting spills to disk instead of loading everything
+            output_file = f'final_data.{merge_format}'
+            if merge_mode:
+                summary = upsert_files(inputs, output_file, merge_key, merge_mode, profile=merge_stats,
+                                       count_duplicates=merge_stats)
+                st.write(f"{summary.get('inserted', 0)} keys inserted, {summary.get('updated', 0)} keys updated")
+            else:
+                # Last file first, the order the original two-file merge concatenated in
+                summary = merge_files(expand_inputs(inputs)[::-1], output_file,
+                                      sort_by=ORDER_TIME_COLUMN if sort_merged else None,
+                                      dedup_index=DEFAULT_INDEX_DIR if skip_seen else None,
+                                      profile=merge_stats, count_duplicates=merge_stats)
+                if skip_seen:
+                    st.write(f"{summary['duplicates_dropped']} rows were already merged before and were skipped")
 
-            # Save the merged DataFrame to a CSV file
-            output_file = 'final_data.csv'
-            merged_data.to_csv(output_file, index=False)
+            st.write("Merged CSV Preview:")
+            st.write(preview_table(output_file))
             
             # Get the absolute path of the output file
             output_file_location = os.path.abspath(output_file)
             
             # Success message with file location
-            st.success(f"CSV files merged and saved as '{output_file_location}'")
+            st.success(f"{summary['files']} files ({summary['rows']} rows) merged and saved as '{output_file_location}'")
             
             # Print the file location to the console
             print(f"Merged data saved at: {output_file_location}")
+        except Exception as e:
+            st.error(f"Error: {e}")
     else:
-        st.error("Please provide both file paths.")
+        st.error("Please provide at least one file path.")
 
 if st.button("Check for Duplicates", key='check_duplicates_button'):
     try:
-        final_data = pd.read_csv('final_data.csv')
-        duplicates = check_duplicates(final_data)
+        # Saved while merging when asked for, else counted once per change of the file with a streaming hash index
+        duplicates = check_duplicates(final_data_file())
         st.write(f"Number of duplicate rows: {duplicates}")
     except Exception as e:
         st.error(f"Error: {e}")
@@ -241,13 +348,14 @@ if st.button("Check for Duplicates", key='check_duplicates_button'):
 
 if st.button("Show DataFrame Info", key='info_button'):
     try:
-        # Load the data
-        final_data = pd.read_csv('final_data.csv')
-        
+        # Read the profile sidecar; it is rebuilt in one streaming pass only if the file changed since
+        final_file = final_data_file()
+        profile = load_profile(final_file) or profile_file(final_file)
+
         # DataFrame Information
-        shape = final_data.shape
-        column_names = final_data.columns.tolist()
-        data_types = final_data.dtypes.astype(str).tolist()  # Convert data types to strings for display
+        column_names = list(profile['columns'])
+        shape = (profile['rows'], len(column_names))
+        data_types = [', '.join(stats['dtype']) for stats in profile['columns'].values()]
 
         # Create columns for the display
         col1, col2, col3 = st.columns(3)
@@ -264,9 +372,19 @@ if st.button("Show DataFrame Info", key='info_button'):
             st.subheader("Data Types:")
             st.write(data_types)  # Displays data types of each column
         
+        # Per-column data quality: nulls, invalid tokens, ranges and approximate distinct counts
+        st.subheader("Column Profile:")
+        st.dataframe(profile_table(profile))
+
+        with st.expander("Most frequent values per column"):
+            for name, stats in profile['columns'].items():
+                if stats['heavy_hitters']:
+                    st.write(f"**{name}**")
+                    st.dataframe(pd.DataFrame(stats['heavy_hitters'], columns=['Value', 'Count']))
+
         # Optionally display a preview of the DataFrame
         st.write("Preview of the DataFrame:")
-        st.dataframe(final_data.head())  # Displays the first few rows of the DataFrame
+        st.dataframe(preview_table(final_file))  # Displays the first few rows of the DataFrame
 
     except Exception as e:
         st.error(f"Error: {e}")
@@ -336,6 +454,29 @@ if st.button("Upload File to GCS", key='upload_file_button'):
         st.error("Please select a file to upload.")
     else:
         st.error("Please enter a bucket name.")
+
+# Shard directories written above upload in parallel, to a folder named like the directory
+manifest_path = st.text_input("Enter the manifest of a shard directory to upload (e.g. data_generation_shards/manifest.json):",
+                              key='manifest_path_input')
+
+if st.button("Upload Shards to GCS", key='upload_shards_button'):
+    if manifest_path and bucket_name:
+        try:
+            # Refuse shards that changed since they were written
+            mismatched = verify_shards(manifest_path)
+            if mismatched:
+                st.error(f"These shards no longer match the manifest: {mismatched}")
+            else:
+                destination_prefix = os.path.basename(os.path.dirname(os.path.abspath(manifest_path)))
+                result = gc.upload_shards(bucket_name, manifest_path, destination_prefix)
+                if "uploaded" in result:
+                    st.success(result)
+                else:
+                    st.error(result)
+        except Exception as e:
+            st.error(f"Error: {e}")
+    else:
+        st.error("Please enter both a bucket name and a manifest path.")
         
 # Input for the blob name to delete
 blob_name = st.text_input("Enter the name of the file to delete from the GCS bucket:", key='blob_name_input')
@@ -358,10 +499,15 @@ sns.set(style="whitegrid")
 
 # Load the dataset
 @st.cache_data
-def load_data():
-    return pd.read_csv('final_data.csv')
+def load_data(file_name):
+    # Low-cardinality columns as categoricals with fixed dictionaries, UUIDs as 16 bytes each,
+    # small-int quantities and float32 prices; order timestamps are parsed once here
+    return load_dashboard_data(file_name)
+
+df = load_data(final_data_file())
 
-df = load_data()
+with st.expander("Dataset memory usage per column"):
+    st.dataframe(memory_report(df))
 
 # Section 6: Queries Section
 st.markdown("<div class='section-title'>6. Queries Section</div>", unsafe_allow_html=True)
@@ -376,8 +522,10 @@ def plot_data(df, title, x_label, y_label):
 
 # Function to handle each predefined query
 def display_query_1():
-    top_category_per_country = df.groupby(['Customer_Country', 'Product_Category']).agg({'Quantity_ordered': 'sum'}).reset_index()
-    top_category_per_country = top_category_per_country.sort_values(by='Quantity_ordered', ascending=False).groupby('Customer_Country').head(1)
+    # observed=True: group on the category codes present, not every combination of the dictionaries
+    top_category_per_country = df.groupby(['Customer_Country', 'Product_Category'], observed=True).agg({'Quantity_ordered': 'sum'}).reset_index()
+    top_category_per_country = top_category_per_country.sort_values(by='Quantity_ordered', ascending=False).groupby('Customer_Country', observed=True).head(1)
+    top_category_per_country = decode_categories(top_category_per_country)
 
     # Create two columns for output and plot
     col1, col2 = st.columns(2)
@@ -391,9 +539,10 @@ def display_query_1():
         plt.clf()  # Clear the figure after displaying
 
 def display_query_2():
-    df['Date_and_Time_When_Order_Was_Placed'] = pd.to_datetime(df['Date_and_Time_When_Order_Was_Placed'], errors='coerce')
+    df['Date_and_Time_When_Order_Was_Placed'] = to_datetime_column(df['Date_and_Time_When_Order_Was_Placed'])
     df['Month'] = df['Date_and_Time_When_Order_Was_Placed'].dt.month
-    product_popularity = df.groupby(['Customer_Country', 'Month', 'Product_Name']).agg({'Quantity_ordered': 'sum'}).reset_index()
+    product_popularity = df.groupby(['Customer_Country', 'Month', 'Product_Name'], observed=True).agg({'Quantity_ordered': 'sum'}).reset_index()
+    product_popularity = decode_categories(product_popularity)
 
     # Create two columns for output and plot
     col1, col2 = st.columns(2)
@@ -412,8 +561,8 @@ def display_query_2():
         plt.clf()
 
 def display_query_3():
-    highest_traffic_locations = df.groupby(['Customer_Country', 'Customer_City']).agg({'Order_Id': 'count'}).reset_index()
-    highest_traffic_locations = highest_traffic_locations.sort_values(by='Order_Id', ascending=False)
+    highest_traffic_locations = df.groupby(['Customer_Country', 'Customer_City'], observed=True).agg({'Order_Id': 'count'}).reset_index()
+    highest_traffic_locations = decode_categories(highest_traffic_locations.sort_values(by='Order_Id', ascending=False))
 
     # Create two columns for output and plot
     col1, col2 = st.columns(2)
@@ -427,9 +576,10 @@ def display_query_3():
         plt.clf()
 
 def display_query_4():
-    df['Date_and_Time_When_Order_Was_Placed'] = pd.to_datetime(df['Date_and_Time_When_Order_Was_Placed'], errors='coerce')
+    df['Date_and_Time_When_Order_Was_Placed'] = to_datetime_column(df['Date_and_Time_When_Order_Was_Placed'])
     df['Hour'] = df['Date_and_Time_When_Order_Was_Placed'].dt.hour
-    sales_traffic_per_time = df.groupby(['Customer_Country', 'Hour']).agg({'Order_Id': 'count'}).reset_index()
+    sales_traffic_per_time = df.groupby(['Customer_Country', 'Hour'], observed=True).agg({'Order_Id': 'count'}).reset_index()
+    sales_traffic_per_time = decode_categories(sales_traffic_per_time)
 
     # Create two columns for output and plot
     col1, col2 = st.columns(2)
@@ -449,7 +599,8 @@ def display_query_4():
 
 def display_query_5():
     df['Total_Order_Value'] = df['Quantity_ordered'] * df['Price']
-    avg_order_value_per_category = df.groupby(['Customer_Country', 'Product_Category']).agg({'Total_Order_Value': 'mean'}).reset_index()
+    avg_order_value_per_category = df.groupby(['Customer_Country', 'Product_Category'], observed=True).agg({'Total_Order_Value': 'mean'}).reset_index()
+    avg_order_value_per_category = decode_categories(avg_order_value_per_category)
 
     # Create two columns for output and plot
     col1, col2 = st.columns(2)
@@ -463,7 +614,8 @@ def display_query_5():
         plt.clf()
 
 def display_query_6():
-    payment_impact = df.groupby(['Customer_Country', 'Payment_Type', 'Payment_Success_or_Failure']).agg({'Order_Id': 'count'}).reset_index()
+    payment_impact = df.groupby(['Customer_Country', 'Payment_Type', 'Payment_Success_or_Failure'], observed=True).agg({'Order_Id': 'count'}).reset_index()
+    payment_impact = decode_categories(payment_impact)
 
     # Create two columns for output and plot
     col1, col2 = st.columns(2)
@@ -483,9 +635,10 @@ def display_query_6():
 
 def display_query_7():
     failure_df = df[df['Payment_Success_or_Failure'] == 'N']
-    failure_analysis = failure_df.groupby(['Customer_Country', 'Payment_Failure_Reason']).agg(
+    failure_analysis = failure_df.groupby(['Customer_Country', 'Payment_Failure_Reason'], observed=True).agg(
         failure_count=('Payment_Transaction_Confirmation_Id', 'count')
     ).reset_index()
+    failure_analysis = decode_categories(failure_analysis)
 
     failure_analysis_sorted = failure_analysis.sort_values(by=['Customer_Country', 'failure_count'], ascending=[True, False])
 
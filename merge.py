@@ -1,13 +1,31 @@
+import argparse
+import glob
+import os
+import time
+import numpy as np
 import pandas as pd
 import streamlit as st
 import io
+from csv_writer import format_timestamp_column
+from dedup import DuplicateCounter, HashIndex, dedup_chunks, file_duplicates, write_duplicate_counts
+from external_sort import MISSING_KEY, RUN_ROWS, sort_chunks
+from profiler import Profiler, write_profile
+from table_io import TableWriter, detect_format, iter_table_chunks, preview_table, read_table, table_columns
+from timestamps import TimestampParser, parse_timestamps, quarantine_rows, to_datetime_column
+from upsert import UPSERT_MODES, partition_count, upsert_chunks
+
+# Column the merged rows can be ordered by
+ORDER_TIME_COLUMN = 'Date_and_Time_When_Order_Was_Placed'
+
+# Primary key used by upsert merges
+ORDER_KEY = 'Order_Id'
 
 
 def merge_csv_files(file1, file2):
     try:
-        # Load CSV files
-        df1 = pd.read_csv(file1)
-        df2 = pd.read_csv(file2)
+        # Load CSV, Parquet or Arrow files (by extension)
+        df1 = read_table(file1)
+        df2 = read_table(file2)
 
         # Append df1 to df2
         appended_df = pd.concat([df2, df1], ignore_index=True)
@@ -16,9 +34,146 @@ def merge_csv_files(file1, file2):
         st.error(f"Error: {e}")
         return None
 
-# Function to check for duplicate rows
-def check_duplicates(df):
-    return df.duplicated().sum()
+# Expand glob patterns (in sorted order) and plain paths into the list of files to merge
+def expand_inputs(inputs):
+    if isinstance(inputs, str):
+        inputs = [inputs]
+    paths = []
+    for pattern in inputs:
+        matches = sorted(glob.glob(pattern)) if glob.has_magic(pattern) else [pattern]
+        if not matches:
+            raise FileNotFoundError(f"No files match {pattern}")
+        paths.extend(path for path in matches if path not in paths)
+    if not paths:
+        raise ValueError("No input files given")
+    return paths
+
+# Column order of the merged output: the first file's; every other file must have the same columns
+def aligned_columns(paths):
+    columns = table_columns(paths[0])
+    for path in paths[1:]:
+        other = table_columns(path)
+        missing, extra = [c for c in columns if c not in other], [c for c in other if c not in columns]
+        if missing or extra or len(other) != len(columns):
+            raise ValueError(f"Columns of {path} do not match {paths[0]}: missing {missing}, unexpected {extra}")
+    return columns
+
+# Columns stored or parsed as datetimes in a file (typed CSV columns included), with their dtypes
+def datetime_columns(path):
+    first = preview_table(path, rows=1)
+    return {column: dtype for column, dtype in first.dtypes.items() if pd.api.types.is_datetime64_any_dtype(dtype)}
+
+# Read a file's chunks in the given column order, with timestamps as datetimes exactly in the
+# `datetimes` columns, so CSV text and Parquet/Arrow datetimes do not end up mixed in one column
+def iter_aligned_chunks(path, columns, datetimes, chunk_size=100_000):
+    for chunk in iter_table_chunks(path, chunk_size):
+        chunk = chunk[columns]
+        for column in columns:
+            is_datetime = pd.api.types.is_datetime64_any_dtype(chunk[column])
+            if column in datetimes and not is_datetime:
+                chunk[column] = to_datetime_column(chunk[column]).astype(datetimes[column])
+            elif is_datetime and column not in datetimes:
+                chunk[column] = format_timestamp_column(chunk[column])
+        yield chunk
+
+# Sort key for external_sort: order time as int64 nanoseconds, one parser shared by all chunks
+def timestamp_key(column_name):
+    parser = TimestampParser()
+
+    def key(chunk):
+        parsed, _ = parser.parse(chunk[column_name])
+        keys = parsed.to_numpy('datetime64[ns]').view(np.int64).copy()
+        keys[parsed.isna().to_numpy()] = MISSING_KEY
+        return keys
+    return key
+
+def merge_files(inputs, output_file, file_format=None, sort_by=None, chunk_size=100_000, run_rows=RUN_ROWS,
+                spill_dir=None, dedup_index=None, dedup_columns=None, profile=False, count_duplicates=False):
+    """Stream any number of files (paths or glob patterns) into one output file.
+
+    Headers are checked and each file's columns (and timestamp types) follow the first file. Rows keep
+    their input order unless sort_by names a timestamp column, in which case they are sorted by
+    it with an external merge sort that spills runs of run_rows rows to disk; unparseable times
+    go last. Memory stays proportional to chunk_size and run_rows, not to the data. With
+    dedup_index (a dedup.HashIndex directory), rows already merged into it before, or repeated
+    within this merge, are dropped and the new ones recorded; dedup_columns hashes a key subset
+    instead of whole rows. With profile and count_duplicates the output's profile and duplicate
+    counts are saved on the way out (see write_merged). Returns a summary dict.
+    """
+    started_at = time.perf_counter()
+    paths = expand_inputs(inputs)
+    columns = aligned_columns(paths)
+    datetimes = datetime_columns(paths[0])
+    chunks = (chunk for path in paths for chunk in iter_aligned_chunks(path, columns, datetimes, chunk_size))
+    dedup_stats = {}
+    if dedup_index:
+        chunks = dedup_chunks(chunks, HashIndex(dedup_index, dedup_columns), dedup_stats)
+    if sort_by:
+        chunks = sort_chunks(chunks, timestamp_key(sort_by), chunk_size, run_rows, spill_dir=spill_dir)
+
+    return {
+        'files': len(paths),
+        'rows': write_merged(chunks, output_file, file_format, profile, count_duplicates),
+        'duplicates_dropped': dedup_stats.get('duplicates', 0),
+        'output_file': output_file,
+        'sorted_by': sort_by,
+        'seconds': round(time.perf_counter() - started_at, 3)
+    }
+
+def upsert_files(inputs, output_file, key=ORDER_KEY, mode='replace', file_format=None, partitions=None,
+                 chunk_size=100_000, spill_dir=None, profile=False, count_duplicates=False):
+    """Merge files treating key as the primary key, so the output holds each key once.
+
+    The first file is the master; rows of each later file replace ('replace') or fill in
+    ('update': only their non-null values) the row with the same key, and new keys are appended
+    in arrival order. Inputs larger than upsert.IN_MEMORY_BYTES on disk are hash-partitioned by
+    key into spill files and joined one partition at a time. The output may be one of the
+    inputs, e.g. the master itself. Returns a summary dict with inserted and updated key counts.
+    """
+    started_at = time.perf_counter()
+    paths = expand_inputs(inputs)
+    columns = aligned_columns(paths)
+    if key not in columns:
+        raise ValueError(f"Key column {key} is not in {paths[0]}")
+    partitions = partitions or partition_count(paths)
+    stats = {}
+    datetimes = datetime_columns(paths[0])
+    sources = [iter_aligned_chunks(path, columns, datetimes, chunk_size) for path in paths]
+    chunks = upsert_chunks(sources, key, mode, partitions, chunk_size, spill_dir=spill_dir, stats=stats)
+    rows = write_merged(chunks, output_file, file_format, profile, count_duplicates)
+    return dict(stats, files=len(paths), rows=rows, output_file=output_file, key=key, partitions=partitions,
+                seconds=round(time.perf_counter() - started_at, 3))
+
+# Write merged chunks to a temporary file that replaces output_file at the end (it may be an input).
+# On request the output is also profiled and its duplicate rows counted (in memory) on the way, saving
+# the sidecars the dashboard buttons read; otherwise those are computed from the file when first asked for
+def write_merged(chunks, output_file, file_format=None, profile=False, count_duplicates=False):
+    file_format = detect_format(output_file, file_format)
+    tmp_path = output_file + '.tmp'
+    profiler = Profiler() if profile else None
+    counter = DuplicateCounter() if count_duplicates else None
+    try:
+        with TableWriter(tmp_path, file_format) as writer:
+            for chunk in chunks:
+                writer.write(chunk)
+                if profiler:
+                    profiler.add(chunk)
+                if counter:
+                    counter.add(chunk)
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+    os.replace(tmp_path, output_file)
+    if profiler:
+        write_profile(profiler.to_dict(), output_file)
+    if counter:
+        write_duplicate_counts(counter.counts(), output_file)
+    return writer.rows_written
+
+# Function to check for duplicate rows in a file; the count saved at merge time is reused while the file is unchanged
+def check_duplicates(path, columns=None):
+    return file_duplicates(path, columns)['duplicates']
 
 # Function to show concise summary of the DataFrame
 def show_info(df):
@@ -28,16 +183,54 @@ def show_info(df):
     return info_str
 
 
-# Function to parse date column
-def parse_dates(df, column_name):
+# Function to parse date column; values in no known format become NaT and are quarantined
+def parse_dates(df, column_name, quarantine_file=None):
     try:
-        # Attempt to parse the date column
-        df[column_name] = pd.to_datetime(df[column_name], format='ISO8601')
+        parsed, bad = parse_timestamps(df[column_name])
+        if bad.any():
+            quarantine_rows(df, bad, column_name, quarantine_file)
+            st.warning(f"{int(bad.sum())} values in {column_name} could not be parsed and were set to NaT")
+        df[column_name] = parsed
         return df
     except Exception as e:
         # Display error message if parsing fails
         st.error(f"Error: {e}")
         return None
-    
-    
-    
\ No newline at end of file
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Merge any number of data files into one, optionally sorted by order time.")
+    parser.add_argument('inputs', nargs='+', help="Input files or glob patterns, e.g. 'daily/*.csv'")
+    parser.add_argument('--output', default='final_data.csv')
+    parser.add_argument('--sort', action='store_true', help=f"Sort rows by {ORDER_TIME_COLUMN}")
+    parser.add_argument('--chunk-size', type=int, default=100_000)
+    parser.add_argument('--run-rows', type=int, default=RUN_ROWS, help="Rows sorted in memory per spilled run")
+    parser.add_argument('--spill-dir', default=None, help="Directory for sort runs (default: system temp)")
+    parser.add_argument('--key', default=None,
+                        help=f"Upsert on this primary key (e.g. {ORDER_KEY}) instead of appending; the first input is the master")
+    parser.add_argument('--mode', choices=UPSERT_MODES, default='replace', help="How newer rows change existing ones")
+    parser.add_argument('--partitions', type=int, default=None, help="On-disk key partitions (default: by input size)")
+    parser.add_argument('--dedup-index', default=None,
+                        help="Drop rows already recorded in this persistent index (e.g. dedup_index) and record the new ones")
+    parser.add_argument('--dedup-columns', nargs='+', default=None, help="Key columns for --dedup-index (default: whole rows)")
+    parser.add_argument('--profile', action='store_true', help="Profile the merged file while writing it")
+    parser.add_argument('--count-duplicates', action='store_true', help="Count duplicate rows of the merged file while writing it")
+    args = parser.parse_args()
+
+    if args.key:
+        summary = upsert_files(args.inputs, args.output, args.key, args.mode, partitions=args.partitions,
+                               chunk_size=args.chunk_size, spill_dir=args.spill_dir, profile=args.profile,
+                               count_duplicates=args.count_duplicates)
+        print(f"Upserted {summary['files']} files into {args.output}: {summary['rows']} rows, "
+              f"{summary.get('inserted', 0)} keys inserted, {summary.get('updated', 0)} updated in {summary['seconds']} s")
+        return
+    summary = merge_files(args.inputs, args.output, sort_by=ORDER_TIME_COLUMN if args.sort else None,
+                          chunk_size=args.chunk_size, run_rows=args.run_rows, spill_dir=args.spill_dir,
+                          dedup_index=args.dedup_index, dedup_columns=args.dedup_columns, profile=args.profile,
+                          count_duplicates=args.count_duplicates)
+    print(f"Merged {summary['files']} files ({summary['rows']} rows, {summary['duplicates_dropped']} duplicates dropped) "
+          f"into {args.output} in {summary['seconds']} s")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,226 @@
+import argparse
+import os
+import socket
+import sys
+import time
+from datetime import datetime
+import numpy as np
+import pandas as pd
+from csv_writer import encode_csv
+from data_generator import generate_batch, record_columns
+from entity_pools import build_customer_pool, build_product_pool
+
+TIMESTAMP_COLUMN = 'Date_and_Time_When_Order_Was_Placed'
+
+
+def format_batch(batch: pd.DataFrame, fmt: str, header: bool = False) -> bytes:
+    """Serialize a batch as CSV rows (formatted like the batch writers' files) or newline-delimited JSON."""
+    if fmt == 'ndjson':
+        text = batch.to_json(orient='records', lines=True, date_format='iso', date_unit='s')
+        return (text if text.endswith('\n') else text + '\n').encode()
+    return encode_csv(batch, header=header)
+
+
+class TokenBucket:
+    """Token bucket limiting the stream to `rate` events/sec with bursts of up to `burst` events."""
+
+    def __init__(self, rate: float, burst: int = None):
+        self.set_rate(rate, burst)
+        self.tokens = 0.0  # Start empty so the achieved rate is not inflated by an initial burst
+        self.last = time.monotonic()
+
+    def set_rate(self, rate: float, burst: int = None):
+        """Change the target rate (and optionally the burst size) of a running bucket."""
+        if rate <= 0:
+            raise ValueError("rate must be positive")
+        self.rate = rate
+        self.burst = burst or max(1, int(rate))
+
+    def take(self, max_tokens: int) -> int:
+        """Block until at least one token is available, then take up to max_tokens whole tokens."""
+        while True:
+            now = time.monotonic()
+            self.tokens = min(self.burst, self.tokens + (now - self.last) * self.rate)
+            self.last = now
+            if self.tokens >= 1:
+                taken = min(int(self.tokens), max_tokens)
+                self.tokens -= taken
+                return taken
+            time.sleep((1 - self.tokens) / self.rate)
+
+
+class RotatingFileSink:
+    """Write batches to files in a directory, rotating after max_rows rows or max_seconds seconds.
+
+    Files are written as <name>.part and renamed when rotated, so a reader watching the
+    directory only ever sees complete files.
+    """
+
+    def __init__(self, directory: str, fmt: str = 'csv', max_rows: int = 100_000, max_seconds: float = 60.0,
+                 prefix: str = 'orders'):
+        self.directory = directory
+        self.fmt = fmt
+        self.max_rows = max_rows
+        self.max_seconds = max_seconds
+        self.prefix = prefix
+        self.sequence = 0
+        self.file = None
+        os.makedirs(directory, exist_ok=True)
+
+    def _open(self):
+        self.sequence += 1
+        stamp = datetime.now().strftime('%Y%m%d-%H%M%S')
+        self.path = os.path.join(self.directory, f"{self.prefix}-{stamp}-{self.sequence:06d}.{self.fmt}")
+        self.file = open(self.path + '.part', 'wb')
+        self.rows = 0
+        self.opened_at = time.monotonic()
+
+    def write(self, batch: pd.DataFrame):
+        if self.file is None:
+            self._open()
+        self.file.write(format_batch(batch, self.fmt, header=self.rows == 0))
+        self.rows += len(batch)
+        if self.rows >= self.max_rows or time.monotonic() - self.opened_at >= self.max_seconds:
+            self.close()
+
+    def close(self):
+        """Finish the current file and publish it under its final name."""
+        if self.file is not None:
+            self.file.close()
+            os.replace(self.path + '.part', self.path)
+            self.file = None
+
+
+class StreamSink:
+    """Write batches to an open stream such as stdout or a named pipe.
+
+    Text streams are written through their underlying binary buffer.
+    """
+
+    def __init__(self, stream=sys.stdout, fmt: str = 'ndjson'):
+        self.stream = getattr(stream, 'buffer', stream)
+        self.fmt = fmt
+        self.header_written = False
+
+    def write(self, batch: pd.DataFrame):
+        self.stream.write(format_batch(batch, self.fmt, header=not self.header_written))
+        self.stream.flush()
+        self.header_written = True
+
+    def close(self):
+        self.stream.flush()
+
+
+class SocketSink:
+    """Send batches to a TCP ("host:port") or Unix-domain socket address."""
+
+    def __init__(self, address: str, fmt: str = 'ndjson'):
+        self.fmt = fmt
+        self.header_written = False
+        if ':' in address:
+            host, port = address.rsplit(':', 1)
+            self.sock = socket.create_connection((host, int(port)))
+        else:
+            self.sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+            self.sock.connect(address)
+
+    def write(self, batch: pd.DataFrame):
+        self.sock.sendall(format_batch(batch, self.fmt, header=not self.header_written))
+        self.header_written = True
+
+    def close(self):
+        self.sock.close()
+
+
+class OrderStream:
+    """Emit generated orders continuously at a target rate, stamping each batch with the current time."""
+
+    def __init__(self, sink, rate: float, burst: int = None, selected_columns: list = None, pools: list = None,
+                 rng: np.random.Generator = None, report_interval: float = 10.0):
+        self.sink = sink
+        self.bucket = TokenBucket(rate, burst)
+        self.selected_columns = selected_columns or record_columns
+        self.pools = pools
+        self.rng = rng if rng is not None else np.random.default_rng()
+        self.report_interval = report_interval
+        self.emitted = 0
+        self.started_at = None
+        self.running = False
+
+    def set_rate(self, rate: float, burst: int = None):
+        self.bucket.set_rate(rate, burst)
+
+    def stats(self) -> dict:
+        """Return target vs achieved throughput counters."""
+        elapsed = time.monotonic() - self.started_at if self.started_at else 0.0
+        return {
+            'emitted': self.emitted,
+            'elapsed_seconds': round(elapsed, 3),
+            'target_rate': self.bucket.rate,
+            'achieved_rate': round(self.emitted / elapsed, 1) if elapsed > 0 else 0.0
+        }
+
+    def stop(self):
+        self.running = False
+
+    def run(self, duration: float = None, max_records: int = None) -> dict:
+        """Stream until stopped, `duration` seconds have passed or `max_records` were emitted."""
+        self.started_at = time.monotonic()
+        next_report = self.started_at + self.report_interval
+        self.running = True
+        try:
+            while self.running:
+                now = time.monotonic()
+                if duration is not None and now - self.started_at >= duration:
+                    break
+                limit = self.bucket.burst if max_records is None else min(self.bucket.burst, max_records - self.emitted)
+                if limit <= 0:
+                    break
+                count = self.bucket.take(limit)
+                batch = generate_batch(count, self.rng, selected_columns=self.selected_columns, pools=self.pools)
+                if TIMESTAMP_COLUMN in batch.columns:
+                    batch[TIMESTAMP_COLUMN] = pd.Timestamp.now().floor('s')
+                self.sink.write(batch)
+                self.emitted += count
+                if now >= next_report:
+                    print(f"Order stream: {self.stats()}", file=sys.stderr)
+                    next_report = now + self.report_interval
+        finally:
+            self.running = False
+            self.sink.close()
+        return self.stats()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Emit a continuous, rate-controlled stream of generated orders.")
+    parser.add_argument('--rate', type=float, default=1000, help="Target events per second")
+    parser.add_argument('--burst', type=int, default=None, help="Largest batch emitted at once (default: one second of events)")
+    parser.add_argument('--format', choices=['csv', 'ndjson'], default='ndjson')
+    parser.add_argument('--out-dir', help="Write rotating files to this directory")
+    parser.add_argument('--rotate-rows', type=int, default=100_000)
+    parser.add_argument('--rotate-seconds', type=float, default=60.0)
+    parser.add_argument('--socket', help="Send to host:port (TCP) or a Unix socket path instead of files")
+    parser.add_argument('--duration', type=float, default=None, help="Stop after this many seconds")
+    parser.add_argument('--max-records', type=int, default=None)
+    parser.add_argument('--customers', type=int, default=10_000, help="Customer pool size")
+    parser.add_argument('--products', type=int, default=500, help="Product pool size")
+    args = parser.parse_args()
+
+    if args.out_dir:
+        sink = RotatingFileSink(args.out_dir, args.format, args.rotate_rows, args.rotate_seconds)
+    elif args.socket:
+        sink = SocketSink(args.socket, args.format)
+    else:
+        sink = StreamSink(sys.stdout, args.format)
+
+    pools = [build_customer_pool(args.customers), build_product_pool(args.products)]
+    stream = OrderStream(sink, args.rate, args.burst, pools=pools)
+    try:
+        stats = stream.run(args.duration, args.max_records)
+    except KeyboardInterrupt:
+        stats = stream.stats()
+    print(f"Order stream finished: {stats}", file=sys.stderr)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,264 @@
+import argparse
+import heapq
+import json
+import os
+import time
+import numpy as np
+import pandas as pd
+from rogue_data import ROGUE_VALUES
+from table_io import iter_table_chunks
+
+# Registers = 2 ** precision; 14 gives ~0.8% standard error in 16 KiB per column
+HLL_PRECISION = 14
+
+# Counters kept per column by the heavy-hitter summary
+HEAVY_HITTER_COUNTERS = 100
+
+# Heavy hitters reported per column
+TOP_VALUES = 10
+
+# Values checked to decide whether a column holds numbers
+NUMERIC_SAMPLE = 100
+
+# Placeholder strings the rough generator writes into corrupted cells, plus -1 quantities
+INVALID_TOKENS = sorted({value for value in ROGUE_VALUES.values() if isinstance(value, str)})
+INVALID_NUMBERS = {column: value for column, value in ROGUE_VALUES.items() if not isinstance(value, str)}
+
+
+class HyperLogLog:
+    """HyperLogLog distinct-count sketch over 64-bit hashes; sketches of different chunks merge by max."""
+
+    def __init__(self, precision: int = HLL_PRECISION):
+        if not 11 <= precision <= 18:
+            raise ValueError("precision must be between 11 and 18")
+        self.precision = precision
+        self.registers = np.zeros(1 << precision, dtype=np.uint8)
+
+    def add_hashes(self, hashes: np.ndarray):
+        hashes = np.asarray(hashes, dtype=np.uint64)
+        if len(hashes) == 0:
+            return
+        low_bits = 64 - self.precision
+        index = (hashes >> np.uint64(low_bits)).astype(np.int64)
+        rest = hashes & np.uint64((1 << low_bits) - 1)
+        # rest has at most 53 bits, so float64 holds it exactly and frexp's exponent is its bit length
+        bit_length = np.frexp(rest.astype(np.float64))[1]
+        rank = (low_bits - bit_length + 1).astype(np.uint8)
+        np.maximum.at(self.registers, index, rank)
+
+    def add(self, values):
+        """Add the non-null values of a Series or Index; duplicates do not change the sketch."""
+        self.add_hashes(pd.util.hash_pandas_object(pd.Index(values).dropna(), index=False).to_numpy())
+
+    def merge(self, other: 'HyperLogLog'):
+        np.maximum(self.registers, other.registers, out=self.registers)
+
+    def estimate(self) -> int:
+        m = len(self.registers)
+        alpha = 0.7213 / (1 + 1.079 / m)
+        raw = alpha * m * m / np.sum(np.ldexp(1.0, -self.registers.astype(np.int64)))
+        zeros = int(np.count_nonzero(self.registers == 0))
+        if raw <= 2.5 * m and zeros:
+            return int(round(m * np.log(m / zeros)))  # Linear counting for small cardinalities
+        return int(round(raw))
+
+
+class HeavyHitters:
+    """Misra-Gries summary: keeps k counters and reports every value more frequent than n / (k + 1).
+
+    Counts are lower bounds that undercount by at most `error` (the total decrement so far).
+    """
+
+    def __init__(self, k: int = HEAVY_HITTER_COUNTERS):
+        self.k = k
+        self.counters = {}
+        self.error = 0
+
+    def add(self, counts: pd.Series):
+        """Add a chunk's value_counts()."""
+        if len(counts) == 0:
+            return
+        keys = counts.index.astype(str)
+        values = counts.to_numpy(dtype=np.int64)
+        if len(values) > self.k + 1:
+            # Values outside the chunk's k + 1 largest counts that are not counted yet end at or below the cut,
+            # so only those two groups are merged
+            keep = keys.isin(list(self.counters))
+            keep[np.argpartition(values, -(self.k + 1))[-(self.k + 1):]] = True
+            keys, values = keys[keep], values[keep]
+        counters = self.counters
+        for key, count in zip(keys.tolist(), values.tolist()):
+            counters[key] = counters.get(key, 0) + count
+        if len(counters) > self.k:
+            # Subtract the (k+1)-th largest count from every counter and drop those that hit zero
+            cut = heapq.nlargest(self.k + 1, counters.values())[-1]
+            self.counters = {key: count - cut for key, count in counters.items() if count > cut}
+            self.error += cut
+
+    def top(self, n: int = TOP_VALUES) -> list:
+        return [[value, count] for value, count in heapq.nlargest(n, self.counters.items(), key=lambda item: item[1])]
+
+
+class ColumnProfile:
+    """Running statistics for one column: nulls, invalid tokens, min/max, mean, distinct values, heavy hitters."""
+
+    def __init__(self, name: str, precision: int = HLL_PRECISION, counters: int = HEAVY_HITTER_COUNTERS):
+        self.name = name
+        self.dtypes = set()
+        self.count = 0
+        self.nulls = 0
+        self.invalid = 0
+        self.numeric_count = 0
+        self.numeric_sum = 0.0
+        self.numeric = None
+        self.minimum = None
+        self.maximum = None
+        self.distinct = HyperLogLog(precision)
+        self.heavy_hitters = HeavyHitters(counters)
+
+    def _update_range(self, low, high):
+        self.minimum = low if self.minimum is None else min(self.minimum, low)
+        self.maximum = high if self.maximum is None else max(self.maximum, high)
+
+    def add(self, series: pd.Series):
+        self.dtypes.add(str(series.dtype))
+        self.count += len(series)
+        present = series.dropna()
+        self.nulls += len(series) - len(present)
+        invalid = present.isin(INVALID_TOKENS)
+        if self.name in INVALID_NUMBERS:
+            invalid |= pd.to_numeric(present, errors='coerce') == INVALID_NUMBERS[self.name]
+        self.invalid += int(invalid.sum())
+        valid = present[~invalid]
+
+        if pd.api.types.is_datetime64_any_dtype(valid):
+            # ISO strings order like the timestamps they spell
+            if len(valid):
+                self._update_range(str(valid.min()), str(valid.max()))
+        elif self.numeric is None and len(valid):
+            # The first values decide whether the column is numeric (possibly stored as text) or text
+            sample = valid.head(NUMERIC_SAMPLE)
+            self.numeric = bool(pd.api.types.is_numeric_dtype(valid)
+                                or pd.to_numeric(sample, errors='coerce').notna().all())
+        if self.numeric and not pd.api.types.is_datetime64_any_dtype(valid):
+            numbers = valid if pd.api.types.is_numeric_dtype(valid) else pd.to_numeric(valid, errors='coerce').dropna()
+            if len(numbers):
+                self.numeric_count += len(numbers)
+                self.numeric_sum += float(numbers.sum())
+                self._update_range(float(numbers.min()), float(numbers.max()))
+        elif len(valid):
+            # Text columns report their lexicographic range; for ISO timestamps that is the time range
+            text = valid.astype(str)
+            self._update_range(text.min(), text.max())
+
+        # One hash pass per chunk: both sketches work from the distinct values and their counts
+        counts = present.value_counts(sort=False)
+        self.distinct.add(counts.index)
+        self.heavy_hitters.add(counts)
+
+    def to_dict(self, top: int = TOP_VALUES) -> dict:
+        return {
+            'dtype': sorted(self.dtypes),
+            'count': self.count,
+            'nulls': self.nulls,
+            'invalid': self.invalid,
+            'min': self.minimum,
+            'max': self.maximum,
+            'mean': self.numeric_sum / self.numeric_count if self.numeric_count else None,
+            'distinct_estimate': self.distinct.estimate(),
+            'heavy_hitters': self.heavy_hitters.top(top),
+            'heavy_hitter_error': self.heavy_hitters.error
+        }
+
+
+class Profiler:
+    """Profile a stream of DataFrame chunks in one pass with memory bounded by the sketch sizes."""
+
+    def __init__(self, precision: int = HLL_PRECISION, counters: int = HEAVY_HITTER_COUNTERS):
+        self.precision = precision
+        self.counters = counters
+        self.columns = {}
+        self.rows = 0
+
+    def add(self, chunk: pd.DataFrame):
+        self.rows += len(chunk)
+        for name in chunk.columns:
+            if name not in self.columns:
+                self.columns[name] = ColumnProfile(name, self.precision, self.counters)
+            self.columns[name].add(chunk[name])
+
+    def to_dict(self, top: int = TOP_VALUES) -> dict:
+        return {
+            'rows': self.rows,
+            'columns': {name: column.to_dict(top) for name, column in self.columns.items()}
+        }
+
+
+def profile_path(path: str) -> str:
+    """Sidecar file the profile of path is written to."""
+    return path + '.profile.json'
+
+def source_stamp(path: str) -> dict:
+    """Size and mtime of a file, saved with anything derived from it to detect when it changes."""
+    stat = os.stat(path)
+    return {'file': os.path.abspath(path), 'bytes': stat.st_size, 'mtime': stat.st_mtime}
+
+def profile_chunks(chunks, precision: int = HLL_PRECISION, counters: int = HEAVY_HITTER_COUNTERS,
+                   top: int = TOP_VALUES) -> dict:
+    """Profile an iterable of DataFrame chunks."""
+    profiler = Profiler(precision, counters)
+    started_at = time.perf_counter()
+    for chunk in chunks:
+        profiler.add(chunk)
+    profile = profiler.to_dict(top)
+    profile['profile_seconds'] = round(time.perf_counter() - started_at, 3)
+    return profile
+
+def write_profile(profile: dict, path: str, sidecar: str = None) -> dict:
+    """Stamp a profile with the size and mtime of the file it describes and write its JSON sidecar."""
+    profile['source'] = source_stamp(path)
+    with open(sidecar or profile_path(path), 'w') as file:
+        json.dump(profile, file, indent=2, default=str)
+    return profile
+
+def profile_file(path: str, chunk_size: int = 100_000, sidecar: str = None, **options) -> dict:
+    """Stream a CSV, Parquet or Arrow file once, write its profile to the JSON sidecar and return it."""
+    return write_profile(profile_chunks(iter_table_chunks(path, chunk_size), **options), path, sidecar)
+
+def load_profile(path: str, sidecar: str = None) -> dict:
+    """Return the saved profile of path, or None if there is none or the file changed since."""
+    sidecar = sidecar or profile_path(path)
+    if not os.path.exists(sidecar) or not os.path.exists(path):
+        return None
+    with open(sidecar) as file:
+        profile = json.load(file)
+    source = source_stamp(path)
+    stamp = profile.get('source', {})
+    return profile if (stamp.get('bytes'), stamp.get('mtime')) == (source['bytes'], source['mtime']) else None
+
+def profile_table(profile: dict) -> pd.DataFrame:
+    """One row per column with the scalar statistics, for display."""
+    rows = {
+        name: {key: (', '.join(value) if key == 'dtype' else value)
+               for key, value in stats.items() if key not in ('heavy_hitters', 'heavy_hitter_error')}
+        for name, stats in profile['columns'].items()
+    }
+    return pd.DataFrame.from_dict(rows, orient='index')
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Profile a data file in one streaming pass.")
+    parser.add_argument('file', help="CSV, Parquet or Arrow file")
+    parser.add_argument('--chunk-size', type=int, default=100_000)
+    parser.add_argument('--sidecar', help="Default: <file>.profile.json")
+    parser.add_argument('--top', type=int, default=TOP_VALUES, help="Heavy hitters reported per column")
+    args = parser.parse_args()
+
+    profile = profile_file(args.file, args.chunk_size, args.sidecar, top=args.top)
+    print(profile_table(profile).to_string())
+    print(f"Profiled {profile['rows']} rows in {profile['profile_seconds']} s; "
+          f"written to {args.sidecar or profile_path(args.file)}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,58 @@
+import numpy as np
+import pandas as pd
+from table_io import read_table
+
+# Invalid value written into each corruptible column
+ROGUE_VALUES = {
+    'Order_Id': 'InvalidUUID',
+    'Customer_Id': 'InvalidCustomerId',
+    'Product_Id': 'InvalidProductId',
+    'Product_Category': 'InvalidCategory',
+    'Quantity_ordered': -1,
+    'Price': 'InvalidPrice',
+    'Customer_City': 'InvalidCity',
+    'Payment_Transaction_Confirmation_Id': 'InvalidUUID'
+}
+
+# Default per-column corruption rates: one in ten rows, like the old index % 10 rules
+DEFAULT_ROGUE_RATES = {column: 0.1 for column in ROGUE_VALUES}
+
+
+def inject_rogue_values(df: pd.DataFrame, rates: dict = None, rng: np.random.Generator = None,
+                        rogue_values: dict = None) -> tuple:
+    """Corrupt cells of a clean batch at per-column rates in one vectorized pass.
+
+    Each column listed in `rates` (and present in df) gets an independent Bernoulli mask;
+    masked cells are overwritten with the column's rogue value. Returns the corrupted
+    DataFrame and a boolean DataFrame marking exactly which cells were corrupted.
+    """
+    rates = DEFAULT_ROGUE_RATES if rates is None else rates
+    rogue_values = ROGUE_VALUES if rogue_values is None else rogue_values
+    rng = rng if rng is not None else np.random.default_rng()
+
+    columns = [column for column in rates if column in df.columns]
+    mask = pd.DataFrame(False, index=df.index, columns=columns)
+    for column in columns:
+        hits = rng.random(len(df)) < rates[column]
+        if hits.any():
+            # mask() upcasts as needed, e.g. 'InvalidPrice' turns a float column into object
+            df[column] = df[column].mask(hits, rogue_values[column])
+        mask[column] = hits
+    return df, mask
+
+def save_rogue_mask(mask: pd.DataFrame, file_path: str, header: bool = True, mode: str = 'w'):
+    """Write corrupted cells as (row, column) pairs, using the mask's index as the row number."""
+    rows, cols = np.nonzero(mask.to_numpy())
+    pd.DataFrame({
+        'row': mask.index.to_numpy()[rows],
+        'column': mask.columns.to_numpy()[cols]
+    }).to_csv(file_path, mode=mode, header=header, index=False)
+
+def load_rogue_mask(file_path: str, index: pd.Index, columns: list) -> pd.DataFrame:
+    """Rebuild a boolean ground-truth mask from a file written by save_rogue_mask."""
+    cells = read_table(file_path)
+    mask = pd.DataFrame(False, index=index, columns=columns)
+    for column, rows in cells.groupby('column')['row']:
+        if column in mask.columns:
+            mask.loc[rows.to_numpy(), column] = True
+    return mask
@@ -1,6 +1,16 @@
+import numpy as np
 import pandas as pd
 import random
-from datetime import datetime, timedelta
+from datetime import date, datetime, time, timedelta
+from functools import partial
+from typing import Iterable, Iterator
+from sharding import run_sharded
+from rogue_data import inject_rogue_values, save_rogue_mask
+from uuid_utils import bulk_uuid4
+from csv_writer import CSVWriter
+from table_io import TableWriter, write_table
+from shard_writer import write_shards, DEFAULT_TARGET_BYTES
+from schema import ROUGH_COLUMN_ORDER
 
 # Constants for random choices
 PRODUCT_NAMES = ['Widget A', 'Widget B', 'Widget C', 'Widget D', 'Widget E']
@@ -21,57 +31,180 @@ UUID_LIST = [
 ]  # Only 5 UUIDs in this reduced list
 
 # Correctly ordered columns
-COLUMNS = [
-    'Order_Id', 'Customer_Id', 'Customer_Name', 'Product_Id', 'Product_Name',
-    'Product_Category', 'Payment_Type', 'Quantity_ordered', 'Price',
-    'Date_and_Time_When_Order_Was_Placed', 'Customer_Country', 'Customer_City',
-    'Site_From_Where_Order_Was_Placed', 'Payment_Transaction_Confirmation_Id',
-    'Payment_Success_or_Failure', 'Payment_Failure_Reason'
-]
-
-def generate_record(index: int) -> dict:
-    """Generate a single order record with a mix of valid and invalid data based on index."""
-    
-    uuid_index = index % len(UUID_LIST)  # Wrap index to cycle through the reduced UUID_LIST
-    
-    record = {
-        'Order_Id': UUID_LIST[uuid_index] if index % 10 != 0 else 'InvalidUUID',  # Invalid UUID every 10th record
-        'Customer_Id': UUID_LIST[uuid_index] if index % 10 != 1 else 'InvalidCustomerId',  # Invalid Customer Id every 10th + 1 record
-        'Customer_Name': f'Customer_{index}',
-        'Product_Id': UUID_LIST[uuid_index] if index % 10 != 2 else 'InvalidProductId',  # Invalid Product Id every 10th + 2 record
-        'Product_Name': random.choice(PRODUCT_NAMES),
-        'Product_Category': random.choice(CATEGORIES) if index % 10 != 3 else 'InvalidCategory',  # Invalid Category every 10th + 3 record
-        'Payment_Type': random.choice(PAYMENT_TYPES),
-        'Quantity_ordered': random.randint(1, 5) if index % 10 != 4 else -1,  # Invalid Quantity every 10th + 4 record
-        'Price': round(random.uniform(10, 1000), 2) if index % 10 != 5 else 'InvalidPrice',  # Invalid Price every 10th + 5 record
-        'Date_and_Time_When_Order_Was_Placed': datetime.now() - timedelta(days=random.randint(1, 365)),
-        'Customer_Country': random.choice(COUNTRIES),
-        'Customer_City': f'City_{index}' if index % 10 != 6 else 'InvalidCity',  # Invalid City every 10th + 6 record
-        'Site_From_Where_Order_Was_Placed': random.choice(SITES),
-        'Payment_Transaction_Confirmation_Id': UUID_LIST[uuid_index] if index % 10 != 7 else 'InvalidUUID',  # Invalid Transaction ID every 10th + 7 record
-        'Payment_Success_or_Failure': random.choice(PAYMENT_STATUS),
-        'Payment_Failure_Reason': random.choice(FAILURE_REASONS) if random.choice(PAYMENT_STATUS) == 'N' else None
-    }
-    
-    return record
+COLUMNS = ROUGH_COLUMN_ORDER
+
+# Per-column generators taking (index, rng, now); only the requested columns are ever evaluated
+FIELD_GENERATORS = {
+    'Order_Id': lambda index, rng, now: UUID_LIST[index % len(UUID_LIST)] if index % 10 != 0 else 'InvalidUUID',  # Invalid UUID every 10th record
+    'Customer_Id': lambda index, rng, now: UUID_LIST[index % len(UUID_LIST)] if index % 10 != 1 else 'InvalidCustomerId',  # Invalid Customer Id every 10th + 1 record
+    'Customer_Name': lambda index, rng, now: f'Customer_{index}',
+    'Product_Id': lambda index, rng, now: UUID_LIST[index % len(UUID_LIST)] if index % 10 != 2 else 'InvalidProductId',  # Invalid Product Id every 10th + 2 record
+    'Product_Name': lambda index, rng, now: rng.choice(PRODUCT_NAMES),
+    'Product_Category': lambda index, rng, now: rng.choice(CATEGORIES) if index % 10 != 3 else 'InvalidCategory',  # Invalid Category every 10th + 3 record
+    'Payment_Type': lambda index, rng, now: rng.choice(PAYMENT_TYPES),
+    'Quantity_ordered': lambda index, rng, now: rng.randint(1, 5) if index % 10 != 4 else -1,  # Invalid Quantity every 10th + 4 record
+    'Price': lambda index, rng, now: round(rng.uniform(10, 1000), 2) if index % 10 != 5 else 'InvalidPrice',  # Invalid Price every 10th + 5 record
+    'Date_and_Time_When_Order_Was_Placed': lambda index, rng, now: now - timedelta(days=rng.randint(1, 365)),
+    'Customer_Country': lambda index, rng, now: rng.choice(COUNTRIES),
+    'Customer_City': lambda index, rng, now: f'City_{index}' if index % 10 != 6 else 'InvalidCity',  # Invalid City every 10th + 6 record
+    'Site_From_Where_Order_Was_Placed': lambda index, rng, now: rng.choice(SITES),
+    'Payment_Transaction_Confirmation_Id': lambda index, rng, now: UUID_LIST[index % len(UUID_LIST)] if index % 10 != 7 else 'InvalidUUID',  # Invalid Transaction ID every 10th + 7 record
+    'Payment_Success_or_Failure': lambda index, rng, now: rng.choice(PAYMENT_STATUS),
+    'Payment_Failure_Reason': lambda index, rng, now: rng.choice(FAILURE_REASONS) if rng.choice(PAYMENT_STATUS) == 'N' else None
+}
+
+def generate_record(index: int, rng: random.Random = random, now: datetime = None, columns: list = None) -> dict:
+    """Generate a single order record with a mix of valid and invalid data based on index.
+
+    Only the given columns (default: all COLUMNS) are computed.
+    """
+    now = now or datetime.now()
+    return {column: FIELD_GENERATORS[column](index, rng, now) for column in (columns or COLUMNS)}
+
+def _pick(values: list, rng: np.random.Generator, n: int) -> np.ndarray:
+    return np.array(values, dtype=object)[rng.integers(0, len(values), size=n)]
+
+# Vectorized, corruption-free counterparts of FIELD_GENERATORS taking (index array, rng, now)
+BATCH_FIELD_GENERATORS = {
+    'Order_Id': lambda index, rng, now: np.array(UUID_LIST, dtype=object)[index % len(UUID_LIST)],
+    'Customer_Id': lambda index, rng, now: np.array(UUID_LIST, dtype=object)[index % len(UUID_LIST)],
+    'Customer_Name': lambda index, rng, now: 'Customer_' + index.astype(str).astype(object),
+    'Product_Id': lambda index, rng, now: np.array(UUID_LIST, dtype=object)[index % len(UUID_LIST)],
+    'Product_Name': lambda index, rng, now: _pick(PRODUCT_NAMES, rng, len(index)),
+    'Product_Category': lambda index, rng, now: _pick(CATEGORIES, rng, len(index)),
+    'Payment_Type': lambda index, rng, now: _pick(PAYMENT_TYPES, rng, len(index)),
+    'Quantity_ordered': lambda index, rng, now: rng.integers(1, 6, size=len(index)),
+    'Price': lambda index, rng, now: np.round(rng.uniform(10, 1000, size=len(index)), 2),
+    'Date_and_Time_When_Order_Was_Placed': lambda index, rng, now: (
+        np.datetime64(now, 'us') - rng.integers(1, 366, size=len(index)).astype('timedelta64[D]')
+    ),
+    'Customer_Country': lambda index, rng, now: _pick(COUNTRIES, rng, len(index)),
+    'Customer_City': lambda index, rng, now: 'City_' + index.astype(str).astype(object),
+    'Site_From_Where_Order_Was_Placed': lambda index, rng, now: _pick(SITES, rng, len(index)),
+    'Payment_Transaction_Confirmation_Id': lambda index, rng, now: np.array(UUID_LIST, dtype=object)[index % len(UUID_LIST)],
+    'Payment_Success_or_Failure': lambda index, rng, now: _pick(PAYMENT_STATUS, rng, len(index)),
+    'Payment_Failure_Reason': lambda index, rng, now: np.where(
+        _pick(PAYMENT_STATUS, rng, len(index)) == 'N', _pick(FAILURE_REASONS, rng, len(index)), None
+    )
+}
+
+# Key columns taken from entity pools when pools are given; the other pooled attributes
+# (names, cities) stay messy because that is what the cleansing stage is tested on
+POOLED_COLUMNS = ['Customer_Id', 'Product_Id']
+
+# Per-order IDs that become unique (instead of cycling UUID_LIST) when pools are given
+UNIQUE_ID_COLUMNS = ['Order_Id', 'Payment_Transaction_Confirmation_Id']
+
+def generate_clean_batch(start_index: int, num_records: int, rng: np.random.Generator, now: datetime,
+                         columns: list = None, pools: list = None) -> pd.DataFrame:
+    """Build rows start_index..start_index + num_records one column array at a time, without corruption.
+
+    With entity pools, customer/product IDs repeat with realistic skewed cardinality and
+    order IDs are unique, instead of all cycling through UUID_LIST.
+    """
+    columns = columns or COLUMNS
+    index = np.arange(start_index, start_index + num_records)
+    values = {}
+    if pools:
+        for pool in pools:
+            pool_columns = [column for column in pool.columns if column in POOLED_COLUMNS and column in columns]
+            if pool_columns:
+                values.update(pool.sample(rng, num_records, pool_columns))
+        for column in UNIQUE_ID_COLUMNS:
+            if column in columns:
+                values[column] = bulk_uuid4(num_records, rng)
+    for column in columns:
+        if column not in values:
+            values[column] = BATCH_FIELD_GENERATORS[column](index, rng, now)
+    return pd.DataFrame(values, columns=columns, index=index)
 
 def generate_records(num_records: int, selected_columns: list) -> pd.DataFrame:
     """Generate a DataFrame containing a specified number of order records with only the selected columns."""
-    # Generate all records with the full set of columns
-    records = [generate_record(i) for i in range(num_records)]
+    # Generate only the selected columns
+    columns = selected_columns or COLUMNS
+    records = [generate_record(i, columns=columns) for i in range(num_records)]
     
     # Convert the list of records to a DataFrame
-    df = pd.DataFrame(records, columns=COLUMNS)
-    
-    # Filter DataFrame based on selected columns
-    if selected_columns:
-        df = df[selected_columns]
-    
-    return df
+    return pd.DataFrame(records, columns=columns)
+
+def iter_record_chunks(num_records: int, selected_columns: list, chunk_size: int = 100_000,
+                       rng: np.random.Generator = None, now: datetime = None, start_index: int = 0,
+                       rates: dict = None, return_mask: bool = False, pools: list = None) -> Iterator:
+    """Yield the records as DataFrames of at most chunk_size rows, so memory stays flat for any num_records.
+
+    Each chunk is built clean and then corrupted by rogue_data.inject_rogue_values at the given
+    per-column rates. With return_mask=True, (chunk, corruption_mask) pairs are yielded instead.
+    """
+    rng = rng if rng is not None else np.random.default_rng()
+    now = now or datetime.now()
+    columns = selected_columns or COLUMNS
+    end_index = start_index + num_records
+    for start in range(start_index, end_index, chunk_size):
+        stop = min(start + chunk_size, end_index)
+        chunk = generate_clean_batch(start, stop - start, rng, now, columns, pools)
+        chunk, mask = inject_rogue_values(chunk, rates, rng)
+        yield (chunk, mask) if return_mask else chunk
+
+def save_chunks_to_csv(chunks: Iterable, file_path: str, mask_path: str = None, file_format: str = None) -> pd.DataFrame:
+    """Append each chunk to a CSV, Parquet or Arrow file as it is produced and return the first chunk for previews.
+
+    When mask_path is given, chunks must be (chunk, mask) pairs and the corrupted cells are
+    written to mask_path as ground truth.
+    """
+    first_chunk = None
+    with TableWriter(file_path, file_format) as writer:
+        for item in chunks:
+            chunk, mask = item if mask_path else (item, None)
+            header = first_chunk is None
+            writer.write(chunk)
+            if mask is not None:
+                save_rogue_mask(mask, mask_path, header=header, mode='w' if header else 'a')
+            if first_chunk is None:
+                first_chunk = chunk
+    print(f"Data saved to {file_path}")
+    return first_chunk
+
+def _save_masks(items: Iterable, mask_path: str) -> Iterator[pd.DataFrame]:
+    """Write the mask of each (chunk, mask) pair to mask_path and yield the chunks."""
+    for index, (chunk, mask) in enumerate(items):
+        save_rogue_mask(mask, mask_path, header=index == 0, mode='w' if index == 0 else 'a')
+        yield chunk
+
+def save_chunks_to_shards(chunks: Iterable, output_dir: str, compression: str = 'gzip',
+                          target_bytes: int = DEFAULT_TARGET_BYTES, workers: int = None, mask_path: str = None) -> str:
+    """Write chunks as compressed CSV shards plus a manifest for parallel upload; returns the manifest path.
+
+    As in save_chunks_to_csv, with mask_path the chunks are (chunk, mask) pairs and the masks are saved there.
+    """
+    if mask_path:
+        chunks = _save_masks(chunks, mask_path)
+    manifest_path = write_shards(chunks, output_dir, compression=compression, target_bytes=target_bytes, workers=workers)
+    print(f"Data saved to {output_dir}")
+    return manifest_path
+
+def write_shard(part_file: str, num_records: int, start_index: int, selected_columns: list, seed: int,
+                now: datetime = None, pools: list = None):
+    """Generate one shard of a parallel run with its own seeded RNG and save it to part_file."""
+    chunks = iter_record_chunks(num_records, selected_columns, rng=np.random.default_rng(seed), now=now,
+                                start_index=start_index, pools=pools)
+    with CSVWriter(part_file) as writer:
+        for chunk in chunks:
+            writer.write(chunk)
+
+def generate_records_parallel(file_path: str, num_records: int, selected_columns: list, workers: int = None,
+                              seed: int = 0, concatenate: bool = True, now: datetime = None, pools: list = None) -> list:
+    """Generate records across a process pool and write one part file per shard.
+
+    Rerunning with the same seed, worker count (default: sharding.DEFAULT_WORKERS, not the
+    CPU count) and `now` (default: today's midnight) produces byte-identical output on any machine. Returns the written file paths.
+    """
+    now = now or datetime.combine(date.today(), time())
+    return run_sharded(partial(write_shard, now=now, pools=pools), file_path, num_records, selected_columns,
+                       workers=workers, master_seed=seed, concatenate=concatenate)
 
-def save_to_csv(dataframe: pd.DataFrame, file_path: str):
-    """Save the DataFrame to a CSV file."""
-    dataframe.to_csv(file_path, mode='w', header=True, index=False)
+def save_to_csv(dataframe: pd.DataFrame, file_path: str, file_format: str = None):
+    """Save the DataFrame to a CSV file, or Parquet / Arrow IPC by extension or file_format."""
+    write_table(dataframe, file_path, file_format)
     print(f"Data saved to {file_path}")
 
 def display_dataframe_info(dataframe: pd.DataFrame):
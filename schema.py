@@ -0,0 +1,118 @@
+from timestamps import TIMESTAMP_FORMATS
+
+try:
+    import pyarrow as pa
+    import pyarrow.csv as pa_csv
+except ImportError:  # Without pyarrow CSV files are read by pandas with the string columns typed
+    pa = None
+
+# 'uuid': canonical UUID text, 'text': free text, 'category': a few repeated values,
+# 'integer' / 'decimal': numbers, 'timestamp': date and time in one of the column's formats
+KINDS = ('uuid', 'text', 'category', 'integer', 'decimal', 'timestamp')
+
+
+class Column:
+    """One field of the order record: its name, kind of value, whether it may be empty and its date formats."""
+
+    def __init__(self, name: str, kind: str, nullable: bool = False, formats: list = None):
+        if kind not in KINDS:
+            raise ValueError(f"Unknown column kind: {kind}")
+        self.name = name
+        self.kind = kind
+        self.nullable = nullable
+        self.formats = formats or []
+
+    def __repr__(self) -> str:
+        return f"Column({self.name!r}, {self.kind!r})"
+
+
+# The order record, in generation order. Nullable columns may be empty in cleaned files;
+# rough files can hold anything, which readers keep as text.
+COLUMNS = [
+    Column('Order_Id', 'uuid'),
+    Column('Customer_Id', 'uuid'),
+    Column('Customer_Name', 'text'),
+    Column('Product_Id', 'uuid'),
+    Column('Product_Category', 'category'),
+    Column('Product_Name', 'category'),
+    Column('Payment_Type', 'category'),
+    Column('Quantity_ordered', 'integer'),
+    Column('Price', 'decimal'),
+    Column('Date_and_Time_When_Order_Was_Placed', 'timestamp', formats=TIMESTAMP_FORMATS),
+    Column('Customer_Country', 'category'),
+    Column('Customer_City', 'category'),
+    Column('Site_From_Where_Order_Was_Placed', 'category'),
+    Column('Payment_Transaction_Confirmation_Id', 'uuid'),
+    Column('Payment_Success_or_Failure', 'category'),
+    Column('Payment_Failure_Reason', 'category', nullable=True)
+]
+
+SCHEMA = {column.name: column for column in COLUMNS}
+
+COLUMN_NAMES = [column.name for column in COLUMNS]
+
+# Column order of rough files
+ROUGH_COLUMN_ORDER = [
+    'Order_Id', 'Customer_Id', 'Customer_Name', 'Product_Id', 'Product_Name',
+    'Product_Category', 'Payment_Type', 'Quantity_ordered', 'Price',
+    'Date_and_Time_When_Order_Was_Placed', 'Customer_Country', 'Customer_City',
+    'Site_From_Where_Order_Was_Placed', 'Payment_Transaction_Confirmation_Id',
+    'Payment_Success_or_Failure', 'Payment_Failure_Reason'
+]
+
+# Column order of cleansed output
+OUTPUT_COLUMN_ORDER = [
+    'Order_Id', 'Customer_Id', 'Customer_Name', 'Product_Id', 'Product_Category',
+    'Product_Name', 'Quantity_ordered', 'Price', 'Date_and_Time_When_Order_Was_Placed',
+    'Customer_Country', 'Customer_City', 'Site_From_Where_Order_Was_Placed', 'Payment_Type',
+    'Payment_Transaction_Confirmation_Id', 'Payment_Success_or_Failure', 'Payment_Failure_Reason'
+]
+
+def columns_of_kind(kind: str) -> list:
+    return [column.name for column in COLUMNS if column.kind == kind]
+
+UUID_COLUMNS = columns_of_kind('uuid')
+
+# Kinds read as strings by pandas when pyarrow is missing; numbers and dates are left to inference there
+STRING_KINDS = ('uuid', 'text', 'category')
+
+
+def arrow_type(column: Column):
+    """Arrow type a column is parsed into; categories are dictionary-encoded as they are read."""
+    return {
+        'uuid': pa.string(),
+        'text': pa.string(),
+        'category': pa.dictionary(pa.int32(), pa.string()),
+        'integer': pa.int64(),
+        'decimal': pa.float64(),
+        'timestamp': pa.timestamp('us')
+    }[column.kind]
+
+def record_schema(names: list = None):
+    """Arrow schema of the given columns (default: all, in generation order), with their nullability."""
+    return pa.schema([pa.field(name, arrow_type(SCHEMA[name]), nullable=SCHEMA[name].nullable)
+                      for name in names or COLUMN_NAMES])
+
+def timestamp_parsers(names: list = None) -> list:
+    """Formats Arrow tries on timestamp columns: ISO 8601 (with fractional seconds) then each registered format.
+
+    Arrow's strptime has no %f, so formats with fractions are left to the ISO parser.
+    """
+    formats = [fmt for name in names or COLUMN_NAMES for fmt in SCHEMA[name].formats if '%f' not in fmt]
+    return [pa_csv.ISO8601] + list(dict.fromkeys(formats))
+
+def csv_convert_options(names: list, text_columns: set = (), include_columns: list = None):
+    """Arrow CSV conversion options typing every registered column in names; others are inferred.
+
+    Columns in text_columns are read as plain strings (used for files whose values do not all
+    convert, such as rough data with 'InvalidPrice' prices). Empty cells are nulls, as in pandas.
+    """
+    known = [name for name in names if name in SCHEMA]
+    column_types = {name: arrow_type(SCHEMA[name]) for name in known}
+    column_types.update({name: pa.string() for name in text_columns})
+    return pa_csv.ConvertOptions(column_types=column_types, include_columns=include_columns or [],
+                                 timestamp_parsers=timestamp_parsers(known), strings_can_be_null=True)
+
+def pandas_dtypes(names: list = None) -> dict:
+    """dtype argument for pd.read_csv: the string columns, which never need inference."""
+    return {name: str for name in names or COLUMN_NAMES if name in SCHEMA and SCHEMA[name].kind in STRING_KINDS}
@@ -0,0 +1,137 @@
+import gzip
+import hashlib
+import json
+import os
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from typing import Iterable
+import pandas as pd
+from csv_writer import encode_header, encode_rows
+
+try:
+    import zstandard
+except ImportError:  # zstd output is optional; gzip is always available
+    zstandard = None
+
+# Uncompressed CSV bytes per shard; BigQuery and GCS handle many ~100 MB objects well
+DEFAULT_TARGET_BYTES = 128 * 1024 * 1024
+
+MANIFEST_NAME = 'manifest.json'
+
+EXTENSIONS = {'gzip': '.csv.gz', 'zstd': '.csv.zst', None: '.csv'}
+
+# Compressions by the names command lines and the UI offer; 'none' writes plain CSV shards
+COMPRESSIONS = {'gzip': 'gzip', 'zstd': 'zstd', 'none': None}
+
+
+def compress(data: bytes, compression: str) -> bytes:
+    """Compress one shard's bytes; gzip and zstd both release the GIL, so shards compress in parallel."""
+    if compression == 'gzip':
+        return gzip.compress(data, compresslevel=6)
+    if compression == 'zstd':
+        if zstandard is None:
+            raise ImportError("zstd compression requires the 'zstandard' package")
+        return zstandard.ZstdCompressor(level=3).compress(data)
+    if compression is None:
+        return data
+    raise ValueError(f"Unsupported compression: {compression}")
+
+def _write_shard(path: str, header: bytes, parts: list, rows: int, compression: str) -> dict:
+    data = header + b''.join(parts)
+    payload = compress(data, compression)
+    with open(path, 'wb') as file:
+        file.write(payload)
+    return {
+        'file': os.path.basename(path),
+        'rows': rows,
+        'bytes': len(payload),
+        'uncompressed_bytes': len(data),
+        'sha256': hashlib.sha256(payload).hexdigest()
+    }
+
+def write_shards(chunks: Iterable[pd.DataFrame], out_dir: str, prefix: str = 'part', compression: str = 'gzip',
+                 target_bytes: int = DEFAULT_TARGET_BYTES, workers: int = None) -> str:
+    """Write a stream of DataFrame chunks as compressed CSV shards of about target_bytes each.
+
+    Every shard is a standalone CSV with its own header. Chunks are encoded, and shards
+    compressed and written, by a thread pool with at most `workers` chunks and `workers` shards
+    in flight, which bounds memory; chunks keep their order. A manifest listing each shard's
+    row count, sizes and SHA-256 checksum is written last; its path is returned.
+    """
+    workers = workers or os.cpu_count() or 1
+    os.makedirs(out_dir, exist_ok=True)
+    extension = EXTENSIONS[compression]
+    columns = None
+    encoding, pending, shards = deque(), deque(), []
+    parts, part_rows, part_bytes = [], 0, 0
+
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        def flush():
+            nonlocal parts, part_rows, part_bytes
+            path = os.path.join(out_dir, f"{prefix}-{len(pending) + len(shards):05d}{extension}")
+            if len(pending) >= workers:
+                shards.append(pending.popleft().result())  # Backpressure: wait for the oldest shard
+            pending.append(pool.submit(_write_shard, path, encode_header(columns or []), parts, part_rows, compression))
+            parts, part_rows, part_bytes = [], 0, 0
+
+        def add_oldest():
+            nonlocal part_rows, part_bytes
+            rows, future = encoding.popleft()
+            data = future.result()
+            parts.append(data)
+            part_rows += rows
+            part_bytes += len(data)
+            if part_bytes >= target_bytes:
+                flush()
+
+        for chunk in chunks:
+            if columns is None:
+                columns = chunk.columns.tolist()
+            encoding.append((len(chunk), pool.submit(encode_rows, chunk)))
+            if len(encoding) >= workers:
+                add_oldest()  # Backpressure: shards are cut in chunk order
+        while encoding:
+            add_oldest()
+        if parts or not (pending or shards):
+            flush()
+        shards.extend(future.result() for future in pending)
+
+    manifest = {
+        'format': 'csv',
+        'compression': compression,
+        'header': True,
+        'columns': columns or [],
+        'total_rows': sum(shard['rows'] for shard in shards),
+        'shards': shards
+    }
+    manifest_path = os.path.join(out_dir, MANIFEST_NAME)
+    with open(manifest_path, 'w') as file:
+        json.dump(manifest, file, indent=2)
+    return manifest_path
+
+def iter_frame_chunks(df: pd.DataFrame, chunk_size: int = 100_000) -> Iterable[pd.DataFrame]:
+    """Split an in-memory DataFrame into row chunks for write_shards."""
+    for start in range(0, len(df), chunk_size):
+        yield df.iloc[start:start + chunk_size]
+
+def load_manifest(manifest_path: str) -> dict:
+    """Read a shard manifest written by write_shards."""
+    with open(manifest_path) as file:
+        return json.load(file)
+
+def preview_shards(manifest_path: str, rows: int = 5) -> pd.DataFrame:
+    """First rows of the first shard of a manifest, for previews (pandas decompresses by extension)."""
+    shards = load_manifest(manifest_path)['shards']
+    return pd.read_csv(os.path.join(os.path.dirname(manifest_path), shards[0]['file']), nrows=rows)
+
+def verify_shards(manifest_path: str) -> list:
+    """Return the shard files whose size or checksum no longer match the manifest."""
+    out_dir = os.path.dirname(manifest_path)
+    mismatched = []
+    for shard in load_manifest(manifest_path)['shards']:
+        path = os.path.join(out_dir, shard['file'])
+        with open(path, 'rb') as file:
+            payload = file.read()
+        if len(payload) != shard['bytes'] or hashlib.sha256(payload).hexdigest() != shard['sha256']:
+            mismatched.append(shard['file'])
+    return mismatched
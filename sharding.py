@@ -0,0 +1,93 @@
+import os
+import shutil
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+import numpy as np
+
+# Shards of a sharded run when no worker count is given. Fixed, not os.cpu_count(), because the shard
+# layout decides the output: a seed then reproduces the same data on any machine
+DEFAULT_WORKERS = 4
+
+
+def shard_sizes(num_records: int, workers: int) -> list:
+    """Split num_records into `workers` contiguous shard sizes that differ by at most one."""
+    base, extra = divmod(num_records, workers)
+    return [base + (1 if shard < extra else 0) for shard in range(workers)]
+
+def shard_seeds(master_seed: int, workers: int) -> list:
+    """Derive one independent, reproducible seed per shard from the master seed."""
+    children = np.random.SeedSequence(master_seed).spawn(workers)
+    return [int(child.generate_state(1)[0]) for child in children]
+
+def part_file_name(file_name: str, shard: int) -> str:
+    """Return the part file path for a shard, e.g. data.csv -> data.part-00003.csv."""
+    root, ext = os.path.splitext(file_name)
+    return f"{root}.part-{shard:05d}{ext}"
+
+def concatenate_parts(part_files: list, file_name: str):
+    """Concatenate CSV part files into one file, keeping only the first header."""
+    with open(file_name, 'wb') as out:
+        for shard, part in enumerate(part_files):
+            with open(part, 'rb') as src:
+                if shard > 0:
+                    src.readline()  # Skip the repeated header
+                shutil.copyfileobj(src, out, length=16 * 1024 * 1024)
+
+def _collect(pending, ordered: bool) -> list:
+    """Remove and return the next finished results: the oldest one, or whichever are done first."""
+    if ordered:
+        return [pending.popleft().result()]
+    done, _ = wait(pending, return_when=FIRST_COMPLETED)
+    pending.difference_update(done)
+    return [future.result() for future in done]
+
+def map_bounded(func, items, workers: int = None, ordered: bool = True, max_pending: int = None):
+    """Apply a picklable func to each item on a process pool and yield the results.
+
+    At most max_pending items (default two per worker) are in flight, so a long input stream
+    is never read ahead of the workers. Results come back in input order unless ordered is
+    False, in which case each is yielded as soon as it is done.
+    """
+    workers = workers or os.cpu_count() or 1
+    max_pending = max_pending or 2 * workers
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        pending = deque() if ordered else set()
+        submit = pending.append if ordered else pending.add
+        for item in items:
+            if len(pending) >= max_pending:
+                yield from _collect(pending, ordered)
+            submit(pool.submit(func, item))
+        while pending:
+            yield from _collect(pending, ordered)
+
+def run_sharded(shard_writer, file_name: str, num_records: int, selected_columns: list,
+                workers: int = None, master_seed: int = 0, concatenate: bool = True) -> list:
+    """Generate num_records across a process pool, one part file per shard.
+
+    shard_writer must be a picklable callable taking
+    (part_file, num_records, start_index, selected_columns, seed).
+    The output depends on master_seed and the number of shards: `workers` (DEFAULT_WORKERS when
+    not given), lowered to num_records so that no shard is empty. Returns [file_name] when the
+    parts are concatenated, otherwise the list of part files.
+    """
+    workers = max(1, min(workers or DEFAULT_WORKERS, num_records))
+    sizes = shard_sizes(num_records, workers)
+    starts = np.concatenate(([0], np.cumsum(sizes)[:-1])).tolist()
+    seeds = shard_seeds(master_seed, workers)
+    part_files = [part_file_name(file_name, shard) for shard in range(workers)]
+
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        futures = [
+            pool.submit(shard_writer, part, size, start, selected_columns, seed)
+            for part, size, start, seed in zip(part_files, sizes, starts, seeds)
+        ]
+        for future in futures:
+            future.result()  # Re-raise any worker error
+
+    if not concatenate:
+        return part_files
+
+    concatenate_parts(part_files, file_name)
+    for part in part_files:
+        os.remove(part)
+    return [file_name]
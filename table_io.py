@@ -0,0 +1,389 @@
+import csv
+import os
+import re
+import pandas as pd
+from csv_writer import CSVWriter, text_array, to_arrow
+from schema import SCHEMA, STRING_KINDS, arrow_type, csv_convert_options, pandas_dtypes
+
+try:
+    import pyarrow as pa
+    import pyarrow.compute as pa_compute
+    import pyarrow.csv as pa_csv
+    import pyarrow.ipc as pa_ipc
+    import pyarrow.parquet as pq
+except ImportError:  # pyarrow is optional; without it only CSV is available
+    pa = None
+
+FORMATS = ('csv', 'parquet', 'arrow')
+
+FORMAT_EXTENSIONS = {
+    '.parquet': 'parquet',
+    '.pq': 'parquet',
+    '.arrow': 'arrow',
+    '.feather': 'arrow',
+    '.ipc': 'arrow'
+}
+
+# Rows per Parquet row group / Arrow record batch; each is compressed on its own
+ROW_GROUP_SIZE = 1_000_000
+
+COMPRESSION = 'zstd'
+
+# String columns with at most this share of distinct values are dictionary-encoded
+DICTIONARY_RATIO = 0.5
+
+# Bytes of CSV handed to each parsing thread at a time
+CSV_BLOCK_SIZE = 16 * 1024 * 1024
+
+# Arrow names the column (by position) whose value did not convert to the registered type
+CONVERSION_ERROR = re.compile(r"In CSV column #(\d+): (?:Row #\d+: )?CSV conversion error")
+
+
+def detect_format(path, file_format: str = None) -> str:
+    """Return 'csv', 'parquet' or 'arrow' from an explicit format or the file extension."""
+    if file_format:
+        if file_format not in FORMATS:
+            raise ValueError(f"Unsupported file format: {file_format}")
+        return file_format
+    name = path if isinstance(path, str) else getattr(path, 'name', '')
+    return FORMAT_EXTENSIONS.get(os.path.splitext(str(name).lower())[1], 'csv')
+
+def _require_pyarrow(file_format: str):
+    if pa is None:
+        raise ImportError(f"{file_format} files require the 'pyarrow' package")
+
+def _dictionary_type(array) -> bool:
+    """Low-cardinality string columns (categories, countries, payment types...) are worth a dictionary."""
+    if pa.types.is_dictionary(array.type):
+        return True
+    if not (pa.types.is_string(array.type) or pa.types.is_large_string(array.type)) or len(array) == 0:
+        return False
+    return pa_compute.count_distinct(array).as_py() <= DICTIONARY_RATIO * len(array)
+
+def _is_text(arrow_type) -> bool:
+    if pa.types.is_dictionary(arrow_type):
+        arrow_type = arrow_type.value_type
+    return pa.types.is_string(arrow_type) or pa.types.is_large_string(arrow_type)
+
+def common_type(current, new):
+    """Type that holds the values of both types.
+
+    Nulls take the other type, integers widen to int64 and, mixed with floats, to float64, and
+    timestamps to the finer unit; text stays text and any other mix becomes text.
+    """
+    if current == new or pa.types.is_null(new) or _is_text(current):
+        return current
+    if pa.types.is_null(current):
+        return new
+    if pa.types.is_integer(current) and pa.types.is_integer(new):
+        return pa.int64()
+    if (pa.types.is_integer(current) or pa.types.is_floating(current)) and \
+            (pa.types.is_integer(new) or pa.types.is_floating(new)):
+        return pa.float64()
+    if pa.types.is_timestamp(current) and pa.types.is_timestamp(new) and current.tz == new.tz:
+        units = ('s', 'ms', 'us', 'ns')
+        return max(current, new, key=lambda timestamp: units.index(timestamp.unit))
+    return pa.string()
+
+def arrow_schema(table):
+    """Schema a file starts with: registered columns get their schema.py type, widened if the first
+    batch needs it (e.g. text prices in rough data); others the table's type, with low-cardinality
+    strings as dictionaries."""
+    fields = []
+    for field, array in zip(table.schema, table.columns):
+        if field.name in SCHEMA:
+            field = pa.field(field.name, common_type(arrow_type(SCHEMA[field.name]), field.type))
+        elif _dictionary_type(array):
+            value_type = field.type.value_type if pa.types.is_dictionary(field.type) else field.type
+            field = pa.field(field.name, pa.dictionary(pa.int32(), value_type))
+        fields.append(field)
+    return pa.schema(fields)
+
+
+class TableWriter:
+    """Append DataFrame batches to one CSV, Parquet or Arrow IPC file.
+
+    The format comes from `file_format` or the file extension. Parquet and Arrow files are typed,
+    dictionary-encoded and zstd-compressed per row group / record batch. The schema starts from
+    the registry and the first batch (see arrow_schema); a later batch that needs a wider type
+    (see common_type) has the rows written so far rewritten once with that column widened. Use
+    as a context manager or call close().
+    """
+
+    def __init__(self, path, file_format: str = None, row_group_size: int = ROW_GROUP_SIZE,
+                 compression: str = COMPRESSION):
+        self.path = path
+        self.file_format = detect_format(path, file_format)
+        self.row_group_size = row_group_size
+        self.compression = compression
+        self.rows_written = 0
+        self.schema = None
+        self.writer = None
+        self.dictionaries = {}
+        if self.file_format == 'csv':
+            self.writer = CSVWriter(path)
+        else:
+            _require_pyarrow(self.file_format)
+
+    def _open(self):
+        if self.file_format == 'parquet':
+            self.writer = pq.ParquetWriter(self.path, self.schema, compression=self.compression, use_dictionary=True)
+        else:
+            options = pa_ipc.IpcWriteOptions(compression=self.compression, emit_dictionary_deltas=True)
+            self.writer = pa_ipc.new_file(self.path, self.schema, options=options)
+
+    def _encode_dictionary(self, name, array, value_type):
+        """Dictionary-encode against the values seen so far, so later batches only add deltas."""
+        array = array.cast(value_type).combine_chunks()
+        dictionary = self.dictionaries.get(name, pa.array([], type=value_type))
+        new_values = pa_compute.unique(array.drop_null())
+        new_values = new_values.filter(pa_compute.invert(pa_compute.is_in(new_values, value_set=dictionary)))
+        if len(new_values):
+            dictionary = pa.concat_arrays([dictionary, new_values])
+            self.dictionaries[name] = dictionary
+        indices = pa_compute.index_in(array, value_set=dictionary).cast(pa.int32())
+        return pa.DictionaryArray.from_arrays(indices, dictionary)
+
+    def _conform(self, table):
+        arrays = []
+        for field, array in zip(self.schema, table.columns):
+            if _is_text(field.type) and not _is_text(array.type) and not pa.types.is_null(array.type):
+                array = text_array(array)  # Numbers among text are kept as the CSV writer prints them
+            if pa.types.is_dictionary(field.type):
+                array = self._encode_dictionary(field.name, array, field.type.value_type)
+            elif array.type != field.type:
+                # Only widening casts are left (see common_type); huge integers may round in float64
+                array = array.cast(field.type, safe=not pa.types.is_floating(field.type))
+            arrays.append(array)
+        return pa.Table.from_arrays(arrays, schema=self.schema)
+
+    def _write_table(self, table):
+        if self.file_format == 'parquet':
+            self.writer.write_table(table, row_group_size=self.row_group_size)
+        else:
+            self.writer.write_table(table, max_chunksize=self.row_group_size)
+
+    def _written_batches(self, path):
+        if self.file_format == 'parquet':
+            yield from pq.ParquetFile(path).iter_batches(batch_size=self.row_group_size)
+        else:
+            reader = pa_ipc.open_file(path)
+            for i in range(reader.num_record_batches):
+                yield reader.get_batch(i)
+
+    def _widen(self, fields: dict):
+        """Rewrite the rows written so far with some fields widened, so the file keeps one schema."""
+        self.writer.close()
+        old_path = self.path + '.widen'
+        os.replace(self.path, old_path)
+        try:
+            self.schema = pa.schema([fields.get(field.name, field) for field in self.schema])
+            self._open()
+            for batch in self._written_batches(old_path):
+                self._write_table(self._conform(pa.Table.from_batches([batch])))
+        finally:
+            os.remove(old_path)
+
+    def write(self, df: pd.DataFrame):
+        if self.file_format == 'csv':
+            self.writer.write(df)
+        else:
+            table = to_arrow(df)
+            if self.writer is None:
+                self.schema = arrow_schema(table)
+                self._open()
+            table = table.select(self.schema.names)
+            wider = {field.name: pa.field(field.name, common_type(field.type, array.type))
+                     for field, array in zip(self.schema, table.columns)
+                     if common_type(field.type, array.type) != field.type}
+            if wider:
+                self._widen(wider)
+            self._write_table(self._conform(table))
+        self.rows_written += len(df)
+
+    def close(self):
+        if self.writer is not None:
+            self.writer.close()
+        elif self.file_format != 'csv':
+            raise ValueError(f"Nothing was written to {self.path}; an empty {self.file_format} file needs a schema")
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+def write_table(df: pd.DataFrame, path, file_format: str = None):
+    """Write one DataFrame as CSV, Parquet or Arrow IPC through TableWriter."""
+    with TableWriter(path, file_format) as writer:
+        writer.write(df)
+
+def _to_pandas(table, categorical: bool) -> pd.DataFrame:
+    if not categorical:
+        # Decode dictionaries so the stages that assign new values get plain columns
+        table = table.cast(pa.schema([
+            pa.field(field.name, field.type.value_type) if pa.types.is_dictionary(field.type) else field
+            for field in table.schema
+        ]))
+    return table.to_pandas()
+
+def csv_header(source) -> list:
+    """Column names from the first line of a CSV path or binary file object (left at its position)."""
+    if isinstance(source, (str, os.PathLike)):
+        with open(source, 'rb') as file:
+            line = file.readline()
+    else:
+        position = source.tell()
+        line = source.readline()
+        source.seek(position)
+    return next(csv.reader([line.decode('utf-8-sig')]), [])
+
+def _text_columns(error, names: list, text_columns: set) -> set:
+    """Add the column a conversion error is about to the columns read as text (every column if it is not named)."""
+    match = CONVERSION_ERROR.search(str(error))
+    if match and int(match.group(1)) < len(names) and names[int(match.group(1))] not in text_columns:
+        return text_columns | {names[int(match.group(1))]}
+    if text_columns >= set(names):
+        raise error
+    return text_columns | set(names)
+
+def _csv_reader(source, names: list, header: bool, columns: list, text_columns: set, streaming: bool):
+    read_options = pa_csv.ReadOptions(use_threads=True, block_size=CSV_BLOCK_SIZE,
+                                      column_names=None if header else names)
+    convert_options = csv_convert_options(names, text_columns, columns)
+    return (pa_csv.open_csv if streaming else pa_csv.read_csv)(source, read_options=read_options,
+                                                               convert_options=convert_options)
+
+def read_csv_typed(source, columns: list = None, names: list = None):
+    """Parse a CSV path or binary file object into an Arrow table on all cores, typed by the schema registry.
+
+    Registered columns get their types without inference; others are inferred. Only `columns`
+    are converted when given. A registered column whose values do not all convert (rough data)
+    is read again as text. `names` reads a headerless file.
+    """
+    header = names is None
+    names = csv_header(source) if header else names
+    start = None if isinstance(source, (str, os.PathLike)) else source.tell()
+    text_columns = set()
+    while True:
+        try:
+            return _csv_reader(source, names, header, columns, text_columns, streaming=False)
+        except pa.ArrowInvalid as error:
+            text_columns = _text_columns(error, names, text_columns)
+            if start is not None:
+                source.seek(start)
+
+def csv_text_columns(source, names: list, header: bool = True, columns: list = None) -> set:
+    """Columns of a CSV to read as text because not all their values convert, as read_csv_typed decides.
+
+    One streaming pass converts only the columns that can fail (registered numbers and timestamps,
+    and unregistered columns, which are inferred) and stops at the first error, so a rough file
+    costs little; a clean one about a third of a full read. A file object is left where it was.
+    """
+    start = None if isinstance(source, (str, os.PathLike)) else source.tell()
+    convertible = [name for name in columns or names if not (name in SCHEMA and SCHEMA[name].kind in STRING_KINDS)]
+    text_columns = set()
+    while True:
+        checked = [name for name in convertible if name not in text_columns]
+        if not checked:
+            return text_columns
+        try:
+            for _ in _csv_reader(source, names, header, checked, text_columns, streaming=True):
+                pass
+            return text_columns
+        except pa.ArrowInvalid as error:
+            text_columns = _text_columns(error, names, text_columns)
+        finally:
+            if start is not None:
+                source.seek(start)
+
+def iter_csv_chunks(source, chunk_size: int = 100_000, columns: list = None, names: list = None):
+    """Yield a CSV as DataFrames of exactly chunk_size rows (the last may be shorter), typed like read_csv_typed.
+
+    The columns read as text are decided before the first chunk (csv_text_columns), so every
+    chunk has the same types. Without pyarrow pandas reads it, with the registered string columns typed.
+    """
+    header = names is None
+    names = csv_header(source) if header else names
+    if pa is None:
+        with pd.read_csv(source, usecols=columns, dtype=pandas_dtypes(names), chunksize=chunk_size,
+                         header=0 if header else None, names=None if header else names) as reader:
+            yield from reader
+        return
+    text_columns = csv_text_columns(source, names, header, columns)
+    pending, pending_rows = [], 0
+    for batch in _csv_reader(source, names, header, columns, text_columns, streaming=True):
+        pending.append(batch)
+        pending_rows += batch.num_rows
+        while pending_rows >= chunk_size:
+            table = pa.Table.from_batches(pending)
+            pending = table.slice(chunk_size).to_batches()
+            pending_rows -= chunk_size
+            yield _to_pandas(table.slice(0, chunk_size), categorical=False)
+    if pending_rows:
+        yield _to_pandas(pa.Table.from_batches(pending), categorical=False)
+
+def read_table(path, columns: list = None, file_format: str = None, categorical: bool = False) -> pd.DataFrame:
+    """Load a CSV, Parquet or Arrow IPC file, optionally only some columns.
+
+    CSV files are parsed by read_csv_typed. Dictionary-encoded columns (and registered category
+    columns of CSV files) come back as pandas categoricals when `categorical` is set.
+    """
+    file_format = detect_format(path, file_format)
+    if file_format == 'csv':
+        if pa is None:
+            return pd.read_csv(path, usecols=columns, dtype=pandas_dtypes(csv_header(path)))
+        return _to_pandas(read_csv_typed(path, columns), categorical)
+    _require_pyarrow(file_format)
+    if file_format == 'parquet':
+        table = pq.read_table(path, columns=columns)
+    else:
+        table = pa_ipc.open_file(path).read_all()
+        table = table.select(columns) if columns else table
+    return _to_pandas(table, categorical)
+
+def iter_table_chunks(path, chunk_size: int = 100_000, columns: list = None, file_format: str = None):
+    """Yield a file as DataFrames of up to chunk_size rows, holding only one chunk in memory."""
+    file_format = detect_format(path, file_format)
+    if file_format == 'csv':
+        yield from iter_csv_chunks(path, chunk_size, columns)
+        return
+    _require_pyarrow(file_format)
+    if file_format == 'parquet':
+        batches = pq.ParquetFile(path).iter_batches(batch_size=chunk_size, columns=columns)
+    else:
+        reader = pa_ipc.open_file(path)
+        batches = (reader.get_batch(i) for i in range(reader.num_record_batches))
+    for batch in batches:
+        table = pa.Table.from_batches([batch])
+        table = table.select(columns) if columns and file_format == 'arrow' else table
+        for start in range(0, table.num_rows, chunk_size):
+            yield _to_pandas(table.slice(start, chunk_size), categorical=False)
+
+def table_columns(path, file_format: str = None) -> list:
+    """Column names of a file, read from its header or schema only."""
+    file_format = detect_format(path, file_format)
+    if file_format == 'csv':
+        return csv_header(path)
+    _require_pyarrow(file_format)
+    if file_format == 'parquet':
+        return pq.ParquetFile(path).schema_arrow.names
+    return pa_ipc.open_file(path).schema.names
+
+def preview_table(path, rows: int = 5, file_format: str = None) -> pd.DataFrame:
+    """Read only the first rows of a file, without loading the rest of it."""
+    file_format = detect_format(path, file_format)
+    if file_format == 'csv':
+        chunk = next(iter_csv_chunks(path, rows), None)
+        return chunk if chunk is not None else pd.DataFrame(columns=csv_header(path))
+    _require_pyarrow(file_format)
+    if file_format == 'parquet':
+        parquet_file = pq.ParquetFile(path)
+        batch = next(parquet_file.iter_batches(batch_size=rows), None)
+        table = pa.Table.from_batches([batch]) if batch is not None else parquet_file.schema_arrow.empty_table()
+    else:
+        reader = pa_ipc.open_file(path)
+        table = (pa.Table.from_batches([reader.get_batch(0)]) if reader.num_record_batches
+                 else reader.schema.empty_table())
+    return _to_pandas(table.slice(0, rows), categorical=False)
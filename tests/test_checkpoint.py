@@ -0,0 +1,68 @@
+import os
+from datetime import datetime
+import pandas as pd
+import pytest
+import data_generator
+from checkpoint import clear_checkpoint, load_checkpoint, save_checkpoint
+from data_generator import write_to_csv_resumable
+
+NOW = datetime(2024, 1, 1)
+COLUMNS = ['Order_Id', 'Customer_Name', 'Price', 'Date_and_Time_When_Order_Was_Placed']
+
+
+def read(path):
+    with open(path, 'rb') as file:
+        return file.read()
+
+def test_checkpoint_save_load_and_clear(tmp_path):
+    path = str(tmp_path / 'job.checkpoint.json')
+    assert load_checkpoint(path) is None
+    save_checkpoint(path, {'next_block': 3, 'columns': ['a']})
+    save_checkpoint(path, {'next_block': 4, 'columns': ['a']})
+    assert load_checkpoint(path) == {'next_block': 4, 'columns': ['a']}
+    assert os.listdir(tmp_path) == ['job.checkpoint.json']  # No temporary file left behind
+    clear_checkpoint(path)
+    clear_checkpoint(path)
+    assert load_checkpoint(path) is None
+
+def interrupt_after(monkeypatch, blocks):
+    """Make the job crash while generating block number `blocks`."""
+    generate_batch, calls = data_generator.generate_batch, []
+
+    def failing(*args, **kwargs):
+        calls.append(None)
+        if len(calls) > blocks:
+            raise KeyboardInterrupt
+        return generate_batch(*args, **kwargs)
+    monkeypatch.setattr(data_generator, 'generate_batch', failing)
+
+def test_interrupted_job_resumes_to_the_same_file(tmp_path, monkeypatch):
+    expected, path = str(tmp_path / 'expected.csv'), str(tmp_path / 'orders.csv')
+    write_to_csv_resumable(expected, 1050, COLUMNS, seed=4, block_size=200, now=NOW)
+    assert not os.path.exists(expected + '.checkpoint.json')
+
+    with monkeypatch.context() as patch:
+        interrupt_after(patch, 3)
+        with pytest.raises(KeyboardInterrupt):
+            write_to_csv_resumable(path, 1050, COLUMNS, seed=4, block_size=200, now=NOW)
+    state = load_checkpoint(path + '.checkpoint.json')
+    assert (state['next_block'], state['rows_written']) == (3, 600)
+    with open(path, 'ab') as file:
+        file.write(b'half a row of the block being written when the job died,')
+
+    # `now` is taken from the checkpoint, so a resume on another day still matches
+    write_to_csv_resumable(path, 1050, COLUMNS, seed=4, block_size=200)
+    assert read(path) == read(expected)
+    assert len(pd.read_csv(path)) == 1050
+    assert not os.path.exists(path + '.checkpoint.json')
+
+def test_changed_job_starts_over(tmp_path, monkeypatch):
+    path = str(tmp_path / 'orders.csv')
+    with monkeypatch.context() as patch:
+        interrupt_after(patch, 2)
+        with pytest.raises(KeyboardInterrupt):
+            write_to_csv_resumable(path, 1000, COLUMNS, seed=1, block_size=200, now=NOW)
+    write_to_csv_resumable(path, 1000, COLUMNS, seed=2, block_size=200, now=NOW)
+    fresh = str(tmp_path / 'fresh.csv')
+    write_to_csv_resumable(fresh, 1000, COLUMNS, seed=2, block_size=200, now=NOW)
+    assert read(path) == read(fresh)
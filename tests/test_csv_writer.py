@@ -0,0 +1,83 @@
+import io
+import numpy as np
+import pandas as pd
+import pytest
+import csv_writer
+from csv_writer import CSVWriter, encode_csv, format_timestamp_column
+
+
+def to_csv_bytes(df):
+    # The writer prints every timestamp with its unit's digits (here 'us'); to_csv drops unneeded ones
+    return df.to_csv(index=False, lineterminator='\n', date_format='%Y-%m-%d %H:%M:%S.%f').encode()
+
+@pytest.fixture
+def mixed_frame():
+    return pd.DataFrame({
+        'text': ['plain', 'with, comma', 'with "quotes"', '', None, 'two\nlines'],
+        'integer': [1, -2, 3, 0, 5, 600],
+        'nullable': pd.array([1, None, 3, 4, None, 6], dtype='Int64'),
+        'decimal': [599.0, 1e-7, 1.5e20, np.nan, -0.0, 1e15],
+        'small': [9.9e-5, 0.0001, 123456.789, 9999999999999998.0, np.inf, -1e-12],
+        'flag': [True, False, True, True, False, False],
+        'maybe': pd.Series([True, None, False, True, None, False], dtype=object),
+        'category': pd.Categorical(['Card', 'UPI', None, 'Card', 'Wallet', 'UPI']),
+        'day': pd.to_datetime(['2023-01-01', '2023-01-02', None, '2023-01-04', '2023-01-05', '2023-01-06']),
+        'time': pd.to_datetime(['2023-01-01 10:00:00', '2023-01-02 11:30:15', None,
+                                '2023-01-04 00:00:01', '2023-01-05 23:59:59', '2023-01-06 12:00:00'])
+    })
+
+
+def test_matches_to_csv(mixed_frame):
+    assert encode_csv(mixed_frame) == to_csv_bytes(mixed_frame)
+
+def test_unquoted_rows_match_to_csv(mixed_frame):
+    # Without values that need quotes the rows take the column-at-a-time path
+    frame = mixed_frame.drop(columns='text')
+    assert encode_csv(frame) == to_csv_bytes(frame)
+
+def test_threads_match_single_thread(mixed_frame):
+    frame = pd.concat([mixed_frame] * 50, ignore_index=True)
+    assert encode_csv(frame, threads=4) == encode_csv(frame) == to_csv_bytes(frame)
+
+def test_single_column_keeps_empty_rows():
+    frame = pd.DataFrame({'text': ['x', '', None]})
+    encoded = encode_csv(frame)
+    assert encoded == to_csv_bytes(frame) == b'text\nx\n""\n""\n'
+    assert len(pd.read_csv(io.BytesIO(encoded))) == 3
+
+def test_round_trip(mixed_frame):
+    frame = mixed_frame[['integer', 'decimal', 'small', 'flag', 'time']]
+    read_back = pd.read_csv(io.BytesIO(encode_csv(frame)), parse_dates=['time'])
+    pd.testing.assert_frame_equal(read_back, frame, check_dtype=False)
+
+def test_writer_appends_batches_under_one_header(tmp_path, mixed_frame):
+    path = str(tmp_path / 'out.csv')
+    with CSVWriter(path) as writer:
+        writer.write(mixed_frame.iloc[:3])
+        writer.write(mixed_frame.iloc[3:])
+    assert writer.rows_written == len(mixed_frame)
+    with open(path, 'rb') as file:
+        assert file.read() == to_csv_bytes(mixed_frame)
+
+@pytest.mark.parametrize('unit, text', [
+    ('s', '2023-01-01 10:00:00'), ('ms', '2023-01-01 10:00:00.000'),
+    ('us', '2023-01-01 10:00:00.000000'), ('ns', '2023-01-01 10:00:00.000000000')
+])
+def test_timestamp_digits_follow_the_unit(unit, text):
+    times = pd.Series(pd.to_datetime(['2023-01-01 10:00:00', None]).as_unit(unit))
+    assert encode_csv(pd.DataFrame({'time': times}), header=False) == f'{text}\n""\n'.encode()
+
+def test_chunks_of_a_column_share_one_format():
+    # Midnight only, whole seconds and fractions: to_csv would print each chunk differently
+    times = pd.Series(pd.to_datetime(['2023-01-01', '2023-01-02 10:00:00', '2023-01-03 10:00:00.25'],
+                                     format='ISO8601').as_unit('us'))
+    lines = [encode_csv(pd.DataFrame({'time': times.iloc[[i]], 'n': [i]}), header=False) for i in range(3)]
+    assert lines == [b'2023-01-01 00:00:00.000000,0\n', b'2023-01-02 10:00:00.000000,1\n',
+                     b'2023-01-03 10:00:00.250000,2\n']
+
+def test_pandas_path_formats_timestamps_alike(monkeypatch, mixed_frame):
+    frame = mixed_frame.assign(late=mixed_frame['time'].dt.as_unit('ns') + pd.Timedelta(123))
+    arrow_text = format_timestamp_column(frame['late'])
+    assert csv_writer._encode_rows_pandas(frame) == csv_writer._encode_rows_arrow(frame)
+    monkeypatch.setattr(csv_writer, 'pa', None)
+    pd.testing.assert_series_equal(format_timestamp_column(frame['late']), arrow_text, check_dtype=False)
@@ -0,0 +1,52 @@
+from datetime import datetime
+import numpy as np
+import pandas as pd
+import pytest
+from dashboard_data import (CATEGORY_DTYPES, decode_categories, load_dashboard_data, memory_report,
+                            to_dashboard_schema)
+from data_generator import generate_batch
+from table_io import write_table
+from uuid_utils import UUIDDtype
+
+
+@pytest.fixture
+def orders():
+    return generate_batch(2000, np.random.default_rng(0), datetime(2024, 1, 1))
+
+def test_schema_is_compact_and_keeps_every_value(orders):
+    compact = to_dashboard_schema(orders.copy())
+    for column, dtype in CATEGORY_DTYPES.items():
+        assert compact[column].dtype == dtype
+    assert compact['Quantity_ordered'].dtype == np.int8 and compact['Price'].dtype == np.float32
+    assert isinstance(compact['Order_Id'].dtype, UUIDDtype)
+    assert np.allclose(compact['Price'].astype(float), orders['Price'], atol=0.005)
+    decoded = decode_categories(compact)
+    for column in CATEGORY_DTYPES:
+        assert decoded[column].tolist() == orders[column].tolist()
+    report = memory_report(compact)
+    assert report.loc['Total', 'bytes'] < memory_report(orders).loc['Total', 'bytes'] / 3
+
+def test_codes_mean_the_same_in_every_frame(orders):
+    first = to_dashboard_schema(orders.iloc[:1000].copy())
+    second = to_dashboard_schema(orders.iloc[1000:].copy())
+    combined = pd.concat([first, second])
+    # The shared dictionary keeps the columns categorical when frames are combined
+    assert combined['Customer_City'].dtype == CATEGORY_DTYPES['Customer_City']
+
+def test_values_outside_the_dictionary_are_kept(orders):
+    frame = orders.iloc[:3].copy()
+    frame['Customer_Country'] = ['USA', 'Atlantis', None]
+    compact = to_dashboard_schema(frame)
+    assert compact['Customer_Country'].tolist()[:2] == ['USA', 'Atlantis'] and pd.isna(compact['Customer_Country'][2])
+    assert list(compact['Customer_Country'].cat.categories[-1:]) == ['Atlantis']
+
+@pytest.mark.parametrize('extension', ['csv', 'parquet', 'arrow'])
+def test_files_load_into_the_same_schema(tmp_path, orders, extension):
+    path = str(tmp_path / f'final.{extension}')
+    write_table(orders, path)
+    data = load_dashboard_data(path)
+    for column, dtype in CATEGORY_DTYPES.items():
+        assert data[column].dtype == dtype
+        assert data[column].astype(str).tolist() == orders[column].tolist()
+    assert pd.api.types.is_datetime64_dtype(data['Date_and_Time_When_Order_Was_Placed'])
+    assert (data['Date_and_Time_When_Order_Was_Placed'] == orders['Date_and_Time_When_Order_Was_Placed']).all()
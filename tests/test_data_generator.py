@@ -0,0 +1,53 @@
+from datetime import datetime
+import numpy as np
+import pandas as pd
+from data_generator import (countries_cities, failure_reasons, generate_batch, generate_record, plan_columns,
+                            product_data, record_columns, write_to_csv)
+from entity_pools import build_customer_pool
+
+NOW = datetime(2024, 6, 1, 12, 30)
+
+
+def test_pools_apply_without_a_batch_size(tmp_path):
+    path = str(tmp_path / 'orders.csv')
+    pool = build_customer_pool(5, np.random.default_rng(1))
+    write_to_csv(path, 300, ['Order_Id', 'Customer_Id', 'Customer_Name'], pools=[pool])
+    data = pd.read_csv(path)
+    assert len(data) == 300
+    assert set(data['Customer_Id']) <= set(pool.table['Customer_Id'])
+
+def test_batch_has_the_record_schema():
+    batch = generate_batch(50, np.random.default_rng(0), NOW)
+    assert list(batch.columns) == record_columns == list(generate_record())
+    assert len(batch) == 50
+
+def test_batch_values_follow_the_record_rules():
+    batch = generate_batch(5000, np.random.default_rng(1), NOW)
+    assert all(name in product_data[category] for category, name in zip(batch['Product_Category'], batch['Product_Name']))
+    assert all(city in countries_cities[country] for country, city in zip(batch['Customer_Country'], batch['Customer_City']))
+    failed = batch['Payment_Success_or_Failure'] == 'N'
+    assert batch.loc[failed, 'Payment_Failure_Reason'].isin(failure_reasons).all()
+    assert (batch.loc[~failed, 'Payment_Failure_Reason'] == 'Payment Successful').all()
+    assert batch['Quantity_ordered'].between(1, 5).all() and batch['Price'].between(10, 1000).all()
+    times = batch['Date_and_Time_When_Order_Was_Placed']
+    assert times.min() >= pd.Timestamp(2020, 1, 1) and times.max() <= pd.Timestamp(NOW)
+    assert batch['Order_Id'].is_unique and batch['Customer_Name'].str.contains(' ').all()
+
+def test_seeded_batches_repeat():
+    first = generate_batch(200, np.random.default_rng(3), NOW)
+    pd.testing.assert_frame_equal(first, generate_batch(200, np.random.default_rng(3), NOW))
+    assert not first.equals(generate_batch(200, np.random.default_rng(4), NOW))
+
+def test_planned_columns_include_their_dependencies():
+    assert plan_columns(['Product_Name', 'Price']) == {'Product_Name', 'Product_Category', 'Price'}
+    assert plan_columns(['Payment_Failure_Reason']) == {'Payment_Failure_Reason', 'Payment_Success_or_Failure'}
+    assert plan_columns(None) == set(record_columns)
+
+def test_only_selected_columns_are_returned():
+    selected = ['Price', 'Customer_City', 'Payment_Failure_Reason']
+    batch = generate_batch(300, np.random.default_rng(2), NOW, selected)
+    assert list(batch.columns) == selected
+    assert batch['Customer_City'].isin([city for cities in countries_cities.values() for city in cities]).all()
+    assert batch['Payment_Failure_Reason'].isin(failure_reasons + ['Payment Successful']).all()
+    # Single records also carry the columns the selected ones were derived from
+    assert list(generate_record(['Product_Name'])) == ['Product_Category', 'Product_Name']
@@ -0,0 +1,38 @@
+from datetime import datetime
+import numpy as np
+import pandas as pd
+from data_handling import pick_children, process_data_parallel
+from rough_data_generation import iter_record_chunks, save_chunks_to_csv
+
+MAPPING = {'USA': ['New York', 'Chicago'], 'UK': ['London'], 'France': ['Paris', 'Lyon', 'Nice']}
+
+
+def test_children_belong_to_their_parent():
+    parents = pd.Series(['USA', 'UK', 'France'] * 200)
+    children = pick_children(parents, MAPPING, np.random.default_rng(0))
+    assert all(child in MAPPING[parent] for parent, child in zip(parents, children))
+    assert set(children[parents == 'France']) == {'Paris', 'Lyon', 'Nice'}
+
+def test_unknown_parents_draw_from_all_children():
+    parents = pd.Series(['Atlantis', None, 'UK'] * 300)
+    children = pick_children(parents, MAPPING, np.random.default_rng(1))
+    unknown = children[(parents != 'UK').to_numpy()]
+    every_child = {child for values in MAPPING.values() for child in values}
+    # Not only the last parent's children, as indexing with the code -1 gave
+    assert set(unknown) == every_child
+    assert set(children[parents == 'UK']) == {'London'}
+
+def test_parallel_cleansing_does_not_depend_on_the_worker_count(tmp_path):
+    rough = str(tmp_path / 'rough.csv')
+    save_chunks_to_csv(iter_record_chunks(2000, None, rng=np.random.default_rng(3), now=datetime(2026, 1, 1)), rough)
+    outputs = {}
+    for workers, ordered in ((1, True), (3, True), (3, False)):
+        path = str(tmp_path / f'clean-{workers}-{ordered}.csv')
+        process_data_parallel(rough, path, chunk_size=300, workers=workers, seed=9, ordered=ordered)
+        outputs[workers, ordered] = pd.read_csv(path)
+    pd.testing.assert_frame_equal(outputs[1, True], outputs[3, True])
+    # Unordered output holds the same rows, chunk by chunk in completion order
+    unordered = outputs[3, False].sort_values(list(outputs[1, True].columns), ignore_index=True)
+    pd.testing.assert_frame_equal(unordered, outputs[1, True].sort_values(list(outputs[1, True].columns),
+                                                                          ignore_index=True))
+    assert len(outputs[1, True]) == 2000
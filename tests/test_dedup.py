@@ -0,0 +1,95 @@
+import numpy as np
+import pandas as pd
+from dedup import BloomFilter, HashIndex, count_duplicates, row_hashes
+from uuid_utils import UUIDArray
+
+
+def orders(times, unit):
+    return pd.DataFrame({
+        'Order_Id': [f'order-{i}' for i in range(len(times))],
+        'Price': np.arange(len(times)) + 0.5,
+        'Date_and_Time_When_Order_Was_Placed': pd.to_datetime(times, format='ISO8601').as_unit(unit)
+    })
+
+
+def test_row_hash_ignores_timestamp_precision_and_chunk_contents():
+    # The same row next to a fractional time (in us) and next to whole seconds (in s)
+    first = orders(['2024-05-01 10:00:00', '2024-05-01 11:00:00.250000'], 'us')
+    second = orders(['2024-05-01 10:00:00', '2024-05-02 00:00:00'], 's')
+    assert row_hashes(first)[0] == row_hashes(second)[0]
+    assert row_hashes(first)[1] != row_hashes(second)[1]
+
+def test_row_hash_of_aware_timestamps_is_their_utc_instant():
+    naive = orders(['2024-05-01 08:00:00', None], 'ns')
+    aware = naive.assign(Date_and_Time_When_Order_Was_Placed=pd.to_datetime(
+        ['2024-05-01 10:00:00', None]).tz_localize('Europe/Berlin'))
+    assert (row_hashes(naive) == row_hashes(aware)).all()
+
+def test_duplicates_found_across_chunks_of_different_precision(tmp_path):
+    first = orders(['2024-05-01 10:00:00', '2024-05-01 11:00:00.250000'], 'us')
+    second = orders(['2024-05-01 10:00:00', '2024-05-02 00:00:00'], 's')
+    counts = count_duplicates([first, second], spill_dir=str(tmp_path))
+    assert counts == {'rows': 4, 'duplicates': 1, 'unique': 3}
+
+def test_bloom_filter_has_no_false_negatives():
+    rng = np.random.default_rng(0)
+    added = rng.integers(0, 2**63, 20_000, dtype=np.int64).astype(np.uint64)
+    others = rng.integers(0, 2**63, 20_000, dtype=np.int64).astype(np.uint64)
+    bloom = BloomFilter(capacity=20_000, error_rate=0.01)
+    bloom.add(added)
+    assert bloom.contains(added).all()
+    assert bloom.contains(others).mean() < 0.03
+
+def test_index_finds_rows_in_every_segment_and_after_reopening(tmp_path):
+    path = str(tmp_path / 'index')
+    frame = pd.DataFrame({'key': np.arange(1000), 'text': [f'row {i}' for i in range(1000)]})
+    index = HashIndex(path, capacity=300)
+    # Batches of different sizes leave several segments; the capacity forces Bloom rebuilds
+    for start, stop in ((0, 400), (400, 450), (450, 460), (460, 520)):
+        assert not index.add(frame.iloc[start:stop]).any()
+    assert len(index.segments) > 1 and index.state['capacity'] > 300
+    assert index.contains(row_hashes(frame.iloc[:520])).all()
+    assert not index.contains(row_hashes(frame.iloc[520:])).any()
+
+    reopened = HashIndex(path)
+    duplicates = reopened.add(pd.concat([frame.iloc[500:650], frame.iloc[640:650]]))
+    assert duplicates.sum() == 20 + 10
+    assert reopened.stats() == {'columns': None, 'hashes': 650, 'rows_seen': 680, 'duplicates': 30}
+    assert sorted(name for name in (tmp_path / 'index').iterdir() if name.name.startswith('segment')) == \
+        sorted(tmp_path / 'index' / name for name in reopened.state['segments'])
+
+def test_index_rebuilds_a_missing_bloom_filter(tmp_path):
+    path = tmp_path / 'index'
+    frame = pd.DataFrame({'key': np.arange(100)})
+    HashIndex(str(path)).add(frame)
+    (path / 'bloom.npy').unlink()
+    assert HashIndex(str(path)).duplicated(frame).all()
+
+def test_row_hash_ignores_how_a_chunk_typed_its_columns():
+    typed = pd.DataFrame({'Price': [77.61, 5.0], 'Quantity_ordered': [2, 3],
+                          'Date_and_Time_When_Order_Was_Placed': pd.to_datetime(['2024-05-01 10:00:00'] * 2)})
+    # Chunks whose columns also hold invalid values, as objects or as text read from CSV
+    mixed = pd.DataFrame({'Price': [77.61, 'InvalidPrice'], 'Quantity_ordered': [2.0, None],
+                          'Date_and_Time_When_Order_Was_Placed': [pd.Timestamp('2024-05-01 10:00'), 'not a time']})
+    text = pd.DataFrame({'Price': ['77.61', '5'], 'Quantity_ordered': ['2', '3'],
+                         'Date_and_Time_When_Order_Was_Placed': ['2024-05-01 10:00:00.000000', 'soon']})
+    assert row_hashes(typed)[0] == row_hashes(mixed)[0] == row_hashes(text)[0]
+    assert row_hashes(typed)[1] == row_hashes(text.assign(Date_and_Time_When_Order_Was_Placed=
+                                                           ['2024-05-01 10:00:00'] * 2))[1]
+    assert row_hashes(typed)[1] != row_hashes(text)[1]
+
+def test_row_hash_of_uuid_arrays_matches_their_text():
+    ids = ['123e4567-e89b-12d3-a456-426614174000', 'InvalidUUID', None]
+    as_text = pd.DataFrame({'Order_Id': pd.Series(ids, dtype='str'), 'Price': [1.0, 2.0, 3.0]})
+    as_uuids = as_text.assign(Order_Id=UUIDArray.from_strings(as_text['Order_Id']))
+    valid_only = as_text.assign(Order_Id=[ids[0], None, None])
+    assert (row_hashes(as_uuids) == row_hashes(valid_only)).all()
+    assert row_hashes(as_text)[0] == row_hashes(as_uuids)[0]
+    # Invalid IDs are missing in a UUIDArray, not the text 'nan'
+    assert row_hashes(as_uuids)[2] != row_hashes(as_text.assign(Order_Id=['x', 'nan', 'nan']))[2]
+
+def test_duplicates_found_across_chunks_with_invalid_prices(tmp_path):
+    clean = pd.DataFrame({'Order_Id': ['a', 'b'], 'Price': [77.61, 12.5]})
+    rough = pd.DataFrame({'Order_Id': ['a', 'c'], 'Price': ['77.61', 'InvalidPrice']})
+    counts = count_duplicates([clean, rough], spill_dir=str(tmp_path))
+    assert counts == {'rows': 4, 'duplicates': 1, 'unique': 3}
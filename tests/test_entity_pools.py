@@ -0,0 +1,32 @@
+from datetime import datetime
+import numpy as np
+import pandas as pd
+from data_generator import generate_batch
+from entity_pools import EntityPool, build_customer_pool, build_product_pool
+
+
+def test_popularity_follows_rank():
+    pool = EntityPool(pd.DataFrame({'key': range(100)}), exponent=1.0)
+    counts = np.bincount(pool.sample_indices(np.random.default_rng(0), 200_000), minlength=100)
+    weights = 1.0 / np.arange(1, 101)
+    assert np.allclose(counts / counts.sum(), weights / weights.sum(), atol=0.005)
+    assert counts[0] > counts[9] > counts[99] > 0
+
+def test_sampled_rows_come_from_one_entity():
+    pool = build_customer_pool(50, np.random.default_rng(1))
+    assert len(pool) == 50 and pool.table['Customer_Id'].is_unique
+    sample = pd.DataFrame(pool.sample(np.random.default_rng(2), 1000))
+    assert list(sample.columns) == pool.columns
+    merged = sample.merge(pool.table, on='Customer_Id', suffixes=('', '_pool'))
+    assert len(merged) == 1000
+    for column in ('Customer_Name', 'Customer_Country', 'Customer_City'):
+        assert (merged[column] == merged[column + '_pool']).all()
+
+def test_batches_draw_customers_and_products_from_the_pools():
+    customers, products = build_customer_pool(20, np.random.default_rng(3)), build_product_pool(10, np.random.default_rng(4))
+    batch = generate_batch(2000, np.random.default_rng(5), datetime(2024, 1, 1), pools=[customers, products])
+    assert set(batch['Customer_Id']) <= set(customers.table['Customer_Id'])
+    assert set(batch['Product_Id']) <= set(products.table['Product_Id'])
+    assert batch['Order_Id'].is_unique
+    pairs = batch[['Product_Id', 'Product_Name']].drop_duplicates()
+    assert pairs['Product_Id'].is_unique  # A product keeps its name in every order
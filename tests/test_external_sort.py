@@ -0,0 +1,52 @@
+import numpy as np
+import pandas as pd
+import pytest
+from external_sort import MISSING_KEY, sort_chunks
+from merge import ORDER_TIME_COLUMN, merge_files
+from table_io import read_table
+
+
+def key_of(chunk):
+    return chunk['key'].to_numpy(np.int64)
+
+@pytest.fixture
+def frame():
+    rng = np.random.default_rng(3)
+    keys = rng.integers(0, 500, 5000)
+    keys[rng.random(5000) < 0.02] = MISSING_KEY
+    # Many equal keys, so the position column shows whether the sort is stable
+    return pd.DataFrame({'key': keys, 'position': np.arange(5000), 'text': [f"row {i}" for i in range(5000)]})
+
+def chunks_of(frame, size):
+    return (frame.iloc[start:start + size] for start in range(0, len(frame), size))
+
+def expected(frame):
+    return frame.sort_values('key', kind='stable').reset_index(drop=True)
+
+
+def test_in_memory_sort_is_stable(frame):
+    result = pd.concat(sort_chunks(chunks_of(frame, 700), key_of, chunk_size=1000), ignore_index=True)
+    pd.testing.assert_frame_equal(result, expected(frame))
+
+@pytest.mark.parametrize('run_rows, fan_in', [(600, 64), (300, 4)])
+def test_spilled_sort_matches_in_memory(tmp_path, frame, run_rows, fan_in):
+    # fan_in 4 forces intermediate merge passes over the 17 runs
+    chunks = list(sort_chunks(chunks_of(frame, 250), key_of, chunk_size=400, run_rows=run_rows, fan_in=fan_in,
+                              spill_dir=str(tmp_path)))
+    pd.testing.assert_frame_equal(pd.concat(chunks, ignore_index=True), expected(frame))
+    assert max(len(chunk) for chunk in chunks) < 2 * 400
+    assert list(tmp_path.iterdir()) == []
+
+def test_merge_files_sorts_by_order_time(tmp_path):
+    times = ['2024-03-01 10:00:00', '2023-12-31 23:59:59', 'not a date', '2024-01-15 08:30:00', '2023-12-31 23:59:59']
+    paths = []
+    for i in range(2):
+        path = str(tmp_path / f'in{i}.csv')
+        pd.DataFrame({'Order_Id': [f'{i}-{j}' for j in range(5)], ORDER_TIME_COLUMN: times}).to_csv(path, index=False)
+        paths.append(path)
+    output = str(tmp_path / 'merged.csv')
+    summary = merge_files(paths, output, sort_by=ORDER_TIME_COLUMN, chunk_size=3, run_rows=4, spill_dir=str(tmp_path))
+    merged = read_table(output)
+
+    assert summary['rows'] == 10
+    assert merged['Order_Id'].tolist() == ['0-1', '0-4', '1-1', '1-4', '0-3', '1-3', '0-0', '1-0', '0-2', '1-2']
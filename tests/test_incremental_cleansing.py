@@ -0,0 +1,81 @@
+from datetime import datetime
+import numpy as np
+import pandas as pd
+import pytest
+from data_handling import process_data_parallel
+from incremental_cleansing import process_data_incremental
+from rough_data_generation import iter_record_chunks, save_chunks_to_csv
+
+
+@pytest.fixture
+def rough_bytes(tmp_path):
+    path = str(tmp_path / 'rough.csv')
+    save_chunks_to_csv(iter_record_chunks(3000, None, rng=np.random.default_rng(5), now=datetime(2026, 1, 1)), path)
+    with open(path, 'rb') as file:
+        return file.read()
+
+def read(path):
+    with open(path, 'rb') as file:
+        return file.read()
+
+
+def test_growing_input_matches_rebuild(tmp_path, rough_bytes):
+    growing, output = str(tmp_path / 'growing.csv'), str(tmp_path / 'incremental.csv')
+    # Appends end mid-line and mid-chunk
+    for cut in (1000, 50_000, 50_000, 123_457, 400_000, len(rough_bytes)):
+        with open(growing, 'wb') as file:
+            file.write(rough_bytes[:cut])
+        process_data_incremental(growing, output, chunk_size=500)
+
+    rebuilt = str(tmp_path / 'rebuilt.csv')
+    process_data_incremental(growing, rebuilt, chunk_size=500)
+    assert read(output) == read(rebuilt)
+
+    parallel = str(tmp_path / 'parallel.csv')
+    process_data_parallel(growing, parallel, chunk_size=500, workers=1)
+    assert read(output) == read(parallel)
+
+def test_unchanged_input_adds_nothing(tmp_path, rough_bytes):
+    path, output = str(tmp_path / 'rough.csv'), str(tmp_path / 'clean.csv')
+    with open(path, 'wb') as file:
+        file.write(rough_bytes[:100_000])
+    assert process_data_incremental(path, output, chunk_size=500) is not None
+    before = read(output)
+    assert process_data_incremental(path, output, chunk_size=500) is None
+    assert read(output) == before
+
+def test_header_only_input_writes_header(tmp_path, rough_bytes):
+    path, output = str(tmp_path / 'rough.csv'), str(tmp_path / 'clean.csv')
+    header = rough_bytes[:rough_bytes.index(b'\n') + 1]
+    with open(path, 'wb') as file:
+        file.write(header)
+    assert process_data_incremental(path, output) is None
+    assert read(output).startswith(b'Order_Id,') and read(output).count(b'\n') == 1
+
+    with open(path, 'wb') as file:
+        file.write(rough_bytes)
+    process_data_incremental(path, output)
+    assert read(output).count(b'Order_Id,') == 1
+    assert read(output).count(b'\n') == 3001
+
+def test_quoted_newlines_stay_in_their_record(tmp_path):
+    REASON = 'Declined,\n"Card"\nexpired'
+    rough = pd.concat(iter_record_chunks(1200, None, rng=np.random.default_rng(7), now=datetime(2026, 1, 1)))
+    rough['Payment_Failure_Reason'] = rough['Payment_Failure_Reason'].astype(object)
+    rough.iloc[::7, rough.columns.get_loc('Payment_Failure_Reason')] = REASON
+    data = rough.to_csv(index=False).encode()
+
+    growing, output = str(tmp_path / 'growing.csv'), str(tmp_path / 'incremental.csv')
+    # One cut lands inside a quoted field
+    inside = data.index(b'Declined,\n', 60_000) + 10
+    for cut in (30_000, inside, len(data)):
+        with open(growing, 'wb') as file:
+            file.write(data[:cut])
+        process_data_incremental(growing, output, chunk_size=100)
+
+    rebuilt = str(tmp_path / 'rebuilt.csv')
+    process_data_incremental(growing, rebuilt, chunk_size=100)
+    assert read(output) == read(rebuilt)
+    cleaned = pd.read_csv(output)
+    assert len(cleaned) == 1200
+    assert (cleaned['Payment_Failure_Reason'] == REASON).sum() == len(range(0, 1200, 7))
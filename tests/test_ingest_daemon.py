@@ -0,0 +1,100 @@
+import os
+import time
+from datetime import datetime
+import numpy as np
+import pytest
+from ingest_daemon import STOP, IngestionService, append_csv
+from rough_data_generation import iter_record_chunks, save_chunks_to_csv
+from table_io import read_table
+
+
+@pytest.fixture
+def service(tmp_path):
+    watch_dir = tmp_path / 'incoming'
+    watch_dir.mkdir()
+    return IngestionService(str(watch_dir), str(tmp_path / 'master.csv'), workers=1, chunk_size=100, seed=0)
+
+def ingest(service, name, rows, seed):
+    """Drop a rough file into the watch directory and run one worker over it, as the watcher would."""
+    path = os.path.join(service.watch_dir, name)
+    save_chunks_to_csv(iter_record_chunks(rows, None, rng=np.random.default_rng(seed), now=datetime(2026, 1, 1)), path)
+    service.queued.add(path)
+    service.queue.put((path, time.monotonic(), seed))
+    service.queue.put(STOP)
+    service._work()
+    return service.metrics[-1]
+
+def master_rows(service):
+    with open(service.master_file, 'rb') as file:
+        return file.read().count(b'\n') - 1
+
+
+def test_failed_upload_adds_no_rows(service, monkeypatch):
+    assert ingest(service, 'first.csv', 200, 1)['status'] == 'ok'
+    assert master_rows(service) == 200
+
+    def failing_upload(path):
+        raise RuntimeError("upload failed")
+    service.bucket_name = 'bucket'
+    monkeypatch.setattr(service, '_upload', failing_upload)
+    assert ingest(service, 'second.csv', 300, 2)['status'] == 'failed'
+    assert master_rows(service) == 200
+    assert os.path.exists(os.path.join(service.failed_dir, 'second.csv'))
+
+    # Dropped in again once uploads work, its rows are added once
+    monkeypatch.setattr(service, '_upload', lambda path: 'bucket/second.csv')
+    assert ingest(service, 'second.csv', 300, 2)['status'] == 'ok'
+    assert master_rows(service) == 500
+    assert service.queued == set()
+
+def test_failed_move_keeps_worker_and_file_queued(service, monkeypatch):
+    def failing_move(source, destination):
+        raise OSError("disk full")
+    monkeypatch.setattr('shutil.move', failing_move)
+    metric = ingest(service, 'first.csv', 50, 1)
+    assert metric['status'] == 'ok' and metric['move_error'] == 'disk full'
+    # Still marked queued, so the watcher does not ingest it a second time
+    assert service.queued == {os.path.join(service.watch_dir, 'first.csv')}
+
+def test_append_rejects_other_columns(tmp_path):
+    master, other = tmp_path / 'master.csv', tmp_path / 'other.csv'
+    master.write_bytes(b'a,b\n1,2\n')
+    other.write_bytes(b'a,c\n3,4\n')
+    with pytest.raises(ValueError):
+        append_csv(str(other), str(master))
+    assert master.read_bytes() == b'a,b\n1,2\n'
+
+def test_merge_on_key_keeps_one_row_per_order(service):
+    service.merge_key = 'Order_Id'
+    first = ingest(service, 'first.csv', 200, 1)
+    # Rough files repeat a few placeholder order IDs
+    orders = read_table(first['cleaned_file'])['Order_Id'].nunique()
+    assert first['inserted'] == master_rows(service) == orders < 200
+    # The same orders again update rows instead of adding them
+    metric = ingest(service, 'again.csv', 200, 1)
+    assert (metric['status'], metric['inserted'], metric['updated']) == ('ok', 0, orders)
+    assert master_rows(service) == orders
+
+def test_append_to_parquet_master(tmp_path):
+    watch_dir = tmp_path / 'incoming'
+    watch_dir.mkdir()
+    service = IngestionService(str(watch_dir), str(tmp_path / 'master.parquet'), workers=1, chunk_size=100)
+    ingest(service, 'first.csv', 120, 1)
+    ingest(service, 'second.csv', 80, 2)
+    assert len(read_table(service.master_file)) == 200
+
+def test_running_service_cleanses_in_worker_processes(service):
+    service.poll_interval, service.settle_seconds = 0.05, 0.05
+    service.start()
+    try:
+        for i in range(2):
+            path = os.path.join(service.watch_dir, f'file{i}.csv')
+            save_chunks_to_csv(iter_record_chunks(100, None, rng=np.random.default_rng(i), now=datetime(2026, 1, 1)), path)
+        deadline = time.monotonic() + 60
+        while service.stats()['files_ok'] + service.stats()['files_failed'] < 2 and time.monotonic() < deadline:
+            time.sleep(0.05)
+    finally:
+        service.stop()
+    assert service.stats()['files_ok'] == 2
+    assert master_rows(service) == 200
+    assert service.pool is None
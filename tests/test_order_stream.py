@@ -0,0 +1,96 @@
+import io
+import os
+from types import SimpleNamespace
+import numpy as np
+import pandas as pd
+import pytest
+import order_stream
+from csv_writer import encode_csv
+from data_generator import generate_batch
+from order_stream import OrderStream, RotatingFileSink, StreamSink, TokenBucket, format_batch
+
+COLUMNS = ['Order_Id', 'Customer_Name', 'Price', 'Date_and_Time_When_Order_Was_Placed']
+
+
+class FakeClock:
+    """Stands in for order_stream's time module; time passes only when slept or moved on."""
+
+    def __init__(self):
+        self.now = 100.0
+
+    def monotonic(self):
+        return self.now
+
+    def sleep(self, seconds):
+        # Like a real sleep, always let some time pass, even when rounding leaves a tiny remainder
+        self.now += max(seconds, 1e-6)
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = FakeClock()
+    monkeypatch.setattr(order_stream, 'time', SimpleNamespace(monotonic=clock.monotonic, sleep=clock.sleep))
+    return clock
+
+def batch(rows, seed=0):
+    return generate_batch(rows, np.random.default_rng(seed), selected_columns=COLUMNS)
+
+def test_token_bucket_paces_to_the_rate(clock):
+    bucket = TokenBucket(rate=50, burst=10)
+    start = clock.now
+    taken = 0
+    while taken < 1000:
+        taken += bucket.take(10)
+    assert taken == 1000
+    assert clock.now - start == pytest.approx(1000 / 50, rel=0.01)
+
+def test_token_bucket_bursts_after_idling(clock):
+    bucket = TokenBucket(rate=100, burst=20)
+    clock.now += 60
+    assert bucket.take(50) == 20
+    assert bucket.take(50) == 1  # Empty again: waits for the next token
+
+def test_token_bucket_rejects_non_positive_rates():
+    with pytest.raises(ValueError):
+        TokenBucket(0)
+
+def test_order_stream_reports_achieved_rate(clock):
+    sink = StreamSink(io.BytesIO(), 'ndjson')
+    stats = OrderStream(sink, rate=200, burst=50, selected_columns=COLUMNS,
+                        rng=np.random.default_rng(1)).run(max_records=1000)
+    assert stats['emitted'] == 1000
+    assert stats['achieved_rate'] == pytest.approx(200, rel=0.01)
+
+def test_format_batch_matches_the_csv_encoder():
+    data = batch(5)
+    assert format_batch(data, 'csv', header=True) == encode_csv(data, header=True)
+    assert format_batch(data, 'csv') == encode_csv(data, header=False)
+    lines = format_batch(data, 'ndjson').decode().splitlines()
+    assert len(lines) == 5 and lines[0].startswith('{"Order_Id"')
+
+def published(directory):
+    return sorted(name for name in os.listdir(directory) if not name.endswith('.part'))
+
+def test_file_sink_rotates_after_max_rows(tmp_path, clock):
+    sink = RotatingFileSink(str(tmp_path), 'csv', max_rows=10, max_seconds=3600)
+    for seed in range(5):
+        sink.write(batch(4, seed))
+    assert len(published(tmp_path)) == 1  # 12 rows: rotated once, the second file is still open
+    sink.close()
+    files = published(tmp_path)
+    assert len(files) == 2 and sorted(os.listdir(tmp_path)) == files
+    frames = [pd.read_csv(tmp_path / name) for name in files]
+    assert [len(frame) for frame in frames] == [12, 8]
+    assert all(list(frame.columns) == COLUMNS for frame in frames)
+
+def test_file_sink_rotates_after_max_seconds(tmp_path, clock):
+    sink = RotatingFileSink(str(tmp_path), 'ndjson', max_rows=1000, max_seconds=5)
+    sink.write(batch(3))
+    clock.now += 2
+    sink.write(batch(3, 1))
+    assert published(tmp_path) == []
+    clock.now += 4
+    sink.write(batch(3, 2))
+    files = published(tmp_path)
+    assert len(files) == 1 and files[0].endswith('.ndjson')
+    assert len(pd.read_json(tmp_path / files[0], lines=True)) == 9
@@ -0,0 +1,70 @@
+import math
+from collections import Counter
+import numpy as np
+import pandas as pd
+import pytest
+from dedup import DuplicateCounter
+from profiler import HLL_PRECISION, HeavyHitters, HyperLogLog, Profiler
+
+
+@pytest.mark.parametrize('n', [1_000, 50_000, 300_000])
+def test_hyperloglog_estimate_within_error_bound(n):
+    sketch = HyperLogLog()
+    values = pd.Index([f"value-{i}" for i in range(n)])
+    for start in range(0, n, 40_000):
+        # Repeats do not change the estimate
+        sketch.add(values[start:start + 40_000])
+        sketch.add(values[start:start + 1000])
+    standard_error = 1.04 / math.sqrt(2 ** HLL_PRECISION)
+    assert abs(sketch.estimate() - n) <= 4 * standard_error * n
+
+def test_hyperloglog_merge_equals_union():
+    left, right, union = HyperLogLog(), HyperLogLog(), HyperLogLog()
+    left.add(pd.Index(range(0, 20_000)))
+    right.add(pd.Index(range(10_000, 30_000)))
+    union.add(pd.Index(range(0, 30_000)))
+    left.merge(right)
+    assert left.estimate() == union.estimate()
+
+def test_heavy_hitters_report_frequent_values():
+    rng = np.random.default_rng(1)
+    k = 20
+    # Zipf-like values: a few frequent ones over a long tail of singletons
+    values = np.concatenate([rng.zipf(1.5, 60_000), np.arange(10**6, 10**6 + 40_000)])
+    rng.shuffle(values)
+    summary = HeavyHitters(k)
+    for chunk in np.array_split(values, 7):
+        summary.add(pd.Series(chunk).value_counts(sort=False))
+
+    exact = Counter(values.tolist())
+    reported = dict(summary.counters)
+    assert len(reported) <= k
+    for value, count in exact.items():
+        if count > len(values) / (k + 1):
+            assert str(value) in reported
+    for value, count in reported.items():
+        assert exact[int(value)] - summary.error <= count <= exact[int(value)]
+    assert summary.top(3) == sorted(summary.top(3), key=lambda item: -item[1])
+
+def test_heavy_hitters_exact_below_capacity():
+    summary = HeavyHitters(10)
+    summary.add(pd.Series(['a', 'b', 'a', 'c']).value_counts())
+    summary.add(pd.Series(['a', 'c', 'd']).value_counts())
+    assert summary.error == 0
+    assert summary.top() == [['a', 3], ['c', 2], ['b', 1], ['d', 1]]
+
+def test_profiler_counts_nulls_and_range():
+    profiler = Profiler()
+    profiler.add(pd.DataFrame({'Price': [1.5, None, 3.0], 'Customer_Name': ['x', 'y', None]}))
+    profiler.add(pd.DataFrame({'Price': [-2.0], 'Customer_Name': ['x']}))
+    profile = profiler.to_dict()
+    assert profile['rows'] == 4
+    price = profile['columns']['Price']
+    assert (price['nulls'], price['min'], price['max']) == (1, -2.0, 3.0)
+    assert profile['columns']['Customer_Name']['heavy_hitters'][0] == ['x', 2]
+
+def test_duplicate_counter_counts_repeats_across_chunks():
+    counter = DuplicateCounter()
+    assert counter.add(pd.DataFrame({'a': [1, 2, 2], 'b': ['x', 'y', 'y']})) == 1
+    assert counter.add(pd.DataFrame({'a': [1, 3], 'b': ['x', 'z']})) == 1
+    assert counter.counts() == {'rows': 5, 'duplicates': 2, 'unique': 3}
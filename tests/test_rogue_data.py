@@ -0,0 +1,46 @@
+from datetime import datetime
+import numpy as np
+import pandas as pd
+from rogue_data import ROGUE_VALUES, inject_rogue_values, load_rogue_mask, save_rogue_mask
+from rough_data_generation import generate_clean_batch, iter_record_chunks, save_chunks_to_csv
+
+NOW = datetime(2026, 1, 1)
+
+
+def clean(rows, start=0):
+    return generate_clean_batch(start, rows, np.random.default_rng(0), NOW)
+
+def test_rogue_values_land_exactly_on_the_mask():
+    before = clean(20_000)
+    after, mask = inject_rogue_values(before.copy(), rng=np.random.default_rng(1))
+    assert list(mask.columns) == [column for column in ROGUE_VALUES if column in before.columns]
+    for column in mask.columns:
+        hits = mask[column].to_numpy()
+        assert (after.loc[hits, column] == ROGUE_VALUES[column]).all()
+        assert after.loc[~hits, column].tolist() == before.loc[~hits, column].tolist()
+        assert abs(hits.mean() - 0.1) < 0.01
+
+def test_rates_are_per_column():
+    after, mask = inject_rogue_values(clean(1000), {'Price': 1.0, 'Order_Id': 0.0}, np.random.default_rng(2))
+    assert list(mask.columns) == ['Price', 'Order_Id']
+    assert mask['Price'].all() and not mask['Order_Id'].any()
+    assert (after['Price'] == 'InvalidPrice').all()
+
+def test_mask_round_trips_through_its_file(tmp_path):
+    path = str(tmp_path / 'mask.csv')
+    first = inject_rogue_values(clean(500), rng=np.random.default_rng(3))[1]
+    second = inject_rogue_values(clean(500, start=500), rng=np.random.default_rng(4))[1]
+    save_rogue_mask(first, path)
+    save_rogue_mask(second, path, header=False, mode='a')
+    expected = pd.concat([first, second])
+    pd.testing.assert_frame_equal(load_rogue_mask(path, expected.index, list(expected.columns)), expected)
+
+def test_saved_mask_marks_the_rogue_cells_of_the_file(tmp_path):
+    path, mask_path = str(tmp_path / 'rough.csv'), str(tmp_path / 'mask.csv')
+    chunks = iter_record_chunks(1500, None, chunk_size=400, rng=np.random.default_rng(5), now=NOW, return_mask=True)
+    save_chunks_to_csv(chunks, path, mask_path=mask_path)
+    rough = pd.read_csv(path, dtype=str)
+    mask = load_rogue_mask(mask_path, rough.index, list(ROGUE_VALUES))
+    assert mask.to_numpy().sum() > 0
+    for column in mask.columns:
+        assert ((rough[column] == str(ROGUE_VALUES[column])) == mask[column]).all()
@@ -0,0 +1,32 @@
+from datetime import datetime
+import numpy as np
+import pandas as pd
+from rough_data_generation import iter_record_chunks, save_chunks_to_csv
+from schema import ROUGH_COLUMN_ORDER
+
+NOW = datetime(2026, 1, 1)
+
+
+def test_chunks_are_bounded_and_cover_every_record():
+    chunks = list(iter_record_chunks(2500, None, chunk_size=1000, rng=np.random.default_rng(0), now=NOW))
+    assert [len(chunk) for chunk in chunks] == [1000, 1000, 500]
+    assert pd.concat(chunks).index.tolist() == list(range(2500))
+    assert all(list(chunk.columns) == ROUGH_COLUMN_ORDER for chunk in chunks)
+
+def test_chunks_are_built_lazily():
+    # A billion records would not fit in memory; only the first chunk is ever built
+    chunks = iter_record_chunks(10**9, None, chunk_size=100, rng=np.random.default_rng(0), now=NOW)
+    assert len(next(chunks)) == 100
+
+def test_saved_chunks_hold_every_row(tmp_path):
+    path = str(tmp_path / 'rough.csv')
+    first = save_chunks_to_csv(iter_record_chunks(1200, None, chunk_size=500, rng=np.random.default_rng(1), now=NOW),
+                               path)
+    assert len(first) == 500
+    saved = pd.read_csv(path)
+    assert len(saved) == 1200 and list(saved.columns) == ROUGH_COLUMN_ORDER
+
+def test_only_selected_columns_are_generated():
+    selected = ['Price', 'Order_Id', 'Customer_City']
+    chunk = next(iter_record_chunks(300, selected, rng=np.random.default_rng(2), now=NOW))
+    assert list(chunk.columns) == selected and len(chunk) == 300
@@ -0,0 +1,54 @@
+import os
+from datetime import datetime
+import numpy as np
+import pandas as pd
+import pytest
+from data_generator import generate_batch
+from shard_writer import (EXTENSIONS, iter_frame_chunks, load_manifest, preview_shards, verify_shards,
+                          write_shards, zstandard)
+
+COMPRESSIONS = ['gzip', None] + (['zstd'] if zstandard is not None else [])
+
+
+@pytest.fixture
+def orders():
+    return generate_batch(3000, np.random.default_rng(0), datetime(2024, 1, 1),
+                          ['Order_Id', 'Customer_Name', 'Price', 'Date_and_Time_When_Order_Was_Placed'])
+
+def read_shards(manifest_path):
+    # pandas decompresses by extension
+    directory = os.path.dirname(manifest_path)
+    return [pd.read_csv(os.path.join(directory, shard['file'])) for shard in load_manifest(manifest_path)['shards']]
+
+@pytest.mark.parametrize('compression', COMPRESSIONS)
+def test_shards_are_standalone_csvs_holding_every_row(tmp_path, orders, compression):
+    manifest_path = write_shards(iter_frame_chunks(orders, 250), str(tmp_path), compression=compression,
+                                 target_bytes=60_000, workers=2)
+    manifest = load_manifest(manifest_path)
+    assert len(manifest['shards']) > 2 and manifest['total_rows'] == 3000
+    assert all(shard['file'].endswith(EXTENSIONS[compression]) for shard in manifest['shards'])
+    shards = read_shards(manifest_path)
+    assert [len(shard) for shard in shards] == [shard['rows'] for shard in manifest['shards']]
+    combined = pd.concat(shards, ignore_index=True)
+    assert list(combined.columns) == manifest['columns'] == list(orders.columns)
+    assert combined['Order_Id'].tolist() == orders['Order_Id'].tolist()
+    assert preview_shards(manifest_path, rows=3)['Order_Id'].tolist() == orders['Order_Id'].tolist()[:3]
+
+def test_verify_reports_changed_shards(tmp_path, orders):
+    manifest_path = write_shards(iter_frame_chunks(orders, 500), str(tmp_path), target_bytes=60_000)
+    assert verify_shards(manifest_path) == []
+    shards = load_manifest(manifest_path)['shards']
+    with open(tmp_path / shards[1]['file'], 'r+b') as file:
+        file.seek(20)
+        byte = file.read(1)
+        file.seek(20)
+        file.write(bytes([byte[0] ^ 0xFF]))
+    with open(tmp_path / shards[-1]['file'], 'ab') as file:
+        file.write(b'\0')
+    assert verify_shards(manifest_path) == [shards[1]['file'], shards[-1]['file']]
+
+def test_no_rows_still_write_one_header_only_shard(tmp_path):
+    manifest_path = write_shards(iter(()), str(tmp_path), compression=None)
+    manifest = load_manifest(manifest_path)
+    assert manifest['total_rows'] == 0 and len(manifest['shards']) == 1
+    assert verify_shards(manifest_path) == []
@@ -0,0 +1,60 @@
+from datetime import datetime
+import pandas as pd
+import pytest
+from data_generator import write_to_csv_parallel
+from rough_data_generation import generate_records_parallel
+from sharding import DEFAULT_WORKERS, map_bounded, shard_sizes
+
+NOW = datetime(2024, 1, 1)
+COLUMNS = ['Order_Id', 'Customer_Name', 'Price']
+
+
+def read_bytes(path):
+    with open(path, 'rb') as f:
+        return f.read()
+
+def test_same_seed_gives_byte_identical_output(tmp_path):
+    first, second, other = (str(tmp_path / name) for name in ('a.csv', 'b.csv', 'c.csv'))
+    write_to_csv_parallel(first, 500, COLUMNS, seed=7, now=NOW)
+    write_to_csv_parallel(second, 500, COLUMNS, seed=7, now=NOW)
+    write_to_csv_parallel(other, 500, COLUMNS, seed=8, now=NOW)
+    assert read_bytes(first) == read_bytes(second)
+    assert read_bytes(first) != read_bytes(other)
+
+def test_default_workers_match_an_explicit_count(tmp_path):
+    default, explicit = str(tmp_path / 'default.csv'), str(tmp_path / 'explicit.csv')
+    generate_records_parallel(default, 200, COLUMNS, seed=3, now=NOW)
+    generate_records_parallel(explicit, 200, COLUMNS, workers=DEFAULT_WORKERS, seed=3, now=NOW)
+    assert read_bytes(default) == read_bytes(explicit)
+
+def test_fewer_records_than_workers_leave_no_empty_parts(tmp_path):
+    path = str(tmp_path / 'orders.csv')
+    parts = write_to_csv_parallel(path, 2, COLUMNS, workers=8, now=NOW, concatenate=False)
+    assert len(parts) == 2
+    for part in parts:
+        assert list(pd.read_csv(part).columns) == COLUMNS
+
+    generate_records_parallel(path, 3, COLUMNS, workers=8, now=NOW)
+    assert len(pd.read_csv(path)) == 3
+
+def test_shard_sizes_differ_by_at_most_one():
+    assert shard_sizes(10, 4) == [3, 3, 2, 2]
+    assert sum(shard_sizes(1_000_003, 7)) == 1_000_003
+
+def test_map_bounded_keeps_input_order():
+    items = list(range(-50, 50))
+    assert list(map_bounded(abs, items, workers=2)) == [abs(item) for item in items]
+    assert sorted(map_bounded(abs, items, workers=2, ordered=False)) == sorted(abs(item) for item in items)
+
+@pytest.mark.parametrize('ordered', [True, False])
+def test_map_bounded_reads_ahead_at_most_max_pending_items(ordered):
+    consumed = []
+
+    def items():
+        for item in range(40):
+            consumed.append(item)
+            yield item
+    results = map_bounded(abs, items(), workers=2, ordered=ordered, max_pending=3)
+    for count, _ in enumerate(results, 1):
+        assert len(consumed) <= count + 3
+    assert count == 40
@@ -0,0 +1,91 @@
+import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
+import pytest
+import table_io
+from table_io import TableWriter, iter_csv_chunks, iter_table_chunks, read_table
+
+
+def write_batches(path, batches):
+    with TableWriter(path) as writer:
+        for batch in batches:
+            writer.write(pd.DataFrame(batch))
+    return read_table(path)
+
+def values(series):
+    return [None if pd.isna(value) else value for value in series]
+
+@pytest.fixture(params=['parquet', 'arrow'])
+def path(request, tmp_path):
+    return str(tmp_path / f'out.{request.param}')
+
+
+def test_registered_column_turns_text_when_values_are_mixed(path):
+    result = write_batches(path, [{'Price': [1.5, 2.0]}, {'Price': [1.5, 'InvalidPrice']}, {'Price': [599.0, None]}])
+    # Numbers keep the text the CSV writer gives them
+    assert values(result['Price']) == ['1.5', '2.0', '1.5', 'InvalidPrice', '599.0', None]
+
+def test_null_column_takes_the_type_of_later_values(path):
+    result = write_batches(path, [{'note': [None, None], 'n': [1, 2]}, {'note': ['a', None], 'n': [3, 4]},
+                                  {'note': [None, 'b'], 'n': [5, 6]}])
+    assert values(result['note']) == [None, None, 'a', None, None, 'b']
+    assert result['n'].tolist() == [1, 2, 3, 4, 5, 6]
+
+def test_integers_widen_to_floats(path):
+    result = write_batches(path, [{'share': [1, 2]}, {'share': [1.5, None]}])
+    assert result['share'].dtype == 'float64'
+    assert result['share'].tolist()[:3] == [1.0, 2.0, 1.5] and pd.isna(result['share'].iloc[3])
+
+def test_numbers_among_text_become_text(path):
+    result = write_batches(path, [{'code': ['x', 'y']}, {'code': [1, 2]}])
+    assert result['code'].tolist() == ['x', 'y', '1', '2']
+
+def test_registered_types_are_used_from_the_first_batch(tmp_path):
+    path = str(tmp_path / 'orders.parquet')
+    with TableWriter(path) as writer:
+        writer.write(pd.DataFrame({'Quantity_ordered': [1, 2], 'Price': [10, 20], 'Payment_Failure_Reason': [None, None],
+                                   'Date_and_Time_When_Order_Was_Placed': pd.to_datetime(['2024-01-01', None])}))
+        writer.write(pd.DataFrame({'Quantity_ordered': [3, 4], 'Price': [0.5, 1.25],
+                                   'Payment_Failure_Reason': ['Card Declined', None],
+                                   'Date_and_Time_When_Order_Was_Placed': pd.to_datetime(['2024-01-02', '2024-01-03'])}))
+    schema = pq.read_schema(path)
+    assert schema.field('Quantity_ordered').type == pa.int64()
+    assert schema.field('Price').type == pa.float64()
+    assert schema.field('Date_and_Time_When_Order_Was_Placed').type == pa.timestamp('us')
+    assert pa.types.is_dictionary(schema.field('Payment_Failure_Reason').type)
+    assert read_table(path)['Price'].tolist() == [10.0, 20.0, 0.5, 1.25]
+
+def test_widened_file_keeps_row_groups(tmp_path):
+    path = str(tmp_path / 'out.parquet')
+    with TableWriter(path, row_group_size=2) as writer:
+        for start in range(0, 6, 2):
+            writer.write(pd.DataFrame({'n': [start, start + 1]}))
+        writer.write(pd.DataFrame({'n': [6.5]}))
+    assert [chunk['n'].tolist() for chunk in iter_table_chunks(path, 2)] == [[0.0, 1.0], [2.0, 3.0], [4.0, 5.0], [6.5]]
+    assert list(tmp_path.iterdir()) == [tmp_path / 'out.parquet']
+
+@pytest.fixture
+def late_invalid_csv(tmp_path, monkeypatch):
+    # Small parse blocks, so the one bad price is met long after the first chunks were read
+    monkeypatch.setattr(table_io, 'CSV_BLOCK_SIZE', 1024)
+    path = tmp_path / 'rough.csv'
+    prices = [f'{i}.25' for i in range(300)]
+    prices[250] = 'InvalidPrice'
+    pd.DataFrame({'Quantity_ordered': range(300), 'Price': prices}).to_csv(path, index=False)
+    return path
+
+def test_csv_chunks_share_types_when_a_late_value_does_not_convert(late_invalid_csv):
+    chunks = list(iter_table_chunks(str(late_invalid_csv), 40))
+    assert len(chunks) == 8
+    assert {str(chunk['Price'].dtype) for chunk in chunks} == {str(read_table(str(late_invalid_csv))['Price'].dtype)}
+    assert all(chunk['Quantity_ordered'].dtype == 'int64' for chunk in chunks)
+    assert pd.concat(chunks)['Price'].tolist()[249:251] == ['249.25', 'InvalidPrice']
+    assert not pd.api.types.is_numeric_dtype(chunks[0]['Price'])
+
+def test_csv_chunks_from_a_file_object(late_invalid_csv):
+    with open(late_invalid_csv, 'rb') as file:
+        file.readline()
+        names = ['Quantity_ordered', 'Price']
+        chunks = list(iter_csv_chunks(file, 100, names=names))
+    assert sum(len(chunk) for chunk in chunks) == 300
+    assert not pd.api.types.is_numeric_dtype(chunks[0]['Price'])
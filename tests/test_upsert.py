@@ -0,0 +1,84 @@
+import numpy as np
+import pandas as pd
+import pytest
+from merge import upsert_files
+from table_io import read_table
+from upsert import upsert_chunks
+
+
+@pytest.fixture
+def sources():
+    rng = np.random.default_rng(7)
+    master = pd.DataFrame({'key': [f'k{i}' for i in range(300)], 'value': np.arange(300.0), 'note': 'master'})
+    updates = []
+    for batch in range(3):
+        keys = rng.choice(400, 120, replace=False)
+        update = pd.DataFrame({'key': [f'k{i}' for i in keys], 'value': rng.random(120), 'note': f'batch {batch}'})
+        update.loc[update.index % 3 == 0, 'value'] = np.nan
+        updates.append(update)
+    return [master] + updates
+
+def chunked(frame, size=50):
+    return [frame.iloc[start:start + size] for start in range(0, len(frame), size)]
+
+def upsert(sources, mode, partitions=1, stats=None, **options):
+    streams = [chunked(source) for source in sources]
+    return pd.concat(upsert_chunks(streams, 'key', mode, partitions, chunk_size=64, stats=stats, **options),
+                     ignore_index=True)
+
+def expected(sources, mode):
+    """Row-by-row reference: a dict from key to row, in order of first appearance."""
+    rows = {}
+    for source in sources:
+        for row in source.to_dict('records'):
+            old = rows.get(row['key'])
+            if old is not None and mode == 'update':
+                row = {name: old[name] if pd.isna(value) else value for name, value in row.items()}
+            rows[row['key']] = row
+    return pd.DataFrame(list(rows.values()))
+
+
+@pytest.mark.parametrize('mode', ['replace', 'update'])
+def test_upsert_keeps_one_row_per_key(sources, mode):
+    stats = {}
+    result = upsert(sources, mode, stats=stats)
+    assert result['key'].is_unique
+    pd.testing.assert_frame_equal(result, expected(sources, mode))
+    new_keys = set(pd.concat(sources[1:])['key']) - set(sources[0]['key'])
+    assert stats['inserted'] == len(new_keys)
+    assert stats['updated'] == len(set(pd.concat(sources[1:])['key']) & set(sources[0]['key']))
+
+@pytest.mark.parametrize('mode', ['replace', 'update'])
+def test_partitioned_upsert_matches_in_memory(tmp_path, sources, mode):
+    in_memory_stats, partitioned_stats = {}, {}
+    in_memory = upsert(sources, mode, stats=in_memory_stats)
+    partitioned = upsert(sources, mode, partitions=4, stats=partitioned_stats, run_rows=100, spill_dir=str(tmp_path))
+    pd.testing.assert_frame_equal(partitioned, in_memory)
+    assert partitioned_stats == in_memory_stats
+    assert list(tmp_path.iterdir()) == []
+
+def test_rows_without_key_are_kept():
+    master = pd.DataFrame({'key': ['a', None, 'b'], 'value': [1, 2, 3]})
+    update = pd.DataFrame({'key': [None, 'a'], 'value': [4, 5]})
+    result = upsert([master, update], 'replace')
+    assert sorted(result['value'].tolist()) == [2, 3, 4, 5]
+
+def test_upsert_files_may_overwrite_the_master(tmp_path):
+    master, update = str(tmp_path / 'master.csv'), str(tmp_path / 'update.csv')
+    pd.DataFrame({'Order_Id': ['a', 'b'], 'Quantity_ordered': [1, 2]}).to_csv(master, index=False)
+    pd.DataFrame({'Order_Id': ['b', 'c', 'c'], 'Quantity_ordered': [20, 30, 31]}).to_csv(update, index=False)
+    summary = upsert_files([master, update], master)
+    assert (summary['inserted'], summary['updated'], summary['rows']) == (1, 1, 3)
+    result = read_table(master)
+    assert result['Order_Id'].tolist() == ['a', 'b', 'c']
+    assert result['Quantity_ordered'].tolist() == [1, 20, 31]
+
+def test_spill_batches_may_need_wider_types(tmp_path):
+    # The first spilled batches hold only nulls and integers; later ones text and fractions
+    master = pd.DataFrame({'key': [f'k{i}' for i in range(100)], 'note': None, 'amount': np.arange(100)})
+    update = pd.DataFrame({'key': [f'k{i}' for i in range(50, 150)], 'note': 'changed', 'amount': np.arange(100) + 0.5})
+    in_memory = upsert([master, update], 'update')
+    partitioned = upsert([master, update], 'update', partitions=3, spill_dir=str(tmp_path))
+    pd.testing.assert_frame_equal(partitioned.drop(columns='note'), in_memory.drop(columns='note'))
+    assert partitioned['note'].fillna('').tolist() == in_memory['note'].fillna('').tolist() == [''] * 50 + ['changed'] * 100
+    assert partitioned['amount'].iloc[-1] == 99.5
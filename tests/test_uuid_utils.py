@@ -0,0 +1,107 @@
+import uuid
+import numpy as np
+import pandas as pd
+import pytest
+from data_handling import handle_invalid_ids
+from uuid_utils import UUIDArray, UUIDDtype, bulk_uuid4, format_uuids, parse_uuids, to_uuid_columns
+
+
+@pytest.fixture
+def strings():
+    values = bulk_uuid4(6, np.random.default_rng(2)).tolist()
+    values[1] = None
+    values[3] = 'InvalidUUID'
+    values[4] = values[4].upper()
+    return values
+
+def expected(values):
+    return [str(uuid.UUID(value)) if value and value != 'InvalidUUID' else None for value in values]
+
+def as_list(array):
+    return [None if pd.isna(value) else value for value in array]
+
+
+def test_generated_uuids_are_version_4():
+    for value in bulk_uuid4(50, np.random.default_rng(0)):
+        parsed = uuid.UUID(value)
+        assert (str(parsed), parsed.version, parsed.variant) == (value, 4, uuid.RFC_4122)
+
+def test_bulk_uuids_are_seeded_unique_and_match_their_bytes():
+    values = bulk_uuid4(100_000, np.random.default_rng(5))
+    assert len(set(values)) == len(values)
+    assert (values == bulk_uuid4(100_000, np.random.default_rng(5))).all()
+    raw = bulk_uuid4(100_000, np.random.default_rng(5), binary=True)
+    assert raw.shape == (100_000, 16) and raw.dtype == np.uint8
+    assert (format_uuids(raw) == values).all()
+    assert [uuid.UUID(bytes=row.tobytes()) for row in raw[:3]] == [uuid.UUID(value) for value in values[:3]]
+
+def test_invalid_ids_are_replaced_with_fresh_uuids():
+    df = pd.DataFrame({'Order_Id': ['InvalidUUID', str(uuid.UUID(int=1)), None, 'InvalidUUID']})
+    handle_invalid_ids(df, np.random.default_rng(0))
+    ids = [str(value) for value in df['Order_Id']]
+    assert df['Order_Id'].array.valid.all() and ids[1] == str(uuid.UUID(int=1))
+    assert len(set(ids)) == 4 and all(uuid.UUID(ids[i]).version == 4 for i in (0, 2, 3))
+
+@pytest.mark.parametrize('bad', ['', 'not-a-uuid', 'g' * 8 + '-0000-0000-0000-' + '0' * 12, '0' * 36, 12345])
+def test_malformed_values_are_invalid(bad):
+    raw, valid = parse_uuids(pd.Series([bad, str(uuid.UUID(int=7))], dtype=object))
+    assert valid.tolist() == [False, True]
+    assert raw[0].tolist() == [0] * 16
+
+def test_round_trip_through_strings_and_bytes(strings):
+    array = UUIDArray.from_strings(strings)
+    assert as_list(array.to_strings()) == expected(strings)
+    assert array.isna().tolist() == [False, True, False, True, False, False]
+    again = UUIDArray.from_bytes(array.to_bytes(), array.valid)
+    assert as_list(again) == expected(strings)
+    assert [uuid.UUID(bytes=bytes(row)) for row in array.to_bytes()[[0, 2]]] == \
+        [uuid.UUID(strings[0]), uuid.UUID(strings[2])]
+    assert format_uuids(array.to_bytes()[[0]])[0] == strings[0]
+
+def test_take_and_fill(strings):
+    array = UUIDArray.from_strings(strings)
+    assert as_list(array.take([5, 0, 0])) == expected([strings[5], strings[0], strings[0]])
+    assert as_list(array.take([-1, 2], allow_fill=True)) == [None, expected(strings)[2]]
+    filled = array.take([-1, 2], allow_fill=True, fill_value=strings[0])
+    assert as_list(filled) == [strings[0], expected(strings)[2]]
+    with pytest.raises(ValueError):
+        array.take([-2], allow_fill=True)
+    with pytest.raises(IndexError):
+        UUIDArray.from_strings([]).take([0], allow_fill=True)
+    assert UUIDArray.from_strings([]).take([-1], allow_fill=True).isna().tolist() == [True]
+
+def test_concat_and_series_operations(strings):
+    left, right = UUIDArray.from_strings(strings[:3]), UUIDArray.from_strings(strings[3:])
+    joined = UUIDArray._concat_same_type([left, right])
+    assert as_list(joined) == expected(strings)
+
+    series = pd.concat([pd.Series(left), pd.Series(right)], ignore_index=True)
+    assert isinstance(series.dtype, UUIDDtype)
+    assert as_list(series) == expected(strings)
+    doubled = pd.Series(UUIDArray._concat_same_type([joined, joined]))
+    assert int(doubled.duplicated().sum()) == 12 - 5  # Four distinct values and NA, each kept once
+    assert doubled.value_counts().tolist() == [2] * 4
+    assert as_list(series.sort_values()) == sorted(value for value in expected(strings) if value) + [None, None]
+
+def test_comparison_and_hashing_follow_values(strings):
+    array = UUIDArray.from_strings(strings)
+    assert (array == strings[0]).tolist() == [True] + [False] * 5
+    lower = UUIDArray.from_strings(expected(strings))
+    assert ((array == lower) == ~array.isna()).all()
+    hashes = pd.util.hash_pandas_object(pd.Series(array), index=False)
+    assert (hashes == pd.util.hash_pandas_object(pd.Series(lower), index=False)).all()
+
+@pytest.mark.parametrize('dtype', [object, 'str'])
+def test_hashes_match_the_canonical_strings(strings, dtype):
+    array = UUIDArray.from_strings(strings)
+    text = pd.Series(expected(strings), dtype=dtype)
+    for options in ({}, {'hash_key': '0123456789abcdef', 'categorize': False}):
+        assert (pd.util.hash_pandas_object(pd.Series(array), index=False, **options) ==
+                pd.util.hash_pandas_object(text, index=False, **options)).all()
+
+def test_to_uuid_columns_converts_in_place(strings):
+    df = pd.DataFrame({'Order_Id': strings, 'Customer_Name': ['a'] * 6})
+    assert to_uuid_columns(df) is df
+    assert isinstance(df['Order_Id'].dtype, UUIDDtype)
+    assert df['Customer_Name'].dtype != UUIDDtype()
+    assert df['Order_Id'].array.nbytes == 6 * 17
@@ -0,0 +1,125 @@
+import os
+import numpy as np
+import pandas as pd
+
+# Known timestamp layouts, most common first.
+# Clean data uses '2021-05-30 10:07:33', rough data '2023-12-21 22:24:23.340572'.
+TIMESTAMP_FORMATS = [
+    '%Y-%m-%d %H:%M:%S',
+    '%Y-%m-%d %H:%M:%S.%f',
+    '%Y-%m-%dT%H:%M:%S',
+    '%Y-%m-%dT%H:%M:%S.%f',
+    '%Y-%m-%d'
+]
+
+# Most distinct strings remembered from one call to the next
+DEFAULT_CACHE_SIZE = 1_000_000
+
+DATETIME_DTYPE = 'datetime64[ns]'
+
+
+def shapes(values: np.ndarray) -> np.ndarray:
+    """Digit-masked form of each string ('2021-05-30' -> '0000-00-00'), used to route it to a format."""
+    text = np.asarray(values, dtype=object).astype(str)
+    width = text.dtype.itemsize // 4
+    if len(text) == 0 or width == 0:
+        return text
+    codes = text.view(np.uint32).reshape(len(text), width)
+    masked = np.where((codes >= 48) & (codes <= 57), 48, codes).astype(np.uint32)
+    return masked.view(f'U{width}').ravel()
+
+def format_shape(fmt: str) -> str:
+    """Shape of every timestamp written with fmt, e.g. '0000-00-00 00:00:00' for '%Y-%m-%d %H:%M:%S'."""
+    return shapes(np.array([pd.Timestamp(2000, 1, 1, 0, 0, 0, 1).strftime(fmt)], dtype=object))[0]
+
+
+class TimestampParser:
+    """Parse timestamp strings in mixed formats into a datetime64 column.
+
+    Each call factorizes the values so every distinct string is parsed once, detects which known
+    formats occur by comparing digit-masked shapes, and parses each format with an exact-format
+    vectorized pass. Strings that match no known format get one flexible pass; whatever still
+    fails becomes NaT and is reported back (and counted) as quarantined rather than raising.
+
+    The cache only holds the distinct strings of the previous call (when there are at most
+    cache_size of them): consecutive chunks of a feed share most timestamps, so a chunk mostly
+    reuses the one before it, but older values are not kept.
+    """
+
+    def __init__(self, formats: list = None, cache_size: int = DEFAULT_CACHE_SIZE):
+        self.formats = TIMESTAMP_FORMATS if formats is None else formats
+        self.shapes = {fmt: format_shape(fmt) for fmt in self.formats}
+        self.cache_size = cache_size
+        self.cache = self._empty_cache()
+        self.format_counts = {}
+        self.quarantined = 0
+
+    @staticmethod
+    def _empty_cache() -> pd.Series:
+        # Plain object index: lookups hash Python strings without converting the whole index
+        return pd.Series(np.array([], dtype=DATETIME_DTYPE), index=pd.Index([], dtype=object))
+
+    def _parse_uniques(self, uniques: np.ndarray) -> np.ndarray:
+        parsed = np.full(len(uniques), np.datetime64('NaT'), dtype=DATETIME_DTYPE)
+        remaining = np.ones(len(uniques), dtype=bool)
+        value_shapes = shapes(uniques)
+        for fmt, shape in self.shapes.items():
+            matches = remaining & (value_shapes == shape)
+            if not matches.any():
+                continue
+            values = pd.to_datetime(uniques[matches], format=fmt, errors='coerce').to_numpy(DATETIME_DTYPE)
+            parsed[matches] = values
+            parsed_ok = ~np.isnat(values)
+            remaining[np.flatnonzero(matches)[parsed_ok]] = False
+            self.format_counts[fmt] = self.format_counts.get(fmt, 0) + int(parsed_ok.sum())
+        if remaining.any():
+            # Anything unexpected gets one flexible per-value pass before it is quarantined
+            parsed[remaining] = pd.to_datetime(pd.Series(uniques[remaining]), format='mixed',
+                                               errors='coerce').to_numpy(DATETIME_DTYPE)
+        return parsed
+
+    def parse(self, values) -> tuple:
+        """Return (datetime64 Series, boolean Series marking values that could not be parsed)."""
+        series = pd.Series(values)
+        if pd.api.types.is_datetime64_any_dtype(series):
+            parsed = series.dt.tz_localize(None) if series.dt.tz is not None else series
+            return parsed.astype(DATETIME_DTYPE), pd.Series(False, index=series.index)
+
+        codes, uniques = pd.factorize(series.astype(str).where(series.notna(), None))
+        uniques = np.asarray(uniques, dtype=object)
+        positions = self.cache.index.get_indexer(uniques)
+        known = positions >= 0
+        unique_values = np.empty(len(uniques), dtype=DATETIME_DTYPE)
+        unique_values[known] = self.cache.to_numpy()[positions[known]]
+        if (~known).any():
+            unique_values[~known] = self._parse_uniques(uniques[~known])
+        # Orders arrive in time order, so the strings of the previous call are the ones likely to repeat
+        if len(uniques) <= self.cache_size:
+            self.cache = pd.Series(unique_values, index=pd.Index(uniques, dtype=object))
+
+        result = np.full(len(series), np.datetime64('NaT'), dtype=DATETIME_DTYPE)
+        present = codes >= 0
+        result[present] = unique_values[codes[present]]
+        parsed = pd.Series(result, index=series.index, name=series.name)
+        bad = parsed.isna() & series.notna()
+        self.quarantined += int(bad.sum())
+        return parsed, bad
+
+
+def parse_timestamps(values, parser: TimestampParser = None) -> tuple:
+    """Parse one column with a fresh (or the given) TimestampParser; returns (parsed, bad mask)."""
+    return (parser or TimestampParser()).parse(values)
+
+def to_datetime_column(values) -> pd.Series:
+    """Parsed datetime64 column, with unparseable values as NaT; returns datetime input unchanged."""
+    series = pd.Series(values)
+    if pd.api.types.is_datetime64_any_dtype(series):
+        return series
+    return parse_timestamps(series)[0]
+
+def quarantine_rows(df: pd.DataFrame, bad: pd.Series, column: str, path: str = None) -> pd.DataFrame:
+    """Return the rows whose timestamp failed to parse, with the raw value, appending them to path if given."""
+    rows = df.loc[bad].assign(Quarantine_Column=column)
+    if path and len(rows):
+        rows.to_csv(path, mode='a', header=not os.path.exists(path), index_label='Row')
+    return rows
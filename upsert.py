@@ -0,0 +1,107 @@
+import os
+import tempfile
+import numpy as np
+import pandas as pd
+from external_sort import RUN_ROWS, SPILL_FORMAT, sort_chunks
+from table_io import TableWriter, iter_table_chunks
+
+# Column carrying each row's position in the combined input while rows are joined
+ORDER_COLUMN = '__order'
+
+# Inputs up to this size on disk are joined in memory; larger ones are hash-partitioned to disk
+IN_MEMORY_BYTES = 256 * 1024 * 1024
+
+# Input bytes per on-disk partition
+PARTITION_BYTES = 128 * 1024 * 1024
+
+# 'replace': the newest row wins whole; 'update': its non-null values overwrite the older row's
+UPSERT_MODES = ('replace', 'update')
+
+
+def partition_count(paths: list) -> int:
+    """1 (join in memory) when the inputs are small, else enough partitions of about PARTITION_BYTES each."""
+    total = sum(os.path.getsize(path) for path in paths)
+    return 1 if total <= IN_MEMORY_BYTES else -(-total // PARTITION_BYTES)
+
+def key_partitions(keys: pd.Series, partitions: int) -> np.ndarray:
+    """Partition number of each key; equal keys always land in the same partition."""
+    hashes = pd.util.hash_pandas_object(keys.astype(str), index=False).to_numpy()
+    return (hashes % np.uint64(partitions)).astype(np.int64)
+
+def upsert_frame(frame: pd.DataFrame, key: str, mode: str = 'replace', base_rows: int = 0) -> tuple:
+    """Collapse rows that share a key into one, the newest (highest ORDER_COLUMN) winning.
+
+    The surviving row takes the ORDER_COLUMN of the key's first appearance, so sorting on it
+    keeps the original row order with new keys after the base rows. Rows without a key are kept
+    as they are. Returns (rows, counts of keys inserted after and updated beyond the first
+    base_rows rows).
+    """
+    if mode not in UPSERT_MODES:
+        raise ValueError(f"Unsupported upsert mode: {mode}")
+    codes, _ = pd.factorize(frame[key])
+    keyed = np.flatnonzero(codes >= 0)
+    ordinal = frame[ORDER_COLUMN].to_numpy()
+    # Hash join: factorize hashes every key once, groupby gathers each key's first and last row
+    positions = pd.Series(keyed).groupby(codes[keyed])
+    first, last = positions.min().to_numpy(), positions.max().to_numpy()
+    if mode == 'replace':
+        rows = frame.take(last)
+    else:
+        # groupby().last() takes the newest non-null value of every column
+        rows = frame.take(keyed).groupby(codes[keyed]).last()
+    rows = rows.assign(**{ORDER_COLUMN: ordinal[first]})
+    inserted = ordinal[first] >= base_rows
+    counts = {
+        'inserted': int(inserted.sum()),
+        'updated': int(((ordinal[last] >= base_rows) & ~inserted).sum())
+    }
+    unkeyed = frame[codes < 0]
+    return (pd.concat([rows, unkeyed], ignore_index=True) if len(unkeyed) else rows.reset_index(drop=True)), counts
+
+def upsert_chunks(sources: list, key: str, mode: str = 'replace', partitions: int = 1, chunk_size: int = 100_000,
+                  run_rows: int = RUN_ROWS, spill_dir: str = None, stats: dict = None):
+    """Yield the rows of several chunk streams with one row per key; later sources win.
+
+    sources[0] is the base (master) data. With more than one partition both sides are split by
+    key hash into spill files and each partition is joined on its own, so memory is bounded by
+    the largest partition; the joined rows are put back into input order with an external sort.
+    Inserted and updated key counts are added to `stats` when given.
+    """
+    stats = {} if stats is None else stats
+    with tempfile.TemporaryDirectory(prefix='upsert-', dir=spill_dir) as tmp_dir:
+        frames, writers = [], {}
+        ordinal, base_rows = 0, None
+        for source in sources:
+            for chunk in source:
+                chunk = chunk.assign(**{ORDER_COLUMN: np.arange(ordinal, ordinal + len(chunk))})
+                ordinal += len(chunk)
+                if partitions <= 1:
+                    frames.append(chunk)
+                    continue
+                for partition, part in chunk.groupby(key_partitions(chunk[key], partitions), sort=False):
+                    if partition not in writers:
+                        path = os.path.join(tmp_dir, f'part-{partition}.{SPILL_FORMAT}')
+                        writers[partition] = TableWriter(path, SPILL_FORMAT, compression=None)
+                    writers[partition].write(part)
+            if base_rows is None:
+                base_rows = ordinal
+        for writer in writers.values():
+            writer.close()
+
+        def joined():
+            if partitions <= 1:
+                groups = [pd.concat(frames, ignore_index=True)] if frames else []
+            else:
+                groups = (pd.concat(iter_table_chunks(writer.path, chunk_size, file_format=SPILL_FORMAT),
+                                    ignore_index=True) for writer in writers.values())
+            for frame in groups:
+                rows, counts = upsert_frame(frame, key, mode, base_rows)
+                for name, count in counts.items():
+                    stats[name] = stats.get(name, 0) + count
+                yield rows
+
+        if partitions <= 1:
+            run_rows = max(run_rows, ordinal + 1)  # Already in memory: sort without spilling
+        for chunk in sort_chunks(joined(), lambda rows: rows[ORDER_COLUMN].to_numpy(), chunk_size, run_rows,
+                                 spill_dir=tmp_dir):
+            yield chunk.drop(columns=ORDER_COLUMN)
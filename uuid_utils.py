@@ -0,0 +1,307 @@
+import numpy as np
+import pandas as pd
+from pandas.api.extensions import ExtensionArray, ExtensionDtype, register_extension_dtype
+from pandas.api.indexers import check_array_indexer
+from schema import UUID_COLUMNS  # The loaders and the cleansing stages keep these columns as UUIDArray
+
+try:
+    import pyarrow as pa
+except ImportError:  # Without pyarrow UUID columns are written through their string form
+    pa = None
+
+# Lowercase hex digits as ASCII codes, indexed by nibble value
+_HEX_DIGITS = np.frombuffer(b'0123456789abcdef', dtype=np.uint8)
+
+# Both hex digits of every byte value as one little-endian uint16, so one lookup writes two characters
+_HEX_PAIRS = (_HEX_DIGITS[np.arange(256) >> 4] | (_HEX_DIGITS[np.arange(256) & 0x0F].astype(np.uint16) << 8)).astype('<u2')
+
+# Layout of the 36-char canonical form: dashes at 8, 13, 18, 23 and five runs of hex digits as (start, width)
+_DASH_POSITIONS = np.array([8, 13, 18, 23])
+_DIGIT_GROUPS = [(0, 8), (9, 4), (14, 4), (19, 4), (24, 12)]
+
+
+def uuid4_bytes(n: int, rng: np.random.Generator = None) -> np.ndarray:
+    """Generate n RFC 4122 version 4 UUIDs as an (n, 16) uint8 array from one block of random bytes."""
+    rng = rng if rng is not None else np.random.default_rng()
+    raw = np.frombuffer(rng.bytes(16 * n), dtype=np.uint8).reshape(n, 16).copy()
+    raw[:, 6] = (raw[:, 6] & 0x0F) | 0x40  # Version 4
+    raw[:, 8] = (raw[:, 8] & 0x3F) | 0x80  # RFC 4122 variant
+    return raw
+
+def uuid_chars(raw: np.ndarray) -> np.ndarray:
+    """ASCII codes of the canonical 36-char form of an (n, 16) uint8 array, as an (n, 36) uint8 array."""
+    digits = _HEX_PAIRS.take(raw).view(np.uint8).reshape(len(raw), 32)
+    chars = np.full((len(raw), 36), ord('-'), dtype=np.uint8)
+    for dashes, (start, width) in enumerate(_DIGIT_GROUPS):
+        chars[:, start:start + width] = digits[:, start - dashes:start - dashes + width]
+    return chars
+
+def format_uuids(raw: np.ndarray) -> np.ndarray:
+    """Format an (n, 16) uint8 array as canonical 36-char UUID strings (object array)."""
+    return uuid_chars(raw).view('S36').ravel().astype('U36').astype(object)
+
+def _candidate_chars(series: pd.Series) -> tuple:
+    """Positions of the 36-character strings in series and their character codes as an (m, 36) uint8 array."""
+    if pa is None:
+        text = series.astype(str)
+        candidates = np.flatnonzero(series.notna().to_numpy() & (text.str.len() == 36).to_numpy())
+        codes = np.asarray(text.iloc[candidates].to_numpy(dtype=object), dtype='U36').view(np.uint32)
+        codes = codes.reshape(len(candidates), 36)
+        return candidates, np.where(codes > 255, 0, codes).astype(np.uint8)  # Non-Latin-1 text is never a UUID
+    try:
+        array = pa.array(series, type=pa.string(), from_pandas=True)
+    except (pa.ArrowInvalid, pa.ArrowTypeError):  # Mixed types, e.g. numbers among the IDs
+        array = pa.array(series.astype(str).where(series.notna(), None), type=pa.string(), from_pandas=True)
+    if isinstance(array, pa.ChunkedArray):
+        array = array.combine_chunks()
+    # Read the UTF-8 bytes in place: 36-byte values are gathered straight from the data buffer
+    offsets = np.frombuffer(array.buffers()[1], dtype=np.int32)[array.offset:array.offset + len(array) + 1]
+    present = array.is_valid().to_numpy(zero_copy_only=False)
+    candidates = np.flatnonzero(present & (np.diff(offsets) == 36))
+    if len(candidates) == 0:
+        return candidates, np.zeros((0, 36), dtype=np.uint8)
+    data = np.frombuffer(array.buffers()[2], dtype=np.uint8)[offsets[0]:offsets[-1]]
+    if len(candidates) < len(array):
+        data = data[np.repeat(present & (np.diff(offsets) == 36), np.diff(offsets))]
+    return candidates, data.reshape(-1, 36)
+
+def parse_uuids(values) -> tuple:
+    """Parse UUID strings into an (n, 16) uint8 array and a validity mask.
+
+    Missing values, sentinels such as 'InvalidUUID' and malformed text are invalid (zero bytes).
+    """
+    series = pd.Series(values, copy=False).reset_index(drop=True)
+    raw = np.zeros((len(series), 16), dtype=np.uint8)
+    valid = np.zeros(len(series), dtype=bool)
+    candidates, chars = _candidate_chars(series)
+    digits = np.concatenate([chars[:, start:start + width] for start, width in _DIGIT_GROUPS], axis=1)
+    # uint8 arithmetic wraps, so one comparison per class checks the range: '0'-'9', then 'a'-'f' in either case
+    decimal = digits - np.uint8(ord('0'))
+    letter = (digits | np.uint8(0x20)) - np.uint8(ord('a'))
+    nibbles = np.where(decimal < 10, decimal, letter + np.uint8(10))
+    ok = (chars[:, _DASH_POSITIONS] == ord('-')).all(axis=1) & ((decimal < 10) | (letter < 6)).all(axis=1)
+    raw[candidates[ok]] = (nibbles[ok, 0::2] << 4) | nibbles[ok, 1::2]
+    valid[candidates[ok]] = True
+    return raw, valid
+
+def bulk_uuid4(n: int, rng: np.random.Generator = None, binary: bool = False) -> np.ndarray:
+    """Generate n random UUIDs in one call.
+
+    Returns canonical strings by default, or the raw (n, 16) uint8 byte matrix when binary=True.
+    """
+    raw = uuid4_bytes(n, rng)
+    return raw if binary else format_uuids(raw)
+
+
+def _to_lanes(raw: np.ndarray) -> np.ndarray:
+    # Big-endian halves, so (hi, lo) order is the order of the canonical strings
+    return raw.view('>u8').astype(np.uint64).reshape(len(raw), 2)
+
+def _to_raw(lanes: np.ndarray) -> np.ndarray:
+    return np.ascontiguousarray(lanes.astype('>u8')).view(np.uint8).reshape(len(lanes), 16)
+
+
+@register_extension_dtype
+class UUIDDtype(ExtensionDtype):
+    """pandas dtype 'uuid': 16 bytes per value instead of a 36-char string."""
+
+    name = 'uuid'
+    type = str
+    kind = 'O'
+    na_value = np.nan
+
+    def __repr__(self) -> str:
+        return self.name
+
+    @classmethod
+    def construct_array_type(cls):
+        return UUIDArray
+
+
+class UUIDArray(ExtensionArray):
+    """UUID column stored as two uint64 lanes per value plus a validity mask.
+
+    Invalid values (missing, 'InvalidUUID' and other sentinels, malformed text) are NA. Values
+    come out as canonical lowercase strings: one at a time from indexing, all at once from
+    to_strings() or when the column is written, via Arrow, to CSV, Parquet or Arrow files.
+    Factorizing (groupby, duplicated, value_counts) and sorting work on the lanes directly.
+    """
+
+    def __init__(self, lanes: np.ndarray, valid: np.ndarray):
+        self._lanes = lanes
+        self._valid = valid
+
+    @classmethod
+    def from_bytes(cls, raw: np.ndarray, valid: np.ndarray = None) -> 'UUIDArray':
+        valid = np.ones(len(raw), dtype=bool) if valid is None else valid
+        return cls(_to_lanes(np.ascontiguousarray(raw, dtype=np.uint8)), valid)
+
+    @classmethod
+    def from_strings(cls, values) -> 'UUIDArray':
+        return cls.from_bytes(*parse_uuids(values))
+
+    @classmethod
+    def _from_sequence(cls, scalars, *, dtype=None, copy=False):
+        if isinstance(scalars, UUIDArray):
+            return scalars.copy() if copy else scalars
+        return cls.from_strings(np.asarray(scalars, dtype=object))
+
+    @classmethod
+    def _from_sequence_of_strings(cls, strings, *, dtype=None, copy=False):
+        return cls.from_strings(strings)
+
+    @classmethod
+    def _from_factorized(cls, values, original):
+        return cls.from_strings(values)
+
+    @classmethod
+    def _concat_same_type(cls, to_concat):
+        return cls(np.concatenate([array._lanes for array in to_concat]),
+                   np.concatenate([array._valid for array in to_concat]))
+
+    @property
+    def dtype(self):
+        return UUIDDtype()
+
+    @property
+    def nbytes(self) -> int:
+        return self._lanes.nbytes + self._valid.nbytes
+
+    def __len__(self) -> int:
+        return len(self._valid)
+
+    def __getitem__(self, item):
+        if pd.api.types.is_integer(item):
+            if not self._valid[item]:
+                return np.nan
+            return format_uuids(_to_raw(self._lanes[item:item + 1] if item != -1 else self._lanes[-1:]))[0]
+        item = check_array_indexer(self, item)
+        return UUIDArray(self._lanes[item], self._valid[item])
+
+    def __setitem__(self, key, value):
+        key = check_array_indexer(self, key)
+        if not isinstance(value, UUIDArray):
+            value = UUIDArray.from_strings([value] if isinstance(value, str) or pd.api.types.is_scalar(value) else value)
+        self._lanes[key] = value._lanes
+        self._valid[key] = value._valid
+
+    def __iter__(self):
+        return iter(self.to_strings())
+
+    def __eq__(self, other):
+        if isinstance(other, (pd.Series, pd.Index, pd.DataFrame)):
+            return NotImplemented
+        if not isinstance(other, UUIDArray):
+            other = UUIDArray.from_strings([other] if isinstance(other, str) or pd.api.types.is_scalar(other) else other)
+        return (self._lanes == other._lanes).all(axis=1) & self._valid & other._valid
+
+    def __array__(self, dtype=None, copy=None):
+        strings = self.to_strings()
+        return strings if dtype is None else strings.astype(dtype)
+
+    def __arrow_array__(self, type=None):
+        # Canonical strings straight from the ASCII bytes: 36-byte values with fixed offsets
+        n = len(self)
+        data = pa.py_buffer(uuid_chars(_to_raw(self._lanes)).tobytes())
+        offsets = pa.py_buffer(np.arange(0, 36 * (n + 1), 36, dtype=np.int64 if 36 * n >= 2 ** 31 else np.int32))
+        validity = pa.py_buffer(np.packbits(self._valid, bitorder='little'))
+        string_type = pa.large_string() if 36 * n >= 2 ** 31 else pa.string()
+        array = pa.Array.from_buffers(string_type, n, [validity, offsets, data], null_count=int(n - self._valid.sum()))
+        return array if type is None or type == string_type else array.cast(type)
+
+    def to_bytes(self) -> np.ndarray:
+        """(n, 16) uint8 array of the UUID bytes; invalid values are zero."""
+        return _to_raw(self._lanes)
+
+    def to_strings(self) -> np.ndarray:
+        """Canonical strings as an object array, NaN where invalid."""
+        strings = format_uuids(_to_raw(self._lanes))
+        strings[~self._valid] = np.nan
+        return strings
+
+    @property
+    def valid(self) -> np.ndarray:
+        return self._valid
+
+    def isna(self) -> np.ndarray:
+        return ~self._valid
+
+    def copy(self):
+        return UUIDArray(self._lanes.copy(), self._valid.copy())
+
+    def take(self, indices, allow_fill=False, fill_value=None):
+        indices = np.asarray(indices, dtype=np.intp)
+        if not allow_fill:
+            return UUIDArray(self._lanes.take(indices, axis=0), self._valid.take(indices))
+        if (indices < -1).any():
+            raise ValueError("Invalid value in 'indices'; only -1 may be used as a fill marker")
+        missing = indices == -1
+        if len(self) == 0:
+            if not missing.all():
+                raise IndexError("cannot do a non-empty take from an empty array")
+            return UUIDArray(np.zeros((len(indices), 2), dtype=np.uint64), np.zeros(len(indices), dtype=bool))
+        positions = np.where(missing, 0, indices)
+        result = UUIDArray(self._lanes.take(positions, axis=0), self._valid.take(positions) & ~missing)
+        if missing.any() and fill_value is not None and not pd.isna(fill_value):
+            result[missing] = fill_value
+        return result
+
+    def astype(self, dtype, copy=True):
+        dtype = pd.api.types.pandas_dtype(dtype)
+        if isinstance(dtype, UUIDDtype):
+            return self.copy() if copy else self
+        if isinstance(dtype, ExtensionDtype):
+            if isinstance(dtype, pd.StringDtype) and dtype.storage == 'pyarrow' and pa is not None:
+                return dtype.construct_array_type()._from_sequence(self.__arrow_array__(), dtype=dtype)
+            return dtype.construct_array_type()._from_sequence(self.to_strings(), dtype=dtype)
+        return self.to_strings().astype(dtype)
+
+    def factorize(self, use_na_sentinel=True):
+        # Factorize each lane, then the pair of lane codes: three integer hash passes, no strings
+        valid = self._valid
+        hi_codes, hi_uniques = pd.factorize(self._lanes[valid, 0])
+        lo_codes, lo_uniques = pd.factorize(self._lanes[valid, 1])
+        pair_codes, pairs = pd.factorize(hi_codes.astype(np.int64) * len(lo_uniques) + lo_codes)
+        lanes = np.column_stack([hi_uniques[pairs // len(lo_uniques)], lo_uniques[pairs % len(lo_uniques)]])
+        codes = np.full(len(self), -1, dtype=np.intp)
+        codes[valid] = pair_codes
+        uniques = UUIDArray(lanes.astype(np.uint64).reshape(-1, 2), np.ones(len(lanes), dtype=bool))
+        if not use_na_sentinel and not valid.all():
+            codes[~valid] = len(uniques)
+            uniques = UUIDArray._concat_same_type([uniques, UUIDArray(np.zeros((1, 2), dtype=np.uint64),
+                                                                      np.zeros(1, dtype=bool))])
+        return codes, uniques
+
+    def _values_for_factorize(self):
+        return self.to_strings(), np.nan
+
+    def _values_for_argsort(self):
+        return self.to_strings()
+
+    def argsort(self, *, ascending=True, kind='quicksort', na_position='last', **kwargs):
+        order = np.lexsort((self._lanes[:, 1], self._lanes[:, 0]))
+        if not ascending:
+            order = order[::-1]
+        valid = self._valid[order]
+        missing = order[~valid]
+        return np.concatenate([order[valid], missing] if na_position == 'last' else [missing, order[valid]])
+
+    def value_counts(self, dropna=True):
+        codes, uniques = self.factorize(use_na_sentinel=dropna)
+        counts = np.bincount(codes[codes >= 0], minlength=len(uniques))
+        return pd.Series(counts, index=pd.Index(uniques), name='count')
+
+    def _hash_pandas_object(self, *, encoding, hash_key, categorize):
+        # Hash the canonical strings, so a column hashes the same as UUIDArray or as text (dedup indexes);
+        # missing values are None, which string columns hash them as
+        strings = format_uuids(_to_raw(self._lanes))
+        strings[~self._valid] = None
+        return pd.util.hash_array(strings, encoding=encoding, hash_key=hash_key, categorize=categorize)
+
+
+def to_uuid_columns(df: pd.DataFrame, columns: list = None) -> pd.DataFrame:
+    """Convert the UUID columns of df (UUID_COLUMNS by default) to UUIDArray in place; returns df."""
+    for column in UUID_COLUMNS if columns is None else columns:
+        if column in df.columns and not isinstance(df[column].dtype, UUIDDtype):
+            df[column] = UUIDArray.from_strings(df[column])
+    return df